@@ -1,4 +1,5 @@
+from .dmrg_batch import DMRGBatchCalculation
 from .dmrggen import DMRGCalculation
 from .dyncorr_calc import DynCorrCalculation
 
-__all__ = ["DMRGCalculation", "DynCorrCalculation"]
+__all__ = ["DMRGBatchCalculation", "DMRGCalculation", "DynCorrCalculation"]
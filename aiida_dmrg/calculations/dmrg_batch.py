@@ -0,0 +1,196 @@
+"""Batch of DMRG calculations run in a single job."""
+from aiida.common import CalcInfo, CodeInfo, CodeRunMode
+from aiida.engine import CalcJob
+from aiida.orm import ArrayData, Dict
+
+from ..utils.hdf5 import hdf5_requested
+from ..utils.julia import get_julia_cmdline
+from .dmrggen import DMRGCalculation, validate_settings
+
+
+def validate_tasks(tasks, _):
+    """Validate the parameters of the tasks of a batch."""
+    if not tasks:
+        return "At least one task is required in `tasks`."
+
+    for label, parameters in tasks.items():
+        parameters = parameters.get_dict()
+        # Both are written to fixed filenames in the working directory
+        if hdf5_requested(parameters) or "checkpoint_sweeps" in parameters:
+            return (
+                f"Task `{label}`: `print_HDF5` and `checkpoint_sweeps` are "
+                "not supported in a batch."
+            )
+        required = ("S", "N_sites", "J")
+        missing = [key for key in required if key not in parameters]
+        if missing:
+            return f"Task `{label}` is missing: {', '.join(missing)}."
+    return None
+
+
+def validate_batch_settings(settings, _):
+    """Validate the `settings` input of a batch."""
+    error = validate_settings(settings, _)
+    if error or settings is None:
+        return error
+
+    unsupported = {"retrieve", "artifacts", "reorder"}
+    unsupported &= set(settings.get_dict())
+    if unsupported:
+        return f"Not supported in a batch: {', '.join(sorted(unsupported))}."
+    return None
+
+
+def validate_inputs(inputs, _):
+    """Validate that concurrent tasks run on a single machine."""
+    options = inputs.get("metadata", {}).get("options", {})
+    resources = options.get("resources", {})
+    # The serial processes are all started on the first machine
+    if options.get("concurrent") and resources.get("num_machines", 1) > 1:
+        return "`concurrent` tasks can only run on a single machine."
+    return None
+
+
+class DMRGBatchCalculation(CalcJob):
+    """
+    AiiDA calculation plugin running several DMRG tasks in one job.
+
+    Every task is run in its own subfolder, named by its label in `tasks`,
+    with the same input and output files as a `DMRGCalculation`. The tasks
+    run one after the other, each with all MPI processes, or with
+    `metadata.options.concurrent` all at once as serial processes on a
+    single machine. The batch only waits once in the queue for all tasks.
+    """
+
+    INPUT_FILE = DMRGCalculation.INPUT_FILE
+    OUTPUT_FILE = DMRGCalculation.OUTPUT_FILE
+    DEFAULT_PARSER = "dmrg.batch"
+
+    @classmethod
+    def define(cls, spec):
+        super().define(spec)
+
+        spec.input_namespace(
+            "tasks",
+            valid_type=Dict,
+            dynamic=True,
+            validator=validate_tasks,
+            help="""Parameters of every task, as for the `parameters` of a
+            `DMRGCalculation`. The labels name the subfolders.""",
+        )
+
+        spec.input(
+            "settings",
+            valid_type=Dict,
+            required=False,
+            validator=validate_batch_settings,
+            help="""Additional `cmdline` parameters and `julia` launcher
+            options, shared by all tasks""",
+        )
+
+        spec.input("metadata.options.withmpi", valid_type=bool, default=True)
+
+        spec.input(
+            "metadata.options.concurrent",
+            valid_type=bool,
+            default=False,
+            help="""Run all tasks at the same time as serial processes,
+            instead of one after the other with MPI. Requires a single
+            machine.""",
+        )
+
+        spec.input(
+            "metadata.options.parser_name",
+            valid_type=str,
+            default=cls.DEFAULT_PARSER,
+            non_db=True,
+        )
+
+        spec.output_namespace(
+            "tasks",
+            valid_type=(Dict, ArrayData),
+            dynamic=True,
+            help="""The `output_parameters`, `output_arrays` and
+            `output_sweeps` of every task, in the namespace of its
+            label""",
+        )
+
+        spec.output(
+            "task_status",
+            valid_type=Dict,
+            required=True,
+            help="The exit status and message of every task",
+        )
+
+        spec.inputs.validator = validate_inputs
+
+        spec.exit_code(
+            394,
+            "ERROR_TASKS_FAILED",
+            message="The tasks {tasks} of the batch failed.",
+        )
+
+        # The tasks fail for the same reasons as a single calculation
+        exit_codes = DMRGCalculation.spec().exit_codes
+        statuses = {code.status for code in spec.exit_codes.values()}
+        for label, exit_code in exit_codes.items():
+            if exit_code.status < 200:
+                continue
+            if exit_code.status in statuses:
+                raise ValueError(
+                    f"exit status {exit_code.status} of `{label}` is already "
+                    "used by the batch"
+                )
+            message = exit_code.message
+            spec.exit_code(exit_code.status, label, message=message)
+
+    def prepare_for_submission(self, folder):
+        """
+        Write the input file of every task into its subfolder.
+
+        :param folder: a aiida.common.folders.Folder subclass where
+                        the plugin should put all its files.
+        """
+        settings = (
+            self.inputs.get("settings", {}).get_dict()
+            if "settings" in self.inputs
+            else {}
+        )
+        cmdline_params = get_julia_cmdline(settings.get("julia", {}))
+        cmdline_params += settings.get("cmdline", [])
+        options = self.inputs.metadata.options
+
+        codes_info = []
+        retrieve_list = []
+        for label, parameters in sorted(self.inputs.tasks.items()):
+            input_string = DMRGCalculation._render_input_string_from_params(
+                parameters.get_dict()
+            )
+            subfolder = folder.get_subfolder(label, create=True)
+            with subfolder.open(self.INPUT_FILE, "w") as out_file:
+                out_file.write(input_string)
+
+            codeinfo = CodeInfo()
+            codeinfo.code_uuid = self.inputs.code.uuid
+            codeinfo.cmdline_params = list(cmdline_params)
+            codeinfo.stdin_name = f"{label}/{self.INPUT_FILE}"
+            codeinfo.stdout_name = f"{label}/{self.OUTPUT_FILE}"
+            codeinfo.stderr_name = f"{label}/{self.OUTPUT_FILE}"
+            codeinfo.withmpi = options.withmpi and not options.concurrent
+            codes_info.append(codeinfo)
+
+            retrieve_list.append((f"{label}/{self.OUTPUT_FILE}", ".", 2))
+
+        calcinfo = CalcInfo()
+        calcinfo.uuid = self.uuid
+        calcinfo.local_copy_list = []
+        calcinfo.remote_copy_list = []
+        calcinfo.remote_symlink_list = []
+        calcinfo.codes_info = codes_info
+        if options.concurrent:
+            calcinfo.codes_run_mode = CodeRunMode.PARALLEL
+        else:
+            calcinfo.codes_run_mode = CodeRunMode.SERIAL
+        calcinfo.retrieve_list = retrieve_list
+
+        return calcinfo
@@ -1,8 +1,144 @@
 """DMRG input plugin."""
+import numpy as np
 from aiida.common import CalcInfo, CodeInfo
 from aiida.engine import CalcJob
 from aiida.engine.processes.process_spec import CalcJobProcessSpec
-from aiida.orm import Dict, RemoteData
+from aiida.orm import ArrayData, Dict, FolderData, RemoteData, SinglefileData
+
+from ..utils.artifacts import validate_artifact_patterns
+from ..utils.couplings import (
+    get_coupling_matrix_file,
+    get_edge_list,
+    render_couplings,
+    render_edge_list,
+)
+from ..utils.hdf5 import HDF5_PATTERN, hdf5_requested
+from ..utils.julia import get_julia_cmdline, validate_julia_options
+from ..utils.reorder import (
+    REORDER_METHODS,
+    SITE_ORDER_FILE,
+    get_site_order,
+    get_weight_matrix,
+    permute_couplings,
+    permute_matrix,
+)
+from ..utils.retrieve import (
+    get_retrieve_policy,
+    get_retrieve_temporary_list,
+    validate_retrieve_policy,
+)
+from .nodes import DMRGCalcJobNode
+
+
+def validate_settings(settings, _):
+    """Validate the `settings` input of the calculations."""
+    if settings is None:
+        return None
+    settings = settings.get_dict()
+
+    cmdline = settings.get("cmdline", [])
+    if not isinstance(cmdline, list) or not all(
+        isinstance(param, str) for param in cmdline
+    ):
+        return "`cmdline` in `settings` must be a list of strings."
+
+    if "retrieve" in settings:
+        error = validate_retrieve_policy(settings["retrieve"])
+        if error:
+            return error
+
+    if "julia" in settings:
+        error = validate_julia_options(settings["julia"])
+        if error:
+            return error
+
+    if "reorder" in settings and settings["reorder"] not in REORDER_METHODS:
+        return f"`reorder` must be one of {', '.join(REORDER_METHODS)}."
+
+    if "artifacts" in settings:
+        return validate_artifact_patterns(settings["artifacts"])
+
+    return None
+
+
+def validate_inputs(inputs, _):
+    """Validate the top-level inputs of the calculation."""
+    if "parameters" not in inputs:
+        return None
+    parameters = inputs["parameters"].get_dict()
+
+    given = [key for key in ("couplings", "coupling_matrix") if key in inputs]
+    if "J" in parameters:
+        given.insert(0, "J")
+    if len(given) > 1:
+        return (
+            "Specify only one of `J` in `parameters`, `couplings` or "
+            f"`coupling_matrix`, got: {', '.join(given)}."
+        )
+
+    if given and given[0] != "J" and "N_sites" not in parameters:
+        return f"`N_sites` is required in `parameters` to use `{given[0]}`."
+
+    if "couplings" in inputs:
+        try:
+            render_couplings(inputs["couplings"], parameters["N_sites"])
+        except (TypeError, ValueError) as exc:
+            return f"Invalid `couplings`: {exc}"
+
+    if "coupling_matrix" in inputs:
+        try:
+            n_sites = parameters["N_sites"]
+            get_coupling_matrix_file(inputs["coupling_matrix"], n_sites)
+        except (TypeError, ValueError) as exc:
+            return f"Invalid `coupling_matrix`: {exc}"
+
+    if "checkpoint_sweeps" in parameters:
+        # `couplings` and `coupling_matrix` take the place of `J`
+        error = validate_checkpoint_sweeps(parameters, ["J"] if given else [])
+        if error:
+            return error
+
+    settings = inputs["settings"].get_dict() if "settings" in inputs else {}
+    if "reorder" in settings:
+        return validate_reorder(inputs, settings["reorder"])
+
+    return None
+
+
+def validate_checkpoint_sweeps(parameters, given=()):
+    """Validate that `checkpoint_sweeps` is read in its own position.
+
+    The parameters are passed by position, so `checkpoint_sweeps` is only
+    read as such if all parameters before it are set. Keys that are filled
+    in elsewhere, like `J` from `couplings`, are passed as `given`.
+    """
+    keys = DMRGCalculation.PARAMETER_KEYS
+    keys = keys[: keys.index("checkpoint_sweeps")]
+    missing = [key for key in keys if key not in {*parameters, *given}]
+    if missing:
+        return (
+            "`checkpoint_sweeps` needs all parameters before it, missing: "
+            f"{', '.join(missing)}."
+        )
+    return None
+
+
+def validate_reorder(inputs, method):
+    """Validate the inputs needed to reorder the sites."""
+    matrix = inputs.get("coupling_matrix")
+    if "couplings" not in inputs and not isinstance(matrix, ArrayData):
+        return "Reordering requires `couplings` or a `coupling_matrix` array."
+
+    if method == "entanglement":
+        if "mutual_information" not in inputs:
+            return "The `entanglement` ordering needs `mutual_information`."
+        n_sites = inputs["parameters"]["N_sites"]
+        mutual_information = inputs["mutual_information"]
+        names = mutual_information.get_arraynames()
+        shape = (n_sites, n_sites)
+        if len(names) != 1 or mutual_information.get_shape(names[0]) != shape:
+            return f"`mutual_information` must be a single {shape} array."
+    return None
 
 
 class DMRGCalculation(CalcJob):
@@ -16,6 +152,23 @@ class DMRGCalculation(CalcJob):
     PARENT_FOLDER_NAME = "parent_calc"
     DEFAULT_PARSER = "dmrg.base"
 
+    # Hashes the canonical form of the inputs for caching
+    _node_class = DMRGCalcJobNode
+
+    # The parameters passed to the code, in the order of the input line
+    PARAMETER_KEYS = (
+        "S",
+        "N_sites",
+        "cutoff",
+        "J",
+        "Sz",
+        "n_excitations",
+        "conserve_symmetry",
+        "print_HDF5",
+        "maximal_energy",
+        "checkpoint_sweeps",
+    )
+
     @classmethod
     def define(cls, spec: CalcJobProcessSpec):
         super().define(spec)
@@ -28,6 +181,33 @@ class DMRGCalculation(CalcJob):
             help="Input parameters for the DMRG calculation",
         )
 
+        spec.input(
+            "couplings",
+            valid_type=ArrayData,
+            required=False,
+            help="""Sparse exchange couplings J_ij as the arrays `rows`,
+            `cols` and `values` (0-based sites, each bond once). Used
+            instead of `J` in the parameters.""",
+        )
+
+        spec.input(
+            "coupling_matrix",
+            valid_type=(ArrayData, SinglefileData),
+            required=False,
+            help="""Dense N_sites x N_sites J matrix, as an ArrayData with
+            a single array or a `.npy` / HDF5 (dataset `J`) file. It is
+            copied to the calculation folder and only its filename is
+            passed on stdin, instead of `J` in the parameters.""",
+        )
+
+        spec.input(
+            "mutual_information",
+            valid_type=ArrayData,
+            required=False,
+            help="""Site-site mutual information of a previous run, as an
+            N_sites x N_sites array, for the `entanglement` ordering""",
+        )
+
         spec.input(
             "parent_calc_folder",
             valid_type=RemoteData,
@@ -35,6 +215,18 @@ class DMRGCalculation(CalcJob):
             help="the folder of a completed dmrg calculation",
         )
 
+        spec.input(
+            "settings",
+            valid_type=Dict,
+            required=False,
+            validator=validate_settings,
+            help="""Additional `cmdline` parameters, the `julia` launcher
+            options, the `reorder` method of the sites and the `retrieve`
+            policy of the files to store besides the output log""",
+        )
+
+        spec.inputs.validator = validate_inputs
+
         spec.input("metadata.options.withmpi", valid_type=bool, default=True)
 
         spec.input(
@@ -53,11 +245,61 @@ class DMRGCalculation(CalcJob):
         )
 
         spec.output(
-            "Hamiltonian_sites",
+            "output_arrays",
+            valid_type=ArrayData,
+            required=False,
+            help="""Energies, S² and Sz(i) of the computed states
+            as the arrays `energies`, `spin_squared` and `spin_z`""",
+        )
+
+        spec.output(
+            "output_sweeps",
+            valid_type=ArrayData,
+            required=False,
+            help="""Convergence trace with one entry per sweep in the
+            arrays `state`, `sweep`, `energy`, `maxlinkdim`, `maxerr`
+            and `time`""",
+        )
+
+        spec.output(
+            "hdf5_metadata",
+            valid_type=Dict,
+            required=False,
+            help="""Bond dimensions, site types, dataset shapes and
+            checksums of the HDF5 files, which stay in `remote_folder`""",
+        )
+
+        spec.output(
+            "site_order",
+            valid_type=ArrayData,
+            required=False,
+            help="""The array `order` of the input site at every position
+            of the reordered chain; the per-site outputs are given for the
+            input sites""",
+        )
+
+        spec.output(
+            "retrieved_files",
+            valid_type=FolderData,
+            required=False,
+            help="Files selected by the retrieve policy of the settings",
+        )
+
+        spec.output_namespace(
+            "artifacts",
+            valid_type=SinglefileData,
+            required=False,
+            dynamic=True,
+            help="""Files selected by the `artifacts` patterns of the
+            settings whose content was not stored before""",
+        )
+
+        spec.output(
+            "artifact_index",
             valid_type=Dict,
             required=False,
-            help="""Sites and Hamiltonian of
-            the system for dynamical correlator""",
+            help="""Filename, SHA-256 and UUID of all artifacts, including
+            those stored by earlier calculations""",
         )
 
         spec.output(
@@ -101,16 +343,48 @@ class DMRGCalculation(CalcJob):
             "ERROR_OUTPUT_LOG_READ",
             message="The retrieved output log could not be read.",
         )
+        spec.exit_code(
+            212,
+            "ERROR_INVALID_OUTPUT",
+            message="The output file could not be parsed.",
+        )
         spec.exit_code(
             312,
             "ERROR_HDF5_WRITE",
             message="Failed to write HDF5 output files.",
         )
+        spec.exit_code(
+            380,
+            "ERROR_STALLED",
+            message="The monitor stopped the calculation: no sweep finished.",
+        )
+        spec.exit_code(
+            381,
+            "ERROR_MEMORY_GROWTH",
+            message="""The monitor stopped the calculation: the bond dimension
+            outgrew the memory.""",
+        )
+        spec.exit_code(
+            382,
+            "ERROR_ENERGY_DIVERGED",
+            message="""The monitor stopped the calculation: the energy
+            diverged.""",
+        )
         spec.exit_code(
             390,
             "ERROR_TERMINATION",
             message="The calculation was terminated due to an error.",
         )
+        spec.exit_code(
+            391,
+            "ERROR_CALCULATION_FAILED",
+            message="The calculation failed with an error in the log.",
+        )
+        spec.exit_code(
+            393,
+            "ERROR_MPI_ABORT",
+            message="An MPI process of the calculation was killed.",
+        )
 
     def prepare_for_submission(self, folder):
         """
@@ -122,23 +396,59 @@ class DMRGCalculation(CalcJob):
         """
         # Get the settings dictionary, or an empty one if not specified
 
+        parameters = self.inputs.parameters.get_dict()
+        local_copy_list = []
+        couplings = self.inputs.get("couplings")
+        settings = (
+            self.inputs.get("settings", {}).get_dict()
+            if "settings" in self.inputs
+            else {}
+        )
+
+        # The sites are relabeled to shorten the range of the couplings,
+        # the parser maps the per-site outputs back to the input sites
+        order = None
+        if "reorder" in settings:
+            order = self._get_site_order(settings["reorder"])
+            with folder.open(SITE_ORDER_FILE, "w") as handle:
+                handle.write(" ".join(map(str, order.tolist())))
+
+        # The dense J matrix is copied as a binary file, and only
+        # its filename is passed in place of the matrix on stdin
+        if "coupling_matrix" in self.inputs:
+            coupling_matrix = self.inputs.coupling_matrix
+            source, filename = get_coupling_matrix_file(
+                coupling_matrix, parameters["N_sites"]
+            )
+            if order is None:
+                copy_info = (coupling_matrix.uuid, source, filename)
+                local_copy_list.append(copy_info)
+            else:
+                name = coupling_matrix.get_arraynames()[0]
+                matrix = coupling_matrix.get_array(name)
+                with folder.open(filename, "wb") as handle:
+                    np.save(handle, permute_matrix(matrix, order))
+            parameters["J"] = filename
+        elif couplings is not None and order is not None:
+            edges = get_edge_list(couplings, parameters["N_sites"])
+            edges = permute_couplings(*edges, order)
+            parameters["J"] = render_edge_list(*edges)
+            couplings = None
+
         # Generate the input file
         input_string = DMRGCalculation._render_input_string_from_params(
-            self.inputs.parameters.get_dict()
+            parameters,
+            couplings,
         )
 
         with open(folder.get_abs_path(self.INPUT_FILE), "w") as out_file:
             out_file.write(input_string)
 
-        settings = (
-            self.inputs.get("settings", {}).get_dict()
-            if "settings" in self.inputs
-            else {}
-        )
-
         codeinfo = CodeInfo()
         codeinfo.code_uuid = self.inputs.code.uuid
-        codeinfo.cmdline_params = settings.pop("cmdline", [])
+        codeinfo.cmdline_params = get_julia_cmdline(
+            settings.get("julia", {})
+        ) + settings.pop("cmdline", [])
         codeinfo.stdin_name = self.INPUT_FILE
         codeinfo.stdout_name = self.OUTPUT_FILE
         codeinfo.stderr_name = self.OUTPUT_FILE
@@ -147,7 +457,7 @@ class DMRGCalculation(CalcJob):
         # create calculation info
         calcinfo = CalcInfo()
         calcinfo.remote_copy_list = []
-        calcinfo.local_copy_list = []
+        calcinfo.local_copy_list = local_copy_list
         calcinfo.uuid = self.uuid
         calcinfo.cmdline_params = codeinfo.cmdline_params
         calcinfo.stdin_name = self.INPUT_FILE
@@ -155,6 +465,23 @@ class DMRGCalculation(CalcJob):
         calcinfo.stderr_name = self.OUTPUT_FILE
         calcinfo.codes_info = [codeinfo]
         calcinfo.retrieve_list = [self.OUTPUT_FILE]
+        if order is not None:
+            calcinfo.retrieve_list.append(SITE_ORDER_FILE)
+
+        # Further files are only retrieved temporarily, the parser stores
+        # those selected by the policy in the `retrieved_files` output
+        policy = get_retrieve_policy(settings)
+        calcinfo.retrieve_temporary_list = get_retrieve_temporary_list(policy)
+
+        # The HDF5 files are only needed once to extract their metadata,
+        # the artifacts are only stored if their content is new
+        patterns = settings.get("artifacts", [])
+        if hdf5_requested(parameters):
+            patterns = [HDF5_PATTERN] + patterns
+        for pattern in patterns:
+            entry = (pattern, ".", None)
+            if entry not in calcinfo.retrieve_temporary_list:
+                calcinfo.retrieve_temporary_list.append(entry)
 
         # symlink or copy to parent calculation
         calcinfo.remote_symlink_list = []
@@ -168,26 +495,37 @@ class DMRGCalculation(CalcJob):
             else:
                 calcinfo.remote_copy_list.append(copy_info)
 
-        calcinfo.retrieve_list.append(self.PARENT_FOLDER_NAME)
-
         return calcinfo
 
+    def _get_site_order(self, method):
+        """Return the ordering of the sites of the given method."""
+        n_sites = self.inputs.parameters["N_sites"]
+        if method == "entanglement":
+            mutual_information = self.inputs.mutual_information
+            name = mutual_information.get_arraynames()[0]
+            weights = mutual_information.get_array(name)
+        elif "couplings" in self.inputs:
+            edges = get_edge_list(self.inputs.couplings, n_sites)
+            weights = get_weight_matrix(*edges, n_sites)
+        else:
+            coupling_matrix = self.inputs.coupling_matrix
+            name = coupling_matrix.get_arraynames()[0]
+            weights = coupling_matrix.get_array(name)
+        return get_site_order(method, weights)
+
     @classmethod
-    def _render_input_string_from_params(cls, parameters):
-        """Convert dictionary parameters to Julia command line arguments"""
-        param_order = [
-            "S",
-            "N_sites",
-            "cutoff",
-            "J",
-            "Sz",
-            "n_excitations",
-            "conserve_symmetry",
-            "print_HDF5",
-            "maximal_energy",
-        ]
+    def _render_input_string_from_params(cls, parameters, couplings=None):
+        """Convert dictionary parameters to Julia command line arguments
+
+        If sparse `couplings` are given, they are rendered as the edge list
+        token ``edges[i,j,J_ij;...]`` in place of `J`.
+        """
+        if couplings is not None:
+            edges = render_couplings(couplings, parameters["N_sites"])
+            parameters = {**parameters, "J": edges}
+
         ordered_params = []
-        for key in param_order:
+        for key in cls.PARAMETER_KEYS:
             if key in parameters:
                 value = parameters[key]
                 ordered_params.append(f"{value}")
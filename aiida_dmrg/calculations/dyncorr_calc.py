@@ -1,6 +1,42 @@
 from aiida.common import CalcInfo, CodeInfo
 from aiida.engine import CalcJob
-from aiida.orm import Dict, RemoteData
+from aiida.orm import ArrayData, Dict, FolderData, RemoteData
+
+from ..utils.julia import get_julia_cmdline
+from ..utils.retrieve import get_retrieve_policy, get_retrieve_temporary_list
+from . import dmrggen
+from .nodes import DynCorrCalcJobNode
+
+# Keys of the settings used by the dynamical correlator calculation
+SETTINGS_KEYS = ("cmdline", "julia", "retrieve")
+
+
+def validate_parameters(parameters, _):
+    """Validate the `parameters` input of the calculation."""
+    parameters = parameters.get_dict()
+    if "omega_min" not in parameters:
+        return None
+    # The positional input needs `N` before `omega_min`, and the empirical
+    # `N` of the code would differ between windows of the same grid
+    if "N" not in parameters:
+        return "`N` is required in `parameters` to use `omega_min`."
+    if not 0 <= parameters["omega_min"] <= parameters["E_range"]:
+        return "`omega_min` must be between 0 and `E_range`."
+    return None
+
+
+def validate_settings(settings, port):
+    """Validate the `settings` input of the calculation.
+
+    Only the keys shared with the DMRG calculation that the dynamical
+    correlator uses are accepted, see `SETTINGS_KEYS`.
+    """
+    if settings is None:
+        return None
+    unknown = set(settings.get_dict()) - set(SETTINGS_KEYS)
+    if unknown:
+        return f"Unknown `settings` keys: {', '.join(sorted(unknown))}."
+    return dmrggen.validate_settings(settings, port)
 
 
 class DynCorrCalculation(CalcJob):
@@ -12,6 +48,12 @@ class DynCorrCalculation(CalcJob):
     OUTPUT_FILE = "dyncorr.out"
     DEFAULT_PARSER = "dyncorr"
 
+    # Hashes the canonical form of the inputs for caching
+    _node_class = DynCorrCalcJobNode
+
+    # The parameters passed to the code, in the order of the input line
+    PARAMETER_KEYS = ("E_range", "num_points", "N", "omega_min")
+
     @classmethod
     def define(cls, spec):
         super().define(spec)
@@ -19,7 +61,10 @@ class DynCorrCalculation(CalcJob):
             "parameters",
             valid_type=Dict,
             required=True,
-            help="Input parameters for DynCorr calculation",
+            validator=validate_parameters,
+            help="""Input parameters for DynCorr calculation. With
+            `omega_min`, only the window from `omega_min` to `E_range` is
+            computed.""",
         )
         spec.input(
             "metadata.options.parser_name",
@@ -32,12 +77,28 @@ class DynCorrCalculation(CalcJob):
             valid_type=RemoteData,
             help="Parent calculation folder",
         )
+        spec.input(
+            "settings",
+            valid_type=Dict,
+            required=False,
+            validator=validate_settings,
+            help="""Additional `cmdline` parameters, the `julia` launcher
+            options and the `retrieve` policy of the files to store
+            besides the output log""",
+        )
 
         spec.output(
             "output_matrix",
-            valid_type=Dict,
+            valid_type=ArrayData,
             required=True,
-            help="Dynamic correlator matrix",
+            help="""Dynamic correlator `matrix` and the `omega` grid
+            it was evaluated on""",
+        )
+        spec.output(
+            "retrieved_files",
+            valid_type=FolderData,
+            required=False,
+            help="Files selected by the retrieve policy of the settings",
         )
 
         spec.exit_code(
@@ -81,7 +142,9 @@ class DynCorrCalculation(CalcJob):
 
         codeinfo = CodeInfo()
         codeinfo.code_uuid = self.inputs.code.uuid
-        codeinfo.cmdline_params = settings.pop("cmdline", [])
+        codeinfo.cmdline_params = get_julia_cmdline(
+            settings.get("julia", {})
+        ) + settings.pop("cmdline", [])
         codeinfo.stdin_name = self.INPUT_FILE
         codeinfo.stdout_name = self.OUTPUT_FILE
         codeinfo.stderr_name = self.OUTPUT_FILE
@@ -106,6 +169,9 @@ class DynCorrCalculation(CalcJob):
         calcinfo.codes_info = [codeinfo]
         calcinfo.retrieve_list = [self.OUTPUT_FILE]
 
+        policy = get_retrieve_policy(settings)
+        calcinfo.retrieve_temporary_list = get_retrieve_temporary_list(policy)
+
         calcinfo.remote_symlink_list = []
         calcinfo.remote_copy_list = []
         if "parent_calc_folder" in self.inputs:
@@ -117,15 +183,12 @@ class DynCorrCalculation(CalcJob):
             else:
                 calcinfo.remote_copy_list.append(copy_info)
 
-        calcinfo.retrieve_list.append("parent_calc_folder/")
-
         return calcinfo
 
     def _render_input(self, input_params):
         """Render the input file."""
-        param_order = ["E_range", "num_points", "N"]
         ordered_params = []
-        for key in param_order:
+        for key in self.PARAMETER_KEYS:
             if key in input_params:
                 value = input_params[key]
                 ordered_params.append(f"{value}")
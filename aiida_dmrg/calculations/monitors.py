@@ -0,0 +1,194 @@
+"""Monitor stopping DMRG calculations that will not finish usefully.
+
+The monitor is added to the `monitors` input of a `DMRGCalculation`::
+
+    inputs["monitors"] = {
+        "progress": Dict(
+            {
+                "entry_point": "dmrg.progress",
+                "minimum_poll_interval": 600,
+                "kwargs": {"stall_seconds": 7200},
+            }
+        )
+    }
+
+Every call fetches only the part of the output log written since the
+previous call, with ``tail`` over the transport, and follows the sweep
+summaries. The job is killed, releasing its allocation, when
+
+- no sweep finished within `stall_seconds` after the log appeared or the
+  last sweep: `ERROR_STALLED`;
+- the memory estimated from the bond dimension reached exceeds the
+  `memory_fraction` of `max_memory_kb`: `ERROR_MEMORY_GROWTH`;
+- the energy of a state is not finite, or rises above the lowest energy
+  of the state by more than `energy_tolerance` relative to it, although
+  DMRG is variational: `ERROR_ENERGY_DIVERGED`.
+
+The parser then stores the progress made, like for a run stopped by a
+resource limit, and returns the exit code recorded by the monitor.
+"""
+
+import math
+import time
+
+from aiida.common.escaping import escape_for_bash
+from aiida.engine.processes.calcjobs.monitors import (
+    CalcJobMonitorAction,
+    CalcJobMonitorResult,
+)
+from aiida.schedulers.datastructures import JobState
+
+from ..parsers.dmrg import (
+    MONITOR_ATTRIBUTE,
+    SWEEP_MARKER,
+    TOTAL_TIME_MARKER,
+    DMRGBaseParser,
+)
+from ..utils.resources import estimate_memory_kb
+
+PROCESS_TYPE = "aiida.calculations:dmrg"
+
+# Largest part of the log fetched in one call
+TAIL_BYTES = 1024**2
+
+
+def fetch_log_tail(transport, path, offset, max_bytes=TAIL_BYTES):
+    """Return the complete lines of a remote file after a byte offset.
+
+    :return: tuple of the lines and the offset after them, or None if the
+        file does not exist yet.
+    """
+    path = escape_for_bash(path)
+    tail = f"tail -c +{offset + 1} {path} | head -c {max_bytes}"
+    command = f"test -f {path} && {tail}"
+    retval, stdout, _ = transport.exec_command_wait_bytes(command)
+    if retval != 0:
+        return None
+
+    # An incomplete last line is fetched again by the next call, unless
+    # it fills the whole chunk
+    end = stdout.rfind(b"\n") + 1
+    if end == 0 and len(stdout) >= max_bytes:
+        end = len(stdout)
+    text = stdout[:end].decode("utf-8", "replace")
+    return text.splitlines(), offset + end
+
+
+def check_sweep(state, row, energy_tolerance, sign=1):
+    """Update the monitor state with a sweep and check its energy.
+
+    :param state: dictionary of the monitor state, updated in place.
+    :param row: the sweep as (state, sweep, energy, maxlinkdim, maxerr,
+        time), see `DMRGBaseParser._parse_sweep`.
+    :param energy_tolerance: largest relative rise of the energy.
+    :param sign: -1 if the highest states are computed, whose energies
+        rise during the sweeps.
+    :return: the reason to stop the calculation, or None.
+    """
+    index, sweep, energy = row[:3]
+    if index != state.get("state"):
+        state["state"] = index
+        state["best_energy"] = None
+    state["sweep"] = sweep
+    state["bond_dimension"] = max(state.get("bond_dimension", 0), row[3])
+
+    if not math.isfinite(energy):
+        return f"the energy of state {index} is {energy} after sweep {sweep}"
+    best = state["best_energy"]
+    if best is not None:
+        rise = sign * (energy - best)
+        if rise > energy_tolerance * max(abs(best), 1.0):
+            return (
+                f"the energy of state {index} rose from {best} to {energy} "
+                f"in sweep {sweep}"
+            )
+    if best is None or sign * (energy - best) < 0:
+        state["best_energy"] = energy
+    return None
+
+
+def monitor_progress(
+    node,
+    transport,
+    stall_seconds=3600,
+    energy_tolerance=1e-3,
+    memory_fraction=0.9,
+    max_memory_kb=None,
+):
+    """Kill a calculation that stalls, outgrows its memory or diverges.
+
+    :param node: the `CalcJobNode` of a running `DMRGCalculation`.
+    :param transport: an open transport to the computer of the job.
+    :param stall_seconds: longest time without a finished sweep.
+    :param energy_tolerance: largest rise of the energy of a state, relative
+        to its lowest energy.
+    :param memory_fraction: fraction of the memory limit that the estimated
+        memory may use.
+    :param max_memory_kb: the memory limit, by default the `max_memory_kb`
+        option of the calculation.
+    :return: a `CalcJobMonitorResult` if the job is to be killed.
+    """
+    if node.process_type != PROCESS_TYPE:
+        return CalcJobMonitorResult(
+            message=f"not a DMRGCalculation: {node.process_type}",
+            action=CalcJobMonitorAction.DISABLE_SELF,
+            override_exit_code=False,
+        )
+    if node.get_scheduler_state() == JobState.DONE:
+        return None
+
+    state = dict(node.base.attributes.get(MONITOR_ATTRIBUTE, {}))
+    path = f"{node.get_remote_workdir()}/{node.process_class.OUTPUT_FILE}"
+    tail = fetch_log_tail(transport, path, state.get("offset", 0))
+    if tail is None:
+        return None
+    lines, state["offset"] = tail
+
+    now = time.time()
+    state.setdefault("progress_time", now)
+    parameters = node.inputs.parameters.get_dict()
+    maximal_energy = str(parameters.get("maximal_energy")).lower() == "true"
+    sign = -1 if maximal_energy else 1
+
+    exit_code, reason = None, None
+    previous = None
+    if "sweep" in state:
+        previous = (state["state"], state["sweep"])
+    for line in lines:
+        if TOTAL_TIME_MARKER in line:
+            state["finished"] = True
+        if SWEEP_MARKER not in line:
+            continue
+        row = DMRGBaseParser._parse_sweep(line, previous)
+        if row is None:
+            continue
+        previous = row[:2]
+        state["progress_time"] = now
+        reason = check_sweep(state, row, energy_tolerance, sign)
+        if reason is not None:
+            exit_code = "ERROR_ENERGY_DIVERGED"
+            break
+
+    max_memory_kb = max_memory_kb or node.get_option("max_memory_kb")
+    bond_dimension = state.get("bond_dimension")
+    if exit_code is None and max_memory_kb and bond_dimension:
+        memory_kb = estimate_memory_kb(parameters, bond_dimension)
+        if memory_kb > memory_fraction * max_memory_kb:
+            exit_code = "ERROR_MEMORY_GROWTH"
+            reason = (
+                f"the bond dimension {bond_dimension} needs about "
+                f"{memory_kb} kB of the {max_memory_kb} kB available"
+            )
+
+    stalled = now - state["progress_time"]
+    if exit_code is None and not state.get("finished"):
+        if stalled > stall_seconds:
+            exit_code = "ERROR_STALLED"
+            reason = f"no sweep finished in {int(stalled)} seconds"
+
+    state["exit_code"] = exit_code
+    node.base.attributes.set(MONITOR_ATTRIBUTE, state)
+    if exit_code is None:
+        return None
+    # The parser returns the exit code recorded in the state
+    return CalcJobMonitorResult(message=reason, override_exit_code=False)
@@ -0,0 +1,55 @@
+"""Nodes of the DMRG and dynamical correlator calculations."""
+
+from aiida.common.links import LinkType
+from aiida.orm import CalcJobNode
+from aiida.orm.nodes.process.calculation.calcjob import CalcJobNodeCaching
+
+from ..parsers.dmrg import MONITOR_ATTRIBUTE
+from ..utils.caching import hash_inputs
+
+
+class CanonicalCalcJobNodeCaching(CalcJobNodeCaching):
+    """Caching of calculations by the canonical form of their inputs."""
+
+    def get_objects_to_hash(self):
+        """Return the objects to hash, with the canonical input hashes."""
+        objects = super().get_objects_to_hash()
+        links = self._node.base.links
+        incoming = links.get_incoming(link_type=LinkType.INPUT_CALC).all()
+        inputs = {entry.link_label: entry.node for entry in incoming}
+        parameter_keys = self._node.process_class.PARAMETER_KEYS
+
+        for label, value in hash_inputs(inputs, parameter_keys).items():
+            if value is None:
+                objects["inputs"].pop(label, None)
+            else:
+                objects["inputs"][label] = value
+        return objects
+
+
+class CanonicalCalcJobNode(CalcJobNode):
+    """Node of a calculation that is cached by its physics.
+
+    The calculations have their own subclass, so that they can be queried
+    and cached separately.
+    """
+
+    _CLS_NODE_CACHING = CanonicalCalcJobNodeCaching
+
+
+class DMRGCalcJobNode(CanonicalCalcJobNode):
+    """Node of a `DMRGCalculation`."""
+
+    # The state of the progress monitor is updated while the job runs
+    _updatable_attributes = (
+        *CalcJobNode._updatable_attributes,
+        MONITOR_ATTRIBUTE,
+    )
+    _hash_ignored_attributes = (
+        *CalcJobNode._hash_ignored_attributes,
+        MONITOR_ATTRIBUTE,
+    )
+
+
+class DynCorrCalcJobNode(CanonicalCalcJobNode):
+    """Node of a `DynCorrCalculation`."""
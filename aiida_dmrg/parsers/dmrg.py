@@ -1,16 +1,102 @@
 """AiiDA-DMRG output parser"""
 
+import io
+import pathlib
 import re
 
+import numpy as np
 from aiida.common import NotExistent
 from aiida.engine import ExitCode
-from aiida.orm import Dict
+from aiida.orm import ArrayData, Dict
 from aiida.parsers import Parser
 
+from ..utils.artifacts import collect_artifacts
+from ..utils.couplings import COUPLING_MATRIX_NAME
+from ..utils.hdf5 import HDF5_PATTERN, hdf5_requested, summarize_hdf5
+from ..utils.reorder import SITE_ORDER_FILE, restore_site_order
+from ..utils.retrieve import collect_retrieved_files, get_retrieve_policy
+from .utils import ErrorScanner, read_array
+
+# Markers of the array sections in the log, mapped to their output keys.
+# The array itself is printed on the line following the marker.
+ARRAY_MARKERS = {
+    "List of E:": "energies",
+    "List of S²:": "spin_squared",
+    "List of Sz(i):": "spin_z",
+}
+SECTION_SEPARATOR = "----------"
+TOTAL_TIME_MARKER = "total time = "
+
+# Ordered by priority: the first matching message determines the exit
+# code, independent of where it appears in the log. Any other line with
+# "Error" or "ERROR" marks a failed calculation.
+ERROR_SCANNER = ErrorScanner(
+    [
+        (
+            "Usage: julia DMRG_template_pll_Energyextrema.jl",
+            "ERROR_READING_INPUT_FILE",
+        ),
+        ("Failed to read from stdin", "ERROR_READING_INPUT_FILE"),
+        ("Check s", "ERROR_UNPHYISCAL_INPUT"),
+        ("J matrix not properly closed with ']'.", "ERROR_J_VALUE"),
+        (
+            "All rows in J matrix must have the same number of columns.",
+            "ERROR_J_VALUE",
+        ),
+        ("Failed to parse J", "ERROR_J_VALUE"),
+        (
+            "Sz must be provided when conserve_symmetry is true.",
+            "ERROR_UNPHYISCAL_INPUT",
+        ),
+        ("J matrix dimensions", "ERROR_J_VALUE"),
+        ("J must either be a Float64 scalar or a", "ERROR_J_VALUE"),
+        # Resource limits, reported by Julia or by the job step of the
+        # scheduler in the same log
+        ("OutOfMemoryError", "ERROR_SCHEDULER_OUT_OF_MEMORY"),
+        ("oom-kill", "ERROR_SCHEDULER_OUT_OF_MEMORY"),
+        ("Out Of Memory", "ERROR_SCHEDULER_OUT_OF_MEMORY"),
+        ("DUE TO TIME LIMIT", "ERROR_SCHEDULER_OUT_OF_WALLTIME"),
+        ("BAD TERMINATION OF ONE OF YOUR APPLICATION", "ERROR_MPI_ABORT"),
+        ("MPI_ABORT was invoked", "ERROR_MPI_ABORT"),
+        ("Killed by signal", "ERROR_MPI_ABORT"),
+        ("Error", "ERROR_CALCULATION_FAILED"),
+        ("ERROR", "ERROR_CALCULATION_FAILED"),
+    ]
+)
+
+# Errors of runs stopped by a resource limit, which keep their progress
+RESOURCE_ERRORS = (
+    "ERROR_SCHEDULER_OUT_OF_MEMORY",
+    "ERROR_SCHEDULER_OUT_OF_WALLTIME",
+    "ERROR_MPI_ABORT",
+)
+
+# Sweep summary printed by ITensors, e.g.
+# `After sweep 2 energy=-4.2580 maxlinkdim=8 maxerr=1.2E-08 time=0.031`
+SWEEP_MARKER = "After sweep"
+
+# Printed whenever the MPS is written to the checkpoint file, see the
+# `checkpoint_sweeps` parameter, e.g. `Checkpoint saved after sweep 4`
+CHECKPOINT_MARKER = "Checkpoint saved after sweep"
+SWEEP_LINE = re.compile(
+    r"After sweep\s+(?P<sweep>\d+)\s+energy=\s*(?P<energy>\S+)"
+    r"\s+maxlinkdim=\s*(?P<maxlinkdim>\d+)"
+    r"(?:\s+maxerr=\s*(?P<maxerr>\S+))?"
+    r"\s+time=\s*(?P<time>[^\s,]+)"
+)
+
+
+# Attribute in which the progress monitor of `calculations.monitors` keeps
+# its state, with the `exit_code` of a run it stopped
+MONITOR_ATTRIBUTE = "progress_monitor"
+
 
 class DMRGBaseParser(Parser):
     """Parser for DMRG output files"""
 
+    # Ordering of the sites of a calculation with reordered sites
+    _site_order = None
+
     def parse(self, **kwargs):
         """Parse the DMRG output file"""
 
@@ -22,82 +108,160 @@ class DMRGBaseParser(Parser):
             if fname not in out_folder.base.repository.list_object_names():
                 print(f"Available files: {available_files}")
                 return self.exit_codes.ERROR_OUTPUT_MISSING
-            log_file_string = out_folder.base.repository.get_object_content(
-                fname,
-            )
+            if SITE_ORDER_FILE in available_files:
+                self._parse_site_order(out_folder)
+            # Open the log in binary mode: the text mode of the repository
+            # reads the whole object into memory before returning a handle.
+            with out_folder.base.repository.open(fname, "rb") as handle:
+                log_file = io.TextIOWrapper(handle, "utf-8", "replace")
+                exit_code = self._parse_log(log_file)
         except NotExistent:
             return self.exit_codes.ERROR_NO_RETRIEVED_FOLDER
         except OSError:
             return self.exit_codes.ERROR_OUTPUT_LOG_READ
 
-        exit_code = self._parse_log(log_file_string)
+        # Files selected by the retrieve policy, also for failed runs
+        if "retrieved_temporary_folder" in kwargs:
+            self._store_retrieved_files(kwargs["retrieved_temporary_folder"])
+
         if exit_code is not None:
             return exit_code
 
+        parameters = self.node.inputs.parameters.get_dict()
+        if hdf5_requested(parameters):
+            folder = kwargs.get("retrieved_temporary_folder")
+            exit_code = self._parse_hdf5(folder)
+            if exit_code is not None:
+                return exit_code
         return ExitCode(0)
 
-    def _parse_log(self, log_file_string):
-        """Parse the DMRG output file content"""
-        ec = self.exit_codes
-        error_messages = {
-            """
-            Usage: julia DMRG_template_pll_Energyextrema.jl
-            """: ec.ERROR_READING_INPUT_FILE,
-            """Failed to read from stdin""": ec.ERROR_READING_INPUT_FILE,
-            """Check s""": ec.ERROR_UNPHYISCAL_INPUT,
-            """J matrix not properly closed with ']'.""": ec.ERROR_J_VALUE,
-            """All rows in J matrix must have the same \
-number of columns.""": ec.ERROR_J_VALUE,
-            """Failed to parse J""": ec.ERROR_J_VALUE,
-            """Sz must be provided when conserve_symmetry \
-is true.""": ec.ERROR_UNPHYISCAL_INPUT,
-            """J matrix dimensions""": ec.ERROR_J_VALUE,
-            """J must either be a Float64 scalar or a""": ec.ERROR_J_VALUE,
-        }
+    def _parse_log(self, log_file, namespace=None):
+        """Parse the DMRG output file in a single pass over its lines.
 
-        # Check for error messages
-        for message, exit_code in error_messages.items():
-            if message in log_file_string:
-                return exit_code
+        Only the lines holding the arrays are kept in memory, so the memory
+        footprint does not grow with the length of the sweep log.
+
+        :param log_file: iterable over the lines of the output file.
+        :param namespace: output namespace of the results, if any.
+        """
+        prefix = "" if namespace is None else f"{namespace}."
+        first_error = len(ERROR_SCANNER.labels)
+        total_time = None
+
+        # For every array marker: the line following it, and whether the
+        # section was closed by an empty line or a separator afterwards.
+        array_lines = {}
+        closed = set()
+        expecting = []
+
+        # One row (state, sweep, energy, maxlinkdim, maxerr, time) per sweep
+        sweeps = []
+        checkpoint_sweep = None
 
-        if "Error" in log_file_string or "ERROR" in log_file_string:
-            return self.exit_codes.ERROR_CALCULATION_FAILED
+        for line in log_file:
+            line = line.rstrip("\n")
+
+            # Stop looking for errors once the most important one is found
+            if first_error != 0:
+                index = ERROR_SCANNER.first(line)
+                if index is not None:
+                    first_error = min(index, first_error)
+
+            is_boundary = not line or SECTION_SEPARATOR in line
+            for key in array_lines:
+                if is_boundary and key not in expecting:
+                    closed.add(key)
+
+            for key in expecting:
+                # An empty line right after the marker means no data
+                array_lines[key] = line.strip() if line else None
+            expecting = []
+
+            for marker, key in ARRAY_MARKERS.items():
+                if key not in array_lines and marker in line:
+                    array_lines[key] = None
+                    expecting.append(key)
+
+            if SWEEP_MARKER in line:
+                row = self._parse_sweep(line, sweeps[-1] if sweeps else None)
+                if row is not None:
+                    sweeps.append(row)
+
+            if CHECKPOINT_MARKER in line:
+                value = line.split(CHECKPOINT_MARKER, 1)[1].split()
+                if value and value[0].isdigit():
+                    checkpoint_sweep = int(value[0])
+
+            if total_time is None and TOTAL_TIME_MARKER in line:
+                value = line.split(TOTAL_TIME_MARKER, 1)[1]
+                if value:
+                    total_time = value.strip()
+
+        error = None
+        if first_error < len(ERROR_SCANNER.labels):
+            error = ERROR_SCANNER.labels[first_error]
+        if error is not None and error not in RESOURCE_ERRORS:
+            return getattr(self.exit_codes, error)
 
         try:
             # Parse the arrays
-            energy_list = self._extract_array(
-                log_file_string,
-                "List of E:",
-            )
-            s_squared_list = self._extract_array(
-                log_file_string,
-                "List of S²:",
-            )
-            sz_list = self._extract_array(
-                log_file_string,
-                "List of Sz(i):",
-            )
-
-            # Parse the total time
-            time_match = re.search(
-                r"total time = (.+?)$", log_file_string, re.MULTILINE
-            )
-            if time_match:
-                total_time = time_match.group(1).strip()
+            arrays = {}
+            for key in ARRAY_MARKERS.values():
+                if key in closed:
+                    value = self._extract_array(array_lines[key])
+                    if value is not None:
+                        arrays[key] = value
+
+            # The code computed the reordered chain
+            order = self._site_order
+            if order is not None and "spin_z" in arrays:
+                spin_z = restore_site_order(arrays["spin_z"], order)
+                arrays["spin_z"] = spin_z
+
+            # A run stopped by the monitor, a resource limit or by the
+            # scheduler keeps its exit code, with the progress made for a
+            # restart
+            if error is not None:
+                killed_exit_code = getattr(self.exit_codes, error)
             else:
-                total_time = None
+                killed_exit_code = self._get_scheduler_exit_code()
+            stopped_exit_code = self._get_monitor_exit_code()
+            killed_exit_code = stopped_exit_code or killed_exit_code
+            if total_time is None and killed_exit_code is None:
                 return self.exit_codes.ERROR_OUTPUT_MISSING
 
-            # Create output dictionary
-            output_dict = {
-                "energies": energy_list,
-                "spin_squared": s_squared_list,
-                "spin_z": sz_list,
-                "total_time": total_time,
-            }
+            # Only scalar summaries go to the dictionary, the arrays
+            # themselves are stored as binary files in an ArrayData node
+            output_dict = {}
+            if total_time is not None:
+                output_dict["total_time"] = total_time
+            energies = arrays.get("energies")
+            if energies is not None and energies.size:
+                output_dict["n_states"] = int(energies.size)
+                output_dict["energy_min"] = float(energies.min())
+                output_dict["energy_max"] = float(energies.max())
+            spin_z = arrays.get("spin_z")
+            if spin_z is not None and spin_z.size:
+                output_dict["n_sites"] = int(spin_z.shape[-1])
+
+            if checkpoint_sweep is not None:
+                output_dict["checkpoint_sweep"] = checkpoint_sweep
+
+            if sweeps:
+                output_sweeps, summary = self._build_sweeps(sweeps)
+                output_dict.update(summary)
+                self.out(f"{prefix}output_sweeps", output_sweeps)
 
             # Store results in output nodes
-            self.out("output_parameters", Dict(dict=output_dict))
+            self.out(f"{prefix}output_parameters", Dict(output_dict))
+            if error is not None or total_time is None:
+                return killed_exit_code
+
+            if arrays:
+                output_arrays = ArrayData()
+                for key, value in arrays.items():
+                    output_arrays.set_array(key, value)
+                self.out(f"{prefix}output_arrays", output_arrays)
 
         except Exception as exc:
             print(f"Error during parsing: {str(exc)}")
@@ -105,27 +269,171 @@ is true.""": ec.ERROR_UNPHYISCAL_INPUT,
         else:
             return None
 
-    def _extract_array(self, content, marker):
-        """Extract array data following a marker string"""
+    def _parse_site_order(self, out_folder):
+        """Read the ordering of the sites of a reordered calculation."""
+        repository = out_folder.base.repository
+        content = repository.get_object_content(SITE_ORDER_FILE)
+        self._site_order = np.array(content.split(), dtype=np.int64)
+        site_order = ArrayData()
+        site_order.set_array("order", self._site_order)
+        self.out("site_order", site_order)
+
+    def _get_monitor_exit_code(self):
+        """Return the exit code of a run stopped by the monitor, if any."""
+        state = self.node.base.attributes.get(MONITOR_ATTRIBUTE, None)
+        if not state or state.get("exit_code") is None:
+            return None
+        return getattr(self.exit_codes, state["exit_code"])
+
+    def _get_scheduler_exit_code(self):
+        """Return the exit code set by the scheduler, if there is one."""
+        if not self.node.exit_status:
+            return None
+        return ExitCode(self.node.exit_status, self.node.exit_message)
+
+    @staticmethod
+    def _parse_sweep(line, previous):
+        """Convert a sweep summary line into a row of the sweep table.
+
+        The sweep counter restarts for every excitation, which starts a new
+        state.
+
+        :param line: the line of the log.
+        :param previous: the row of the previous sweep, if there is one.
+        :return: the row, or None if the line is not a complete summary.
+        """
+        match = SWEEP_LINE.search(line)
+        if match is None:
+            return None
         try:
-            # Find the marker line
-            start_idx = content.find(marker)
-            if start_idx == -1:
-                return None
-
-            # Get the line containing the array
-            end_idx = content.find("\n\n", start_idx)
-            if end_idx == -1:
-                end_idx = content.find("----------", start_idx)
-            if end_idx == -1:
-                return None
-            else:
-                array_str = content[start_idx:end_idx].split("\n")[1].strip()
+            sweep = int(match["sweep"])
+            maxerr = match["maxerr"]
+            row = [
+                0,
+                sweep,
+                float(match["energy"]),
+                int(match["maxlinkdim"]),
+                np.nan if maxerr is None else float(maxerr),
+                float(match["time"]),
+            ]
+        except ValueError:
+            return None
+
+        if previous is not None:
+            row[0] = previous[0] + (sweep <= previous[1])
+        return tuple(row)
+
+    @staticmethod
+    def _build_sweeps(sweeps):
+        """Store the sweep table as columns and summarize it.
+
+        :param sweeps: rows of (state, sweep, energy, maxlinkdim, maxerr,
+            time), one per sweep.
+        :return: tuple of the `ArrayData` and a dictionary of statistics.
+        """
+        state, sweep, energy, maxlinkdim, maxerr, time = zip(*sweeps)
+        columns = {
+            "state": np.array(state, dtype=np.int64),
+            "sweep": np.array(sweep, dtype=np.int64),
+            "energy": np.array(energy),
+            "maxlinkdim": np.array(maxlinkdim, dtype=np.int64),
+            "maxerr": np.array(maxerr),
+            "time": np.array(time),
+        }
+        output_sweeps = ArrayData()
+        for key, value in columns.items():
+            output_sweeps.set_array(key, value)
+
+        summary = {
+            "n_sweeps": len(sweeps),
+            "sweep_time": float(columns["time"].sum()),
+            "max_bond_dimension": int(columns["maxlinkdim"].max()),
+        }
+        truncation = columns["maxerr"]
+        if not np.all(np.isnan(truncation)):
+            summary["max_truncation_error"] = float(np.nanmax(truncation))
+
+        # Discarded weight in the last sweep of the ground state, the one
+        # its energy is extrapolated in
+        final = truncation[columns["state"] == 0][-1:]
+        if final.size and not np.isnan(final[0]):
+            summary["final_truncation_error"] = float(final[0])
 
-                # Convert string representation to Python list/array
-                array_data = eval(array_str)
-                return array_data
+        # Energy change in the last sweep of every state, a measure of the
+        # convergence reached with the given cutoff
+        last = np.flatnonzero(np.diff(columns["state"], append=-1))
+        changes = [
+            abs(energy[index] - energy[index - 1])
+            for index in last
+            if index > 0 and state[index - 1] == state[index]
+        ]
+        if changes:
+            summary["max_final_energy_change"] = float(max(changes))
+
+        return output_sweeps, summary
+
+    def _parse_hdf5(self, folder):
+        """Store the metadata of the temporarily retrieved HDF5 files.
+
+        The files are deleted with the temporary folder after parsing, the
+        full tensors are only kept in the remote folder.
+
+        :param folder: path of the temporary folder retrieved by the engine.
+        """
+        if folder is None:
+            return self.exit_codes.ERROR_HDF5_WRITE
+
+        input_file = f"{COUPLING_MATRIX_NAME}.h5"
+        filepaths = [
+            filepath
+            for filepath in sorted(pathlib.Path(folder).glob(HDF5_PATTERN))
+            if filepath.name != input_file
+        ]
+        if not filepaths:
+            return self.exit_codes.ERROR_HDF5_WRITE
+
+        try:
+            files = [summarize_hdf5(filepath) for filepath in filepaths]
+        except OSError as exc:
+            self.logger.error(f"Error reading HDF5 file: {exc}")
+            return self.exit_codes.ERROR_HDF5_WRITE
+
+        metadata = {"files": files}
+        remote_folder = self.node.outputs.remote_folder
+        metadata["remote_path"] = remote_folder.get_remote_path()
+        metadata["computer"] = remote_folder.computer.label
+        self.out("hdf5_metadata", Dict(metadata))
+        return None
+
+    def _extract_array(self, array_str):
+        """Convert the line following an array marker into an array"""
+        if not array_str:
+            return None
+        try:
+            return read_array(array_str)
 
         except Exception as exc:
             print(f"Error extracting array data: {str(exc)}")
             return None
+
+    def _store_retrieved_files(self, folder):
+        """Store the temporarily retrieved files selected by the settings.
+
+        Artifacts whose content is already stored are only referenced in
+        the `artifact_index` output.
+        """
+        settings = {}
+        if "settings" in self.node.inputs:
+            settings = self.node.inputs.settings.get_dict()
+
+        policy = get_retrieve_policy(settings)
+        retrieved_files = collect_retrieved_files(folder, policy, self.logger)
+        if retrieved_files is not None:
+            self.out("retrieved_files", retrieved_files)
+
+        patterns = settings.get("artifacts")
+        if patterns:
+            index, new_artifacts = collect_artifacts(folder, patterns)
+            for label, artifact in new_artifacts.items():
+                self.out(f"artifacts.{label}", artifact)
+            self.out("artifact_index", Dict({"files": index}))
@@ -0,0 +1,56 @@
+"""AiiDA-DMRG parser of a batch of DMRG tasks"""
+
+import io
+
+from aiida.common import NotExistent
+from aiida.engine import ExitCode
+from aiida.orm import Dict
+
+from .dmrg import DMRGBaseParser
+
+
+class DMRGBatchParser(DMRGBaseParser):
+    """Parser splitting the logs of a batch into the outputs of its tasks"""
+
+    def parse(self, **kwargs):
+        """Parse the DMRG output file of every task"""
+
+        fname = self.node.process_class.OUTPUT_FILE
+        labels = sorted(self.node.inputs.tasks)
+
+        try:
+            repository = self.retrieved.base.repository
+        except NotExistent:
+            return self.exit_codes.ERROR_NO_RETRIEVED_FOLDER
+
+        status = {}
+        for label in labels:
+            exit_code = self._parse_task(repository, f"{label}/{fname}", label)
+            exit_code = exit_code or ExitCode(0)
+            status[label] = {
+                "exit_status": exit_code.status,
+                "exit_message": exit_code.message,
+            }
+        self.out("task_status", Dict(status))
+
+        # A batch stopped by the scheduler keeps its exit code
+        scheduler_exit_code = self._get_scheduler_exit_code()
+        if scheduler_exit_code is not None:
+            return scheduler_exit_code
+
+        failed = [label for label in labels if status[label]["exit_status"]]
+        if failed:
+            exit_code = self.exit_codes.ERROR_TASKS_FAILED
+            return exit_code.format(tasks=", ".join(failed))
+        return ExitCode(0)
+
+    def _parse_task(self, repository, path, label):
+        """Parse the log of a task into the outputs of its namespace."""
+        try:
+            with repository.open(path, "rb") as handle:
+                log_file = io.TextIOWrapper(handle, "utf-8", "replace")
+                return self._parse_log(log_file, f"tasks.{label}")
+        except FileNotFoundError:
+            return self.exit_codes.ERROR_OUTPUT_MISSING
+        except OSError:
+            return self.exit_codes.ERROR_OUTPUT_LOG_READ
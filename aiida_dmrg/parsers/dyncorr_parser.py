@@ -1,10 +1,19 @@
-import ast
-
+import numpy as np
 from aiida.common import NotExistent
 from aiida.engine import ExitCode
-from aiida.orm import Dict
+from aiida.orm import ArrayData
 from aiida.parsers import Parser
 
+from ..utils.retrieve import collect_retrieved_files, get_retrieve_policy
+from .utils import ErrorScanner, read_julia_matrix
+
+ERROR_SCANNER = ErrorScanner(
+    [
+        ("Error:", "ERROR_CALCULATION_FAILED"),
+        ("ERROR", "ERROR_CALCULATION_FAILED"),
+    ]
+)
+
 
 class DynCorrParser(Parser):
     """Parser for Dynamic Correlator output files."""
@@ -28,6 +37,10 @@ class DynCorrParser(Parser):
         except OSError:
             return self.exit_codes.ERROR_OUTPUT_LOG_READ
 
+        # Files selected by the retrieve policy, also for failed runs
+        if "retrieved_temporary_folder" in kwargs:
+            self._store_retrieved_files(kwargs["retrieved_temporary_folder"])
+
         exit_code = self._parse_output(log_file_string)
         if exit_code is not None:
             return exit_code
@@ -37,8 +50,9 @@ class DynCorrParser(Parser):
     def _parse_output(self, content):
         """Parse the Dynamic Correlator output file content."""
 
-        if "Error:" in content or "ERROR" in content:
-            return self.exit_codes.ERROR_CALCULATION_FAILED
+        error = ERROR_SCANNER.scan(content)
+        if error is not None:
+            return getattr(self.exit_codes, error)
 
         try:
             # Parse the arrays
@@ -46,7 +60,7 @@ class DynCorrParser(Parser):
             if output_matrix is None:
                 return self.exit_codes.ERROR_PARSING_OUTPUT
             else:
-                self.out("output_matrix", Dict(dict={"matrix": output_matrix}))
+                self.out("output_matrix", self._build_output(output_matrix))
                 return None
 
         except Exception:
@@ -57,22 +71,58 @@ class DynCorrParser(Parser):
 
         try:
             start_idx = content.find("[")
-            end_idx = content.find("]", start_idx + 5) + 1
-            if start_idx + 1 == end_idx:
+            if start_idx == -1:
                 return None
-            else:
-                matrix_string = content[start_idx:end_idx].split("\n")[0]
-
-                # Convert the matrix string to a Python list/array
-                formatted_matrix_string = matrix_string.replace(
-                    "; ",
-                    "],[",
-                ).replace(" ", ", ")
-                output_matrix = ast.literal_eval(
-                    f"[{formatted_matrix_string}]",
-                )
-                return output_matrix
+            matrix_string = content[start_idx:].split("\n")[0]
+            matrix_string = matrix_string[: matrix_string.rfind("]") + 1]
+            return read_julia_matrix(matrix_string)
 
         except Exception as exception:
             print(f"Error extracting output matrix: {exception}")
             return None
+
+    def _build_output(self, matrix):
+        """Wrap the matrix in an `ArrayData` together with its omega grid.
+
+        The grid is reconstructed from the `E_range`, `num_points` and
+        `omega_min` input parameters. The dyncorr code prints one column
+        per omega, so omega is the last axis of the matrix, whatever the
+        size of the others. Its index is stored in the `omega_axis`
+        attribute.
+        """
+        output = ArrayData()
+        output.set_array("matrix", matrix)
+
+        omega = self._get_omega_grid()
+        if omega is None:
+            return output
+        if matrix.shape[-1] != omega.size:
+            self.logger.warning(
+                f"The matrix of shape {matrix.shape} does not have the "
+                f"{omega.size} omega values in its last axis."
+            )
+            return output
+        output.set_array("omega", omega)
+        output.base.attributes.set("omega_axis", matrix.ndim - 1)
+        return output
+
+    def _get_omega_grid(self):
+        """Return the omega values of the calculation, if they are known."""
+        try:
+            parameters = self.node.inputs.parameters.get_dict()
+            num_points = int(parameters["num_points"])
+            omega_min = parameters.get("omega_min", 0)
+            return np.linspace(omega_min, parameters["E_range"], num_points)
+        except (AttributeError, KeyError, NotExistent, TypeError):
+            return None
+
+    def _store_retrieved_files(self, folder):
+        """Store the temporarily retrieved files selected by the settings."""
+        settings = {}
+        if "settings" in self.node.inputs:
+            settings = self.node.inputs.settings.get_dict()
+
+        policy = get_retrieve_policy(settings)
+        retrieved_files = collect_retrieved_files(folder, policy, self.logger)
+        if retrieved_files is not None:
+            self.out("retrieved_files", retrieved_files)
@@ -0,0 +1,127 @@
+"""Utilities shared by the AiiDA-DMRG parsers."""
+
+import re
+
+import numpy as np
+
+# Sign and imaginary part of a Julia complex number, e.g. ` - 1.5im` or
+# ` + NaN*im`, rewritten to the Python notation `-1.5j`.
+JULIA_IMAGINARY_PART = re.compile(r"\s*([-+])\s*([^\s;,\]]+?)\*?im\b")
+
+
+def read_array(text):
+    """Read a printed (nested) array such as ``[1.0, 2.0]`` into NumPy.
+
+    Vectors and vectors of equally long vectors, as printed by Julia or
+    Python, are supported. An optional Julia type prefix like
+    ``Float64[...]`` is ignored.
+
+    :param text: the array as printed on a single line.
+    :return: a one- or two-dimensional float array.
+    :raises ValueError: if the text is not a (rectangular) numeric array.
+    """
+    text = text.strip()
+    start = text.find("[")
+    if start == -1 or not text.endswith("]"):
+        raise ValueError(f"not an array: {text[:50]!r}")
+    text = text[start:]
+
+    depth = len(text) - len(text.lstrip("["))
+    tokens = text.replace("[", " ").replace("]", " ").replace(",", " ")
+    values = np.array(tokens.split(), dtype=float)
+
+    if depth == 1:
+        return values
+    if depth != 2:
+        raise ValueError(f"arrays of depth {depth} are not supported")
+
+    rows = text[1:-1].split("]")[:-1]
+    rows = [row.replace(",", " ").strip(" [").split() for row in rows]
+    lengths = {len(row) for row in rows}
+    if len(lengths) > 1:
+        raise ValueError("the rows of the array have different lengths")
+
+    return values.reshape(len(rows), lengths.pop() if lengths else 0)
+
+
+def read_julia_matrix(text):
+    """Read a matrix printed by Julia, e.g. ``[1.0 2.0; 3.0 4.0]``.
+
+    Rows are separated by ``;`` and columns by whitespace. Vectors
+    (``[1.0, 2.0]``) are returned as one-dimensional arrays. Complex
+    entries (``1.0 - 2.0im``), ``Inf`` and ``NaN`` are supported, as well
+    as a type prefix like ``ComplexF64[...]``.
+
+    :param text: the matrix as printed on a single line.
+    :return: a one- or two-dimensional float or complex array.
+    :raises ValueError: if the text is not a (rectangular) numeric matrix.
+    """
+    text = text.strip()
+    start = text.find("[")
+    if start == -1 or not text.endswith("]"):
+        raise ValueError(f"not a Julia matrix: {text[:50]!r}")
+    text = text[start:]
+    body = text[1:-1].strip().rstrip(";")
+
+    dtype = float
+    if "im" in body:
+        body = JULIA_IMAGINARY_PART.sub(r"\1\2j", body)
+        dtype = complex
+
+    if ";" not in body:
+        if "," in body or not body:
+            return np.array(body.replace(",", " ").split(), dtype=dtype)
+        # A row vector like `[1.0 2.0]` is a 1xN matrix in Julia
+        return np.array(body.split(), dtype=dtype)[np.newaxis, :]
+
+    rows = body.split(";")
+    values = np.array(body.replace(";", " ").split(), dtype=dtype)
+    if values.size % len(rows) or any(
+        len(row.split()) != values.size // len(rows) for row in rows
+    ):
+        raise ValueError("the rows of the matrix have different lengths")
+
+    return values.reshape(len(rows), -1)
+
+
+class ErrorScanner:
+    """Classify a log by the error messages it contains.
+
+    All messages are combined in a single compiled regular expression, so
+    the log is scanned once, independent of the number of messages. The
+    messages are ordered by priority: if several are found, the first one
+    in the list determines the result, independent of where it appears.
+
+    :param signatures: list of ``(message, label)`` tuples, where the
+        message is matched literally and the label is returned.
+    """
+
+    def __init__(self, signatures):
+        self.labels = [label for _, label in signatures]
+        # At the same position, the alternative listed first wins, so
+        # specific messages must be listed before generic ones
+        self.pattern = re.compile(
+            "|".join(f"({re.escape(message)})" for message, _ in signatures)
+        )
+
+    def first(self, text):
+        """Return the priority index of the most important message in text.
+
+        :return: the index into the signatures, or None if none is found.
+        """
+        best = None
+        for match in self.pattern.finditer(text):
+            index = match.lastindex - 1
+            if best is None or index < best:
+                best = index
+                if best == 0:
+                    break
+        return best
+
+    def label(self, index):
+        """Return the label of a priority index, None stays None."""
+        return None if index is None else self.labels[index]
+
+    def scan(self, text):
+        """Return the label of the most important message in the text."""
+        return self.label(self.first(text))
@@ -0,0 +1,16 @@
+"""Utilities for the inputs and outputs of the AiiDA-DMRG calculations."""
+
+from .artifacts import find_artifact, load_artifacts
+from .couplings import couplings_from_edges, couplings_from_matrix
+from .resources import ResourceEstimator
+from .structures import couplings_from_structure, get_heisenberg_inputs
+
+__all__ = [
+    "couplings_from_edges",
+    "couplings_from_matrix",
+    "couplings_from_structure",
+    "find_artifact",
+    "get_heisenberg_inputs",
+    "load_artifacts",
+    "ResourceEstimator",
+]
@@ -0,0 +1,143 @@
+"""Content-addressed store of large DMRG artifacts.
+
+Files matching the glob patterns of the `artifacts` key of the `settings`
+input, e.g. ``["sites.h5", "H.h5"]``, are stored as `SinglefileData`
+nodes tagged with their SHA-256 checksum. A file whose checksum is already
+known is not stored again: the calculation only references the existing
+node in its `artifact_index` output. New artifacts are linked as outputs
+in the `artifacts` namespace.
+
+The checksums are computed after the files are retrieved, so only the
+duplicate storage is avoided: the files are still copied from the remote
+computer by every calculation.
+
+Use `load_artifacts` to get all artifacts of a calculation, and
+`find_artifact` to look up a file by its checksum.
+"""
+
+import fnmatch
+import pathlib
+import re
+
+from aiida.orm import QueryBuilder, SinglefileData, load_node
+
+from .hdf5 import file_checksum
+
+ARTIFACT_EXTRA = "dmrg_artifact_sha256"
+
+
+def validate_artifact_patterns(patterns):
+    """Validate the `artifacts` key of the settings.
+
+    :return: an error message, or None if the patterns are valid.
+    """
+    if not isinstance(patterns, list) or not all(
+        isinstance(pattern, str) and pattern for pattern in patterns
+    ):
+        return "`artifacts` in `settings` must be a list of glob patterns."
+    if any(pattern.startswith("/") for pattern in patterns):
+        return "`artifacts` patterns must be relative paths."
+    return None
+
+
+def artifact_link_label(path, sha256=None):
+    """Return a valid link label for the relative path of an artifact.
+
+    The label starts with ``artifact_`` and has no repeated underscores,
+    which separate the namespaces of link labels. Paths like ``a-b`` and
+    ``a_b`` give the same label, which is made unique by adding the first
+    digits of the `sha256` checksum.
+    """
+    label = "artifact_" + re.sub(r"[\W_]+", "_", path).strip("_")
+    return f"{label}_{sha256[:12]}" if sha256 else label
+
+
+def find_artifact(sha256):
+    """Return the oldest artifact with the given checksum, if there is one.
+
+    :param sha256: the SHA-256 checksum of the file content.
+    :return: the `SinglefileData` node or None.
+    """
+    query = QueryBuilder()
+    query.append(
+        SinglefileData,
+        filters={f"extras.{ARTIFACT_EXTRA}": sha256},
+        tag="artifact",
+    )
+    query.order_by({"artifact": {"ctime": "asc"}})
+    result = query.first()
+    return None if result is None else result[0]
+
+
+def get_or_create_artifact(filepath, sha256=None):
+    """Return the stored artifact of a file, or a new unstored one.
+
+    :param filepath: path to the file.
+    :param sha256: the checksum of the file, computed if not given.
+    :return: tuple of the `SinglefileData` and whether it is new.
+    """
+    if sha256 is None:
+        sha256 = file_checksum(filepath)
+
+    artifact = find_artifact(sha256)
+    if artifact is not None:
+        return artifact, False
+
+    artifact = SinglefileData(filepath)
+    artifact.base.extras.set(ARTIFACT_EXTRA, sha256)
+    return artifact, True
+
+
+def collect_artifacts(folder, patterns):
+    """Return the artifacts of the files of a folder matching the patterns.
+
+    Files with the same content within the folder share one artifact.
+
+    :param folder: path of the temporary folder retrieved by the engine.
+    :param patterns: glob patterns of the relative paths of the files.
+    :return: tuple of a list with the `filename`, `sha256` and `uuid` of
+        every artifact, and a dictionary of the new artifacts by link label.
+    """
+    folder = pathlib.Path(folder)
+    index = []
+    new_artifacts = {}
+    by_checksum = {}
+
+    for filepath in sorted(folder.rglob("*")):
+        path = filepath.relative_to(folder).as_posix()
+        if not filepath.is_file() or not any(
+            fnmatch.fnmatch(path, pattern) for pattern in patterns
+        ):
+            continue
+
+        sha256 = file_checksum(filepath)
+        if sha256 in by_checksum:
+            artifact = by_checksum[sha256]
+        else:
+            artifact, is_new = get_or_create_artifact(filepath, sha256)
+            by_checksum[sha256] = artifact
+            if is_new:
+                label = artifact_link_label(path)
+                if label in new_artifacts:
+                    label = artifact_link_label(path, sha256)
+                new_artifacts[label] = artifact
+
+        uuid = artifact.uuid
+        index.append({"filename": path, "sha256": sha256, "uuid": uuid})
+
+    return index, new_artifacts
+
+
+def load_artifacts(calculation):
+    """Return the artifacts of a calculation by their relative path.
+
+    Both the artifacts created by the calculation and those it reused from
+    earlier calculations are returned.
+
+    :param calculation: a finished `DMRGCalculation` node.
+    :return: dictionary of the `SinglefileData` nodes.
+    """
+    if "artifact_index" not in calculation.outputs:
+        return {}
+    files = calculation.outputs.artifact_index.get_dict()["files"]
+    return {item["filename"]: load_node(item["uuid"]) for item in files}
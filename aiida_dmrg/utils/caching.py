@@ -0,0 +1,170 @@
+"""Canonical form of the inputs of the calculations for caching.
+
+AiiDA only reuses a finished calculation if the hashes of all its inputs
+match. The hashes of the `parameters` change with keys that do not reach
+the code, such as `title` and `comment`, and with the representation of
+numbers and matrices, e.g. ``2`` and ``2.0`` or a nested list and the
+same matrix written as a string. The calculations therefore hash
+
+- `parameters` as the normalized values of the keys passed to the code,
+  with numbers as floats and symmetric J matrices as their edge list, so
+  that `couplings` and `coupling_matrix` arrays hash as the same `J`;
+- `parent_calc_folder` by the calculation that created it and the sweep
+  of its checkpoint, which determine its content, rather than its path;
+- `settings` without the `julia` launcher options.
+"""
+
+import ast
+
+import numpy as np
+from aiida.common.hashing import make_hash
+from aiida.orm import ArrayData
+
+from .couplings import get_edge_list
+
+# Keys of the settings that change the runtime only
+PERFORMANCE_SETTINGS = ("julia",)
+
+
+def parse_matrix(text):
+    """Return a matrix written as a Python or Julia literal, or None.
+
+    Python matrices are nested lists, Julia matrices separate the rows by
+    ``;`` and the entries by spaces, e.g. ``[0 1; 1 0]``.
+    """
+    text = text.strip()
+    if not (text.startswith("[") and text.endswith("]")):
+        return None
+    try:
+        value = ast.literal_eval(text)
+    except (ValueError, SyntaxError):
+        rows = text[1:-1].split(";")
+        value = [row.replace(",", " ").split() for row in rows]
+    try:
+        matrix = np.array(value, dtype=float)
+    except (TypeError, ValueError):
+        return None
+    return matrix if matrix.ndim == 2 else None
+
+
+def normalize_edges(rows, cols, values):
+    """Return the canonical form of an edge list of couplings."""
+    edges = zip(np.asarray(rows), np.asarray(cols), np.asarray(values))
+    return {"edges": [[int(i), int(j), float(v)] for i, j, v in edges]}
+
+
+def normalize_matrix(matrix):
+    """Return the canonical form of a J matrix.
+
+    Symmetric matrices with a vanishing diagonal are represented by their
+    edge list, like the `couplings` input.
+    """
+    matrix = np.asarray(matrix, dtype=float) + 0.0
+    square = matrix.ndim == 2 and matrix.shape[0] == matrix.shape[1]
+    symmetric = square and np.array_equal(matrix, matrix.T)
+    if symmetric and not np.diag(matrix).any():
+        rows, cols = np.nonzero(np.triu(matrix, 1))
+        return normalize_edges(rows, cols, matrix[rows, cols])
+    return {"matrix": matrix.tolist()}
+
+
+def normalize_value(value):
+    """Return the canonical form of a parameter value."""
+    if isinstance(value, (bool, np.bool_)):
+        return bool(value)
+    if isinstance(value, (int, float, np.integer, np.floating)):
+        # Also maps -0.0 to 0.0
+        return float(value) + 0.0
+    if isinstance(value, str):
+        matrix = parse_matrix(value)
+        return value.strip() if matrix is None else normalize_matrix(matrix)
+    if isinstance(value, (list, tuple)):
+        try:
+            matrix = np.array(value, dtype=float)
+        except (TypeError, ValueError):
+            return [normalize_value(item) for item in value]
+        if matrix.ndim == 2:
+            return normalize_matrix(matrix)
+        return [normalize_value(item) for item in value]
+    if isinstance(value, dict):
+        return {key: normalize_value(value[key]) for key in sorted(value)}
+    return value
+
+
+def get_canonical_parameters(parameters, keys):
+    """Return the normalized values of the given keys of the parameters."""
+    keys = [key for key in keys if key in parameters]
+    return {key: normalize_value(parameters[key]) for key in keys}
+
+
+def get_couplings(label, node, n_sites):
+    """Return the canonical J of a couplings input, or None."""
+    if not isinstance(node, ArrayData):
+        return None
+    try:
+        if label == "couplings":
+            return normalize_edges(*get_edge_list(node, n_sites))
+        names = node.get_arraynames()
+        if len(names) == 1:
+            return normalize_matrix(node.get_array(names[0]))
+    except (TypeError, ValueError):
+        return None
+    return None
+
+
+def hash_remote_folder(remote_folder):
+    """Hash a remote folder by the calculation that created it.
+
+    The content of the folder is determined by the inputs of that
+    calculation and the sweep of its checkpoint, folders of runs that
+    were not created by a calculation are hashed by their path.
+    """
+    creator = remote_folder.creator
+    if creator is None:
+        return remote_folder.base.caching.compute_hash()
+
+    caching = creator.base.caching
+    results = {}
+    if "output_parameters" in creator.outputs:
+        results = creator.outputs.output_parameters.get_dict()
+    return make_hash(
+        {
+            "creator": caching.get_hash() or caching.compute_hash(),
+            "checkpoint_sweep": results.get("checkpoint_sweep"),
+        }
+    )
+
+
+def hash_inputs(inputs, parameter_keys):
+    """Return the canonical hashes of the inputs of a calculation.
+
+    :param inputs: the input nodes by link label.
+    :param parameter_keys: the keys of the parameters passed to the code.
+    :return: the hash of every input with a canonical form by link label,
+        None for the inputs that are included in the `parameters`.
+    """
+    hashes = {}
+    if "parameters" in inputs:
+        parameters = inputs["parameters"].get_dict()
+        canonical = get_canonical_parameters(parameters, parameter_keys)
+        for label in ("couplings", "coupling_matrix"):
+            if label not in inputs:
+                continue
+            n_sites = parameters.get("N_sites")
+            couplings = get_couplings(label, inputs[label], n_sites)
+            if couplings is not None:
+                canonical["J"] = couplings
+                hashes[label] = None
+        hashes["parameters"] = make_hash(canonical)
+
+    if "parent_calc_folder" in inputs:
+        parent_calc_folder = inputs["parent_calc_folder"]
+        hashes["parent_calc_folder"] = hash_remote_folder(parent_calc_folder)
+
+    if "settings" in inputs:
+        settings = inputs["settings"].get_dict()
+        for key in PERFORMANCE_SETTINGS:
+            settings.pop(key, None)
+        hashes["settings"] = make_hash(settings)
+
+    return hashes
@@ -0,0 +1,166 @@
+"""Sparse representation of the exchange couplings J_ij.
+
+The couplings are stored in an `ArrayData` with the one-dimensional
+arrays `rows`, `cols` and `values` (COO format, 0-based site indices).
+Every bond is listed once; J_ji = J_ij is implied.
+
+Dense matrices can instead be passed as a binary file, which is copied
+next to the input file and referenced by its name in place of `J`.
+"""
+
+import pathlib
+
+import numpy as np
+from aiida.orm import ArrayData, SinglefileData
+
+COUPLING_ARRAYS = ("rows", "cols", "values")
+
+# Prefix of the J token that switches the DMRG code to the edge-list mode
+EDGE_LIST_PREFIX = "edges"
+
+# Name of the coupling matrix file in the calculation folder, the suffix
+# tells the DMRG code how to read it (HDF5 files hold the dataset `J`)
+COUPLING_MATRIX_NAME = "J"
+COUPLING_MATRIX_SUFFIXES = {".npy": ".npy", ".h5": ".h5", ".hdf5": ".h5"}
+
+
+def couplings_from_edges(edges):
+    """Create the couplings node from an iterable of ``(i, j, J_ij)``.
+
+    :param edges: iterable of bonds with 0-based site indices.
+    :return: an `ArrayData` with the arrays `rows`, `cols` and `values`.
+    """
+    edges = np.asarray(list(edges), dtype=float).reshape(-1, 3)
+    sites = edges[:, :2]
+    if not np.array_equal(sites, sites.round()):
+        raise ValueError("site indices must be integers")
+
+    couplings = ArrayData()
+    couplings.set_array("rows", sites[:, 0].astype(np.int64))
+    couplings.set_array("cols", sites[:, 1].astype(np.int64))
+    couplings.set_array("values", edges[:, 2])
+    return couplings
+
+
+def couplings_from_matrix(matrix):
+    """Create the couplings node from a dense symmetric J matrix.
+
+    :param matrix: square, symmetric matrix with a vanishing diagonal.
+    :return: an `ArrayData` with the non-zero couplings of the upper triangle.
+    """
+    matrix = np.asarray(matrix, dtype=float)
+    if matrix.ndim != 2 or matrix.shape[0] != matrix.shape[1]:
+        raise ValueError("the J matrix must be square")
+    if not np.allclose(matrix, matrix.T):
+        raise ValueError("the J matrix must be symmetric")
+    if np.any(np.diag(matrix)):
+        raise ValueError("the diagonal of the J matrix must vanish")
+
+    rows, cols = np.nonzero(np.triu(matrix, 1))
+    couplings = ArrayData()
+    couplings.set_array("rows", rows.astype(np.int64))
+    couplings.set_array("cols", cols.astype(np.int64))
+    couplings.set_array("values", matrix[rows, cols])
+    return couplings
+
+
+def get_edge_list(couplings, n_sites):
+    """Return the validated and canonical edge list of a couplings node.
+
+    Bonds are oriented such that ``i < j`` and sorted, zero couplings are
+    dropped and bonds listed twice with the same value are merged.
+
+    :param couplings: `ArrayData` with the arrays `rows`, `cols`, `values`.
+    :param n_sites: number of sites of the system.
+    :return: tuple of the `rows`, `cols` and `values` arrays.
+    :raises ValueError: if the couplings are inconsistent.
+    """
+    missing = set(COUPLING_ARRAYS) - set(couplings.get_arraynames())
+    if missing:
+        raise ValueError(f"missing arrays: {', '.join(sorted(missing))}")
+
+    rows, cols, values = map(couplings.get_array, COUPLING_ARRAYS)
+    if not rows.ndim == cols.ndim == values.ndim == 1:
+        raise ValueError("the coupling arrays must be one-dimensional")
+    if not rows.size == cols.size == values.size:
+        raise ValueError("the coupling arrays must have the same length")
+    sites = np.concatenate([rows, cols])
+    if not np.issubdtype(sites.dtype, np.integer):
+        raise ValueError("`rows` and `cols` must be integer arrays")
+    if sites.size and (sites.min() < 0 or sites.max() >= n_sites):
+        raise ValueError(f"site indices must be in [0, {n_sites})")
+    if np.any(rows == cols):
+        raise ValueError("on-site couplings (i == j) are not allowed")
+    if not np.all(np.isfinite(values)):
+        raise ValueError("couplings must be finite")
+
+    nonzero = values != 0
+    low = np.minimum(rows, cols)[nonzero]
+    high = np.maximum(rows, cols)[nonzero]
+    values = values[nonzero].astype(float)
+
+    order = np.lexsort((high, low))
+    low, high, values = low[order], high[order], values[order]
+
+    duplicate = np.zeros(low.size, dtype=bool)
+    duplicate[1:] = (low[1:] == low[:-1]) & (high[1:] == high[:-1])
+    if np.any(values[duplicate] != values[np.flatnonzero(duplicate) - 1]):
+        raise ValueError("a bond is listed more than once with different J")
+
+    keep = ~duplicate
+    return low[keep], high[keep], values[keep]
+
+
+def render_edge_list(rows, cols, values):
+    """Render the edge list as the compact J token of the DMRG input.
+
+    The token has the form ``edges[i,j,J_ij;...]`` with 1-based indices,
+    which is how the DMRG code expects the sparse input mode.
+    """
+    edges = ";".join(
+        f"{i + 1},{j + 1},{value!r}"
+        for i, j, value in zip(rows.tolist(), cols.tolist(), values.tolist())
+    )
+    return f"{EDGE_LIST_PREFIX}[{edges}]"
+
+
+def render_couplings(couplings, n_sites):
+    """Validate a couplings node and render it as the J token.
+
+    :raises ValueError: if the couplings are inconsistent.
+    """
+    return render_edge_list(*get_edge_list(couplings, n_sites))
+
+
+def get_coupling_matrix_file(coupling_matrix, n_sites):
+    """Return where to find the binary coupling matrix and where to put it.
+
+    An `ArrayData` must hold a single `N_sites` x `N_sites` array, which is
+    already stored as a ``.npy`` file in its repository. A `SinglefileData`
+    must contain a ``.npy`` or an HDF5 file; its content is not checked.
+
+    :param coupling_matrix: `ArrayData` or `SinglefileData` node.
+    :param n_sites: number of sites of the system.
+    :return: tuple of the object name in the repository of the node and the
+        filename in the calculation folder.
+    :raises ValueError: if the node does not hold a suitable matrix.
+    """
+    if isinstance(coupling_matrix, SinglefileData):
+        suffix = pathlib.PurePath(coupling_matrix.filename).suffix.lower()
+        if suffix not in COUPLING_MATRIX_SUFFIXES:
+            raise ValueError(
+                f"unsupported file `{coupling_matrix.filename}`, "
+                f"use one of {', '.join(COUPLING_MATRIX_SUFFIXES)}"
+            )
+        filename = COUPLING_MATRIX_NAME + COUPLING_MATRIX_SUFFIXES[suffix]
+        return coupling_matrix.filename, filename
+
+    names = coupling_matrix.get_arraynames()
+    if len(names) != 1:
+        raise ValueError("the ArrayData must contain exactly one array")
+    shape = tuple(coupling_matrix.get_shape(names[0]))
+    if shape != (n_sites, n_sites):
+        raise ValueError(
+            f"the J matrix has shape {shape}, expected {(n_sites, n_sites)}"
+        )
+    return f"{names[0]}.npy", f"{COUPLING_MATRIX_NAME}.npy"
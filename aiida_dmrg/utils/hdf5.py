@@ -0,0 +1,156 @@
+"""Metadata of the HDF5 files written by the DMRG code.
+
+With ``print_HDF5`` the code writes the Hamiltonian (MPO), the
+wavefunctions (MPS) and the sites in the HDF5 format of ITensors.jl. The
+files are only opened to read their structure: the attributes, the shapes
+of the datasets and the dimensions of the indices. No tensor is loaded.
+"""
+
+import hashlib
+
+import h5py
+
+HDF5_PATTERN = "*.h5"
+
+# Types of the ITensors.jl groups holding a tensor network
+TENSOR_NETWORK_TYPES = ("MPS", "MPO")
+
+
+def hdf5_requested(parameters):
+    """Return whether the DMRG code writes HDF5 files for the parameters."""
+    return str(parameters.get("print_HDF5", "false")).lower() == "true"
+
+
+def file_checksum(filepath, chunk_size=1024**2):
+    """Return the SHA-256 checksum of a file, reading it in chunks."""
+    sha256 = hashlib.sha256()
+    with open(filepath, "rb") as handle:
+        for chunk in iter(lambda: handle.read(chunk_size), b""):
+            sha256.update(chunk)
+    return sha256.hexdigest()
+
+
+def _as_str(value):
+    """Decode a string attribute or dataset as stored by h5py."""
+    if isinstance(value, bytes):
+        return value.decode("utf-8", "replace")
+    return str(value)
+
+
+def _get_type(obj):
+    """Return the ITensors.jl type of an HDF5 object, if there is one."""
+    value = obj.attrs.get("type")
+    return None if value is None else _as_str(value)
+
+
+def _read_index(group):
+    """Return the dimension and the tags of an ITensors.jl `Index`."""
+    dim = int(group["dim"][()]) if "dim" in group else None
+    tags = ""
+    if isinstance(group.get("tags"), h5py.Dataset):
+        tags = _as_str(group["tags"][()])
+    return dim, [tag.strip() for tag in tags.split(",") if tag.strip()]
+
+
+def _read_indices(group):
+    """Return the `Index` groups of an ITensors.jl `IndexSet` in order."""
+    names = sorted(
+        (name for name in group if name.startswith("index_")),
+        key=lambda name: int(name.split("_", 1)[1]),
+    )
+    return [_read_index(group[name]) for name in names]
+
+
+def _site_type(tags):
+    """Return the site type tag, e.g. ``S=1/2``, of the tags of an index."""
+    for tag in tags:
+        if tag != "Site" and not tag.startswith("n="):
+            return tag
+    return None
+
+
+def _summarize_network(group, network_type):
+    """Summarize an MPS or MPO group of ITensors.jl."""
+    prefix = f"{network_type}["
+    start = len(prefix)
+    tensors = sorted(
+        (name for name in group if name.startswith(prefix)),
+        key=lambda name: int(name[start:-1]),
+    )
+
+    bond_dimensions = []
+    site_types = set()
+    for name in tensors:
+        inds = group[name].get("inds")
+        indices = [] if inds is None else _read_indices(inds)
+        links = [dim for dim, tags in indices if "Link" in tags]
+        # The link to the right neighbour is the last one of a tensor
+        if links and name != tensors[-1]:
+            bond_dimensions.append(links[-1])
+        sites = [tags for _, tags in indices if "Site" in tags]
+        site_types.update(map(_site_type, sites))
+
+    summary = {
+        "type": network_type,
+        "length": len(tensors),
+        "bond_dimensions": bond_dimensions,
+        "site_types": sorted(filter(None, site_types)),
+    }
+    if bond_dimensions:
+        summary["max_bond_dimension"] = max(bond_dimensions)
+    return summary
+
+
+def summarize_hdf5(filepath):
+    """Return the metadata of an HDF5 file written by the DMRG code.
+
+    The summary contains the size and the SHA-256 checksum of the file, the
+    shape and dtype of every dataset, and for every MPS/MPO the bond
+    dimensions and site types. Index sets (e.g. the sites) are summarized
+    with their dimensions and site types.
+
+    Lists are used rather than mappings, since filenames and HDF5 paths are
+    not valid keys of a `Dict` node.
+
+    :param filepath: `pathlib.Path` of the HDF5 file.
+    :return: a JSON-serializable dictionary.
+    :raises OSError: if the file is not a readable HDF5 file.
+    """
+    datasets = []
+    networks = []
+    index_sets = []
+
+    def visit(name, obj):
+        if isinstance(obj, h5py.Dataset):
+            shape = list(obj.shape)
+            dtype = str(obj.dtype)
+            datasets.append({"name": name, "shape": shape, "dtype": dtype})
+            return None
+
+        obj_type = _get_type(obj)
+        if obj_type in TENSOR_NETWORK_TYPES:
+            summary = _summarize_network(obj, obj_type)
+            networks.append({"name": name, **summary})
+        elif obj_type == "IndexSet" and _get_type(obj.parent) != "ITensor":
+            indices = _read_indices(obj)
+            site_types = {_site_type(tags) for _, tags in indices}
+            index_sets.append(
+                {
+                    "name": name,
+                    "dimensions": [dim for dim, _ in indices],
+                    "site_types": sorted(filter(None, site_types)),
+                }
+            )
+        return None
+
+    with h5py.File(filepath, "r") as handle:
+        handle.visititems(visit)
+
+    return {
+        "filename": filepath.name,
+        "size": filepath.stat().st_size,
+        "sha256": file_checksum(filepath),
+        "datasets": datasets,
+        "tensor_networks": networks,
+        "index_sets": index_sets,
+    }
@@ -0,0 +1,228 @@
+"""Index of the finished DMRG calculations by their Hamiltonian.
+
+The `DMRGBaseWorkChain` stores the fingerprint of the Hamiltonian of every
+successful `DMRGCalculation` it runs in its extras, together with the
+`cutoff` and the number of computed states. The fingerprint is the hash
+of the canonical `S`, `N_sites`, `J` and `Sz`, see `get_fingerprint`, so
+looking up earlier results for the same system is a single query on
+indexed extras::
+
+    matches = find_ground_states(parameters, couplings=couplings)
+
+The matches have a cutoff at least as tight as requested and at least as
+many states, the tightest cutoff first. Calculations run outside of the
+workchain, or finished before the index existed, are added with
+`update_index`.
+"""
+
+from aiida.common.hashing import make_hash
+from aiida.orm import CalcJobNode, Dict, QueryBuilder
+
+from .caching import get_couplings, normalize_value
+from .hdf5 import hdf5_requested
+from .resources import DEFAULT_CUTOFF, PROCESS_TYPE
+
+# Names of the extras of an indexed calculation
+FINGERPRINT_EXTRA = "dmrg_fingerprint"
+CUTOFF_EXTRA = "dmrg_cutoff"
+N_STATES_EXTRA = "dmrg_n_states"
+ENERGY_EXTRA = "dmrg_energy"
+
+# Significant digits of the numbers in the fingerprint, couplings that
+# differ by rounding errors only describe the same Hamiltonian
+FINGERPRINT_DIGITS = 10
+
+
+def _round(value, digits=FINGERPRINT_DIGITS):
+    """Round the floats of a canonical value to significant digits."""
+    if isinstance(value, float):
+        return float(f"{value:.{digits}g}") + 0.0
+    if isinstance(value, list):
+        return [_round(item, digits) for item in value]
+    if isinstance(value, dict):
+        return {key: _round(item, digits) for key, item in value.items()}
+    return value
+
+
+def _is_true(value):
+    """Return whether a flag of the parameters is set."""
+    return str(value).lower() == "true"
+
+
+def get_fingerprint(parameters, couplings=None, coupling_matrix=None):
+    """Return the fingerprint of the Hamiltonian of a calculation.
+
+    The fingerprint only depends on the system: the spin `S`, `N_sites`,
+    the couplings `J`, whether the highest instead of the lowest states
+    are computed, and the magnetization `Sz` if it is conserved. The
+    couplings can be given in any of the `parameters`, `couplings` and
+    `coupling_matrix` inputs.
+
+    :param parameters: the `parameters` dictionary of a calculation.
+    :param couplings: the `couplings` input, if any.
+    :param coupling_matrix: the `coupling_matrix` input, if any.
+    :return: the hash, or None if `S` or `N_sites` are missing.
+    """
+    if "S" not in parameters or "N_sites" not in parameters:
+        return None
+
+    n_sites = parameters["N_sites"]
+    system = {
+        "S": normalize_value(parameters["S"]),
+        "N_sites": normalize_value(n_sites),
+        "J": normalize_value(parameters.get("J")),
+        "maximal_energy": _is_true(parameters.get("maximal_energy")),
+        "Sz": None,
+    }
+    for label, node in (
+        ("couplings", couplings),
+        ("coupling_matrix", coupling_matrix),
+    ):
+        value = get_couplings(label, node, n_sites)
+        if value is not None:
+            system["J"] = value
+    if _is_true(parameters.get("conserve_symmetry")):
+        system["Sz"] = normalize_value(parameters.get("Sz"))
+    return make_hash(_round(system))
+
+
+def get_output_flags(parameters):
+    """Return the parameters that change the outputs but not the physics.
+
+    Calculations of the same fingerprint only return the same outputs if
+    they also write the same HDF5 file and MPS checkpoints.
+
+    :param parameters: the `parameters` dictionary of a calculation.
+    :return: dictionary of the canonical `print_HDF5` and
+        `checkpoint_sweeps`.
+    """
+    checkpoint_sweeps = parameters.get("checkpoint_sweeps")
+    return {
+        "print_HDF5": hdf5_requested(parameters),
+        "checkpoint_sweeps": normalize_value(checkpoint_sweeps),
+    }
+
+
+def get_index_extras(
+    parameters,
+    results,
+    couplings=None,
+    coupling_matrix=None,
+):
+    """Return the extras indexing a finished calculation.
+
+    :param parameters: the `parameters` dictionary of the calculation.
+    :param results: the `output_parameters` dictionary of the calculation.
+    :return: dictionary of the extras, empty if the calculation cannot be
+        indexed.
+    """
+    fingerprint = get_fingerprint(parameters, couplings, coupling_matrix)
+    if fingerprint is None or not results.get("n_states"):
+        return {}
+    return {
+        FINGERPRINT_EXTRA: fingerprint,
+        CUTOFF_EXTRA: float(parameters.get("cutoff", DEFAULT_CUTOFF)),
+        N_STATES_EXTRA: int(results["n_states"]),
+        ENERGY_EXTRA: float(results["energy_min"]),
+    }
+
+
+def index_calculation(node, results=None):
+    """Add a finished `DMRGCalculation` to the index.
+
+    :param node: the `CalcJobNode` of the calculation.
+    :param results: the `output_parameters` dictionary, by default of the
+        output of the finished calculation.
+    :return: whether the calculation was indexed.
+    """
+    if results is None:
+        outputs = node.outputs
+        if not node.is_finished_ok or "output_parameters" not in outputs:
+            return False
+        results = outputs.output_parameters.get_dict()
+
+    inputs = node.inputs
+    if "parameters" not in inputs:
+        return False
+    extras = get_index_extras(
+        inputs.parameters.get_dict(),
+        results,
+        inputs.couplings if "couplings" in inputs else None,
+        inputs.coupling_matrix if "coupling_matrix" in inputs else None,
+    )
+    if extras:
+        node.base.extras.set_many(extras)
+    return bool(extras)
+
+
+def update_index():
+    """Index the finished calculations that are not indexed yet.
+
+    :return: the number of calculations added to the index.
+    """
+    query = QueryBuilder()
+    query.append(
+        CalcJobNode,
+        filters={
+            "process_type": PROCESS_TYPE,
+            "attributes.exit_status": 0,
+        },
+        project=["*", f"extras.{FINGERPRINT_EXTRA}"],
+        tag="calculation",
+    )
+    query.append(
+        Dict,
+        with_incoming="calculation",
+        edge_filters={"label": "output_parameters"},
+        filters={"attributes.n_states": {">": 0}},
+    )
+    # The `has_key` operator is not available for SQLite storages
+    return sum(
+        index_calculation(node)
+        for node, fingerprint in query.all()
+        if fingerprint is None
+    )
+
+
+def find_ground_states(
+    parameters,
+    couplings=None,
+    coupling_matrix=None,
+    tighter_only=True,
+):
+    """Return the finished calculations of the same Hamiltonian.
+
+    :param parameters: the `parameters` dictionary of the calculation to
+        run, which also sets the largest acceptable `cutoff` and the number
+        of states, ``n_excitations + 1``.
+    :param couplings: the `couplings` input, if any.
+    :param coupling_matrix: the `coupling_matrix` input, if any.
+    :param tighter_only: only return calculations with a cutoff at most the
+        requested one, e.g. disable to warm-start from a looser cutoff.
+    :return: list of the `CalcJobNode`, the tightest cutoff first.
+    """
+    fingerprint = get_fingerprint(parameters, couplings, coupling_matrix)
+    if fingerprint is None:
+        return []
+
+    n_states = int(parameters.get("n_excitations", 0)) + 1
+    filters = {
+        "attributes.exit_status": 0,
+        f"extras.{FINGERPRINT_EXTRA}": fingerprint,
+        f"extras.{N_STATES_EXTRA}": {">=": n_states},
+    }
+    if tighter_only:
+        cutoff = float(parameters.get("cutoff", DEFAULT_CUTOFF))
+        filters[f"extras.{CUTOFF_EXTRA}"] = {"<=": cutoff}
+
+    query = QueryBuilder()
+    query.append(CalcJobNode, filters=filters, tag="calculation")
+    query.order_by(
+        {
+            "calculation": [
+                {f"extras.{CUTOFF_EXTRA}": {"order": "asc", "cast": "f"}},
+                {"ctime": "desc"},
+            ]
+        }
+    )
+    return query.all(flat=True)
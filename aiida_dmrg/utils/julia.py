@@ -0,0 +1,99 @@
+"""Options of the Julia launcher of the DMRG and dynamical correlator codes.
+
+Every calculation starts a new Julia process, which compiles ITensors.jl
+before running. For short calculations the startup can be cut down with a
+precompiled system image and fewer compiler optimizations, given in the
+`julia` key of the `settings` input::
+
+    settings = Dict({
+        "julia": {
+            "sysimage": "/apps/dmrg/itensors.so",  # --sysimage
+            "threads": 4,  # --threads, an integer or "auto"
+            "compile": "min",  # --compile
+            "optimize": 1,  # --optimize
+            "startup_file": False,  # --startup-file=no
+            "heap_size_hint": "8G",  # --heap-size-hint
+        }
+    })
+
+The options are passed as command line flags in front of the `cmdline`
+parameters, so the code must be the ``julia`` executable with the path of
+the script as the first `cmdline` parameter.
+"""
+
+import re
+
+# Option name, command line flag and a check of the value
+JULIA_OPTIONS = {
+    "sysimage": "--sysimage",
+    "threads": "--threads",
+    "compile": "--compile",
+    "optimize": "--optimize",
+    "startup_file": "--startup-file",
+    "heap_size_hint": "--heap-size-hint",
+}
+
+COMPILE_MODES = ("yes", "no", "all", "min")
+
+_MEMORY_SIZE = re.compile(r"\d+[KMGT]?")
+
+
+def _check_option(key, value):
+    """Return an error message for an invalid option value, or None."""
+    if key == "sysimage":
+        if not isinstance(value, str) or not value.startswith("/"):
+            return "must be an absolute path on the remote computer"
+    elif key == "threads":
+        if value == "auto":
+            return None
+        if isinstance(value, bool) or not isinstance(value, int) or value < 1:
+            return 'must be a positive integer or "auto"'
+    elif key == "compile":
+        if value not in COMPILE_MODES:
+            return f"must be one of {', '.join(COMPILE_MODES)}"
+    elif key == "optimize":
+        if isinstance(value, bool) or value not in (0, 1, 2, 3):
+            return "must be 0, 1, 2 or 3"
+    elif key == "startup_file":
+        if not isinstance(value, bool):
+            return "must be a boolean"
+    elif key == "heap_size_hint":
+        if not isinstance(value, str) or not _MEMORY_SIZE.fullmatch(value):
+            return 'must be a memory size such as "8G"'
+    return None
+
+
+def validate_julia_options(options):
+    """Validate the `julia` key of the settings.
+
+    :return: an error message, or None if the options are valid.
+    """
+    if not isinstance(options, dict):
+        return "`julia` must be a dictionary."
+
+    unknown = set(options) - set(JULIA_OPTIONS)
+    if unknown:
+        return f"Unknown `julia` options: {', '.join(sorted(unknown))}."
+
+    for key, value in options.items():
+        error = _check_option(key, value)
+        if error:
+            return f"`julia.{key}` {error}."
+    return None
+
+
+def get_julia_cmdline(options):
+    """Return the command line flags of the Julia launcher options.
+
+    :param options: the `julia` dictionary of the settings.
+    :return: list of flags, in the order of `JULIA_OPTIONS`.
+    """
+    cmdline = []
+    for key, flag in JULIA_OPTIONS.items():
+        if key not in options:
+            continue
+        value = options[key]
+        if isinstance(value, bool):
+            value = "yes" if value else "no"
+        cmdline.append(f"{flag}={value}")
+    return cmdline
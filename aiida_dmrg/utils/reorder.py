@@ -0,0 +1,110 @@
+"""Reordering of the sites to shorten the range of the couplings.
+
+The cost of the DMRG grows with the entanglement between the two halves of
+the chain at every bond, which long-range couplings across the chain
+increase. Relabeling the sites such that strongly coupled sites are close
+to each other in the chain reduces it, without changing the physics. The
+ordering is chosen with the `reorder` key of the `settings` input:
+
+- ``"rcm"``: reverse Cuthill-McKee, minimizing the bandwidth of the
+  coupling graph, i.e. the longest distance of a bond in the chain.
+- ``"fiedler"``: the sites sorted by the Fiedler vector of the graph
+  Laplacian weighted by |J_ij|, minimizing the sum of |J_ij| (i - j)^2.
+- ``"entanglement"``: as ``"fiedler"``, weighted by the site-site mutual
+  information of a previous run, given in the `mutual_information` input.
+
+An ordering is a permutation `order` of the sites: position `k` of the
+chain passed to the code holds the site `order[k]` of the input.
+"""
+
+import numpy as np
+from scipy.sparse import csr_matrix
+from scipy.sparse.csgraph import reverse_cuthill_mckee
+
+REORDER_METHODS = ("rcm", "fiedler", "entanglement")
+
+# The permutation is written to this file when the calculation is
+# prepared, and stored as the `site_order` output by the parser
+SITE_ORDER_FILE = "site_order.txt"
+
+
+def get_weight_matrix(rows, cols, values, n_sites):
+    """Return the symmetric matrix of the coupling strengths |J_ij|."""
+    weights = np.zeros((n_sites, n_sites))
+    weights[rows, cols] = np.abs(values)
+    weights[cols, rows] = np.abs(values)
+    return weights
+
+
+def fiedler_order(weights):
+    """Return the sites sorted by the Fiedler vector of a weighted graph.
+
+    The sign of the eigenvector is fixed such that the first site of the
+    input comes first when possible, which makes the ordering unique.
+    """
+    weights = np.abs(np.asarray(weights, dtype=float))
+    np.fill_diagonal(weights, 0)
+    laplacian = np.diag(weights.sum(axis=1)) - weights
+    _, vectors = np.linalg.eigh(laplacian)
+    fiedler = vectors[:, 1] if len(weights) > 1 else vectors[:, 0]
+    if fiedler[0] > fiedler[-1]:
+        fiedler = -fiedler
+    return np.argsort(fiedler, kind="stable")
+
+
+def get_site_order(method, weights):
+    """Return the ordering of the sites of the given method.
+
+    :param method: one of `REORDER_METHODS`.
+    :param weights: symmetric matrix of the coupling strengths, or of the
+        mutual information for ``"entanglement"``.
+    :return: the permutation as an integer array.
+    """
+    if method not in REORDER_METHODS:
+        raise ValueError(f"unknown ordering `{method}`")
+    if method == "rcm":
+        graph = csr_matrix(np.asarray(weights) != 0)
+        return reverse_cuthill_mckee(graph, symmetric_mode=True)
+    return fiedler_order(weights)
+
+
+def get_bandwidth(rows, cols, order=None):
+    """Return the longest distance of a bond in the chain."""
+    if not np.size(rows):
+        return 0
+    if order is not None:
+        position = np.argsort(order)
+        rows, cols = position[rows], position[cols]
+    return int(np.abs(np.asarray(rows) - np.asarray(cols)).max())
+
+
+def permute_couplings(rows, cols, values, order):
+    """Relabel the sites of an edge list by their position in `order`.
+
+    :return: the canonical edge list of the reordered chain, with ``i < j``
+        and sorted by the sites.
+    """
+    position = np.argsort(order)
+    rows, cols = position[rows], position[cols]
+    low, high = np.minimum(rows, cols), np.maximum(rows, cols)
+    sort = np.lexsort((high, low))
+    return low[sort], high[sort], np.asarray(values)[sort]
+
+
+def permute_matrix(matrix, order):
+    """Return the dense J matrix with its sites in the given order."""
+    return np.asarray(matrix)[np.ix_(order, order)]
+
+
+def restore_site_order(array, order):
+    """Map per-site values of the reordered chain back to the input sites.
+
+    :param array: per-site values of the reordered chain, site fastest,
+        e.g. `spin_z` with one row per state.
+    :param order: the permutation the calculation used.
+    """
+    array = np.asarray(array)
+    rows = array.reshape(-1, len(order))
+    restored = np.empty_like(rows)
+    restored[:, order] = rows
+    return restored.reshape(array.shape)
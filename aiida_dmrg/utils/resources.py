@@ -0,0 +1,274 @@
+"""Estimate the resources of a DMRG calculation from earlier runs.
+
+The walltime and the bond dimension reached by the DMRG code grow as power
+laws of the number of sites, the local dimension ``2S + 1``, the inverse
+truncation `cutoff` and the number of computed states, and are lower with
+`conserve_symmetry`. The `ResourceEstimator` fits these scaling laws in log
+space to the finished `DMRGCalculation` nodes of the database::
+
+    estimator = ResourceEstimator.from_database(code=load_code("dmrg@daint"))
+    estimator.predict({"S": 0.5, "N_sites": 60, "cutoff": 1e-10})
+
+The memory is computed from the predicted bond dimension, since the
+calculations do not record their memory usage. Timings depend on the
+machine and on the number of processes, so the fit should be restricted to
+one code.
+"""
+
+import math
+import re
+
+import numpy as np
+from aiida.orm import CalcJobNode, Data, Dict, QueryBuilder
+
+PROCESS_TYPE = "aiida.calculations:dmrg"
+
+FEATURES = (
+    "log_n_sites",
+    "log_local_dim",
+    "log_inverse_cutoff",
+    "log_n_states",
+    "conserve_symmetry",
+)
+
+# Default cutoff of the DMRG code
+DEFAULT_CUTOFF = 1e-10
+
+# Bond dimension of the MPO of a Heisenberg chain with nearest-neighbour
+# couplings, used for the size of the environment tensors
+MPO_BOND_DIMENSION = 5
+
+# Memory of the Julia runtime with ITensors.jl loaded
+BASE_MEMORY_KB = 1024**2
+
+_NUMBER = re.compile(r"[-+]?\d*\.?\d+(?:[eE][-+]?\d+)?")
+
+
+def get_local_dim(parameters):
+    """Return the dimension ``2S + 1`` of the spin on every site."""
+    return int(round(2 * float(parameters["S"]))) + 1
+
+
+def get_features(parameters):
+    """Return the features of the scaling model for the input parameters.
+
+    :param parameters: the `parameters` dictionary of a calculation.
+    :return: dictionary of the values of `FEATURES`.
+    :raises KeyError: if `S` or `N_sites` are missing.
+    :raises TypeError: if a value is not a number.
+    :raises ValueError: if a value cannot be converted or is not positive.
+    """
+    n_sites = int(parameters["N_sites"])
+    local_dim = get_local_dim(parameters)
+    cutoff = float(parameters.get("cutoff", DEFAULT_CUTOFF))
+    n_states = int(parameters.get("n_excitations", 0)) + 1
+    symmetry = str(parameters.get("conserve_symmetry", "false")).lower()
+    return {
+        "log_n_sites": math.log(n_sites),
+        "log_local_dim": math.log(local_dim),
+        "log_inverse_cutoff": -math.log(cutoff),
+        "log_n_states": math.log(n_states),
+        "conserve_symmetry": float(symmetry == "true"),
+    }
+
+
+def get_total_time(output_parameters):
+    """Return the runtime in seconds of a finished calculation, if known.
+
+    The `total_time` printed by the code is preferred over the summed time
+    of the sweeps, which misses the start-up and the measurements.
+    """
+    match = _NUMBER.search(str(output_parameters.get("total_time", "")))
+    if match is not None:
+        return float(match.group())
+    return output_parameters.get("sweep_time")
+
+
+def query_training_data(code=None, limit=None):
+    """Return the inputs and results of finished DMRG calculations.
+
+    :param code: only use calculations of this code, if given.
+    :param limit: use at most this many of the latest calculations.
+    :return: list of dictionaries with the `uuid`, the `parameters`, the
+        `bond_dimension` and the `total_time` in seconds.
+    """
+    query = QueryBuilder()
+    query.append(
+        CalcJobNode,
+        filters={
+            "process_type": PROCESS_TYPE,
+            "attributes.exit_status": 0,
+        },
+        project="uuid",
+        tag="calculation",
+    )
+    if code is not None:
+        # The node types of the code classes share no common prefix
+        query.append(
+            Data,
+            filters={"id": code.pk},
+            with_outgoing="calculation",
+        )
+    query.append(
+        Dict,
+        with_outgoing="calculation",
+        edge_filters={"label": "parameters"},
+        project="attributes",
+    )
+    query.append(
+        Dict,
+        with_incoming="calculation",
+        edge_filters={"label": "output_parameters"},
+        project="attributes",
+    )
+    query.order_by({"calculation": {"ctime": "desc"}})
+    if limit is not None:
+        query.limit(limit)
+
+    records = []
+    for uuid, parameters, results in query.iterall():
+        total_time = get_total_time(results)
+        bond_dimension = results.get("max_bond_dimension")
+        if total_time is None or bond_dimension is None:
+            continue
+        records.append(
+            {
+                "uuid": uuid,
+                "parameters": parameters,
+                "bond_dimension": bond_dimension,
+                "total_time": total_time,
+            }
+        )
+    return records
+
+
+def estimate_memory_kb(parameters, bond_dimension):
+    """Return the memory needed to run DMRG at the given bond dimension.
+
+    The MPS of every state, the environment tensors and the two-site
+    tensors of the eigensolver are counted as double precision numbers,
+    on top of the memory of the Julia runtime.
+    """
+    n_sites = int(parameters["N_sites"])
+    local_dim = get_local_dim(parameters)
+    n_states = int(parameters.get("n_excitations", 0)) + 1
+    matrix = bond_dimension**2
+    elements = (
+        n_states * n_sites * local_dim * matrix
+        + n_sites * MPO_BOND_DIMENSION * matrix
+        + 4 * local_dim**2 * matrix
+    )
+    return BASE_MEMORY_KB + int(math.ceil(8 * elements / 1024))
+
+
+class ResourceEstimator:
+    """Scaling model of the walltime and bond dimension of DMRG runs.
+
+    Records with malformed parameters, e.g. of older versions of the
+    plugin, are skipped and counted in `n_skipped`.
+
+    :param records: training data, see `query_training_data`.
+    :param min_samples: the least number of records to fit the model.
+    """
+
+    def __init__(self, records, min_samples=len(FEATURES) + 3):
+        rows, targets = [], []
+        for record in records:
+            try:
+                row = self._design_row(record["parameters"])
+                target = [
+                    math.log(record["bond_dimension"]),
+                    math.log(record["total_time"]),
+                ]
+            except (KeyError, TypeError, ValueError):
+                continue
+            rows.append(row)
+            targets.append(target)
+
+        self.n_skipped = len(records) - len(rows)
+        if len(rows) < min_samples:
+            raise ValueError(
+                f"At least {min_samples} finished calculations are needed "
+                f"to fit the resource model, found {len(rows)}."
+            )
+        self.n_samples = len(rows)
+        design = np.array(rows)
+        targets = np.array(targets)
+        self.models = {}
+        for column, target in enumerate(("bond_dimension", "total_time")):
+            self.models[target] = self._fit(design, targets[:, column])
+
+    @classmethod
+    def from_database(cls, code=None, limit=None, **kwargs):
+        """Fit the model to the finished calculations of the database.
+
+        :param code: only use calculations of this code, if given.
+        :param limit: use at most this many of the latest calculations.
+        """
+        return cls(query_training_data(code=code, limit=limit), **kwargs)
+
+    @staticmethod
+    def _design_row(parameters):
+        features = get_features(parameters)
+        return [1.0] + [features[name] for name in FEATURES]
+
+    @staticmethod
+    def _fit(design, target):
+        """Least squares fit, with the standard deviation of the residuals."""
+        coefficients, *_ = np.linalg.lstsq(design, target, rcond=None)
+        residuals = target - design @ coefficients
+        dof = max(len(target) - design.shape[1], 1)
+        spread = float(np.sqrt(residuals @ residuals / dof))
+        return coefficients, spread
+
+    def _predict(self, target, parameters, sigmas):
+        coefficients, spread = self.models[target]
+        row = np.array(self._design_row(parameters))
+        return float(np.exp(row @ coefficients + sigmas * spread))
+
+    @property
+    def coefficients(self):
+        """The fitted exponents of every target, by feature."""
+        return {
+            target: dict(zip(("intercept",) + FEATURES, coefficients))
+            for target, (coefficients, _) in self.models.items()
+        }
+
+    def predict(self, parameters, sigmas=2.0):
+        """Predict the bond dimension, runtime and memory of a calculation.
+
+        The predictions are upper estimates: the fitted values increased by
+        `sigmas` standard deviations of the residuals of the fit.
+
+        :param parameters: the `parameters` dictionary of the calculation.
+        :param sigmas: number of standard deviations to add.
+        :return: dictionary with the `bond_dimension`, `total_time` in
+            seconds and `memory_kb`.
+        """
+        n_sites = int(parameters["N_sites"])
+        local_dim = get_local_dim(parameters)
+        # The bond dimension of an exact MPS is bounded
+        largest = local_dim ** (n_sites // 2)
+        bond_dimension = self._predict("bond_dimension", parameters, sigmas)
+        bond_dimension = min(int(math.ceil(bond_dimension)), largest)
+        return {
+            "bond_dimension": bond_dimension,
+            "total_time": self._predict("total_time", parameters, sigmas),
+            "memory_kb": estimate_memory_kb(parameters, bond_dimension),
+        }
+
+    def get_options(self, parameters, sigmas=2.0, margin=1.2, overhead=300):
+        """Return the `metadata.options` predicted for a calculation.
+
+        :param parameters: the `parameters` dictionary of the calculation.
+        :param sigmas: number of standard deviations to add.
+        :param margin: factor applied to the predicted walltime and memory.
+        :param overhead: seconds added to the walltime for the start-up.
+        :return: dictionary with `max_wallclock_seconds` and `max_memory_kb`.
+        """
+        prediction = self.predict(parameters, sigmas)
+        walltime = margin * prediction["total_time"] + overhead
+        return {
+            "max_wallclock_seconds": int(math.ceil(walltime)),
+            "max_memory_kb": int(math.ceil(margin * prediction["memory_kb"])),
+        }
@@ -0,0 +1,129 @@
+"""Retrieve policy of the DMRG and dynamical correlator calculations.
+
+Only the output log is stored in the repository by default. Additional
+files are selected with the `retrieve` key of the `settings` input::
+
+    settings = Dict({
+        "retrieve": {
+            "include": ["*.h5"],  # glob patterns of files to store
+            "exclude": ["psi_*.h5"],  # never stored
+            "temporary": ["sites.h5"],  # only passed to the parser
+            "max_stored_size": 100 * 1024**2,  # bytes stored at most
+        }
+    })
+
+The selected files are retrieved temporarily, filtered by the parser and
+stored in the `retrieved_files` output. The folder of a parent
+calculation is never retrieved. `max_stored_size` only limits what is
+stored: all matching files are still copied to the temporary folder, so
+the patterns must not select files too large to transfer.
+"""
+
+import fnmatch
+import pathlib
+
+from aiida.orm import FolderData
+
+RETRIEVE_POLICY_KEYS = ("include", "exclude", "temporary", "max_stored_size")
+
+
+def get_retrieve_policy(settings):
+    """Return the retrieve policy of the settings with all keys set.
+
+    :param settings: the settings dictionary of the calculation.
+    """
+    policy = settings.get("retrieve", {})
+    return {
+        "include": list(policy.get("include", [])),
+        "exclude": list(policy.get("exclude", [])),
+        "temporary": list(policy.get("temporary", [])),
+        "max_stored_size": policy.get("max_stored_size"),
+    }
+
+
+def validate_retrieve_policy(policy):
+    """Validate the `retrieve` key of the settings.
+
+    :return: an error message, or None if the policy is valid.
+    """
+    if not isinstance(policy, dict):
+        return "`retrieve` must be a dictionary."
+
+    unknown = set(policy) - set(RETRIEVE_POLICY_KEYS)
+    if unknown:
+        return f"Unknown `retrieve` keys: {', '.join(sorted(unknown))}."
+
+    for key in ("include", "exclude", "temporary"):
+        patterns = policy.get(key, [])
+        if not isinstance(patterns, list) or not all(
+            isinstance(pattern, str) and pattern for pattern in patterns
+        ):
+            return f"`retrieve.{key}` must be a list of glob patterns."
+        if any(pattern.startswith("/") for pattern in patterns):
+            return f"`retrieve.{key}` patterns must be relative paths."
+
+    limit = policy.get("max_stored_size")
+    if limit is None:
+        return None
+    if isinstance(limit, bool) or not isinstance(limit, int) or limit < 0:
+        return "`retrieve.max_stored_size` must be a non-negative integer."
+
+    return None
+
+
+def get_retrieve_temporary_list(policy):
+    """Return the entries of the `retrieve_temporary_list` of a policy.
+
+    The relative paths of the matched files are kept, so the patterns can
+    also be matched against them after the retrieval.
+    """
+    patterns = policy["include"] + policy["temporary"]
+    return [(pattern, ".", None) for pattern in dict.fromkeys(patterns)]
+
+
+def _matches(path, patterns):
+    """Return whether the relative posix path matches any glob pattern."""
+    return any(fnmatch.fnmatch(path, pattern) for pattern in patterns)
+
+
+def collect_retrieved_files(folder, policy, logger=None):
+    """Store the files of the temporary folder selected by the policy.
+
+    Files matching `include` are stored unless they match `exclude` or
+    `temporary`. Files are added in alphabetical order as long as the
+    total size stays below `max_stored_size`; the others are skipped,
+    although they were already transferred.
+
+    :param folder: path of the temporary folder retrieved by the engine.
+    :param policy: the retrieve policy, see `get_retrieve_policy`.
+    :param logger: optional logger to report skipped files.
+    :return: a `FolderData` with the stored files, or None if there are none.
+    """
+    folder = pathlib.Path(folder)
+    limit = policy["max_stored_size"]
+    excluded = policy["exclude"] + policy["temporary"]
+
+    retrieved_files = FolderData()
+    total_size = 0
+    for filepath in sorted(folder.rglob("*")):
+        if not filepath.is_file():
+            continue
+        path = filepath.relative_to(folder).as_posix()
+        if not _matches(path, policy["include"]) or _matches(path, excluded):
+            continue
+
+        size = filepath.stat().st_size
+        if limit is not None and total_size + size > limit:
+            if logger is not None:
+                logger.warning(
+                    f"Not storing `{path}` ({size} bytes), the retrieved "
+                    f"files would exceed `max_stored_size` ({limit} bytes)."
+                )
+            continue
+
+        total_size += size
+        retrieved_files.base.repository.put_object_from_file(filepath, path)
+
+    if not retrieved_files.base.repository.list_object_names():
+        return None
+    return retrieved_files
@@ -0,0 +1,191 @@
+"""Heisenberg couplings of the magnetic sites of an atomic structure.
+
+The structure can be an ASE `Atoms`, a pymatgen `Structure` or `Molecule`,
+or an AiiDA `StructureData`. The magnetic sites become the DMRG sites, in
+the order of the structure, and every pair of them within the range of the
+exchange is coupled. The exchange is given as
+
+- a list of shells ``[(distance, J), ...]``: a bond gets the J of the
+  shell its length matches within `tolerance`, e.g. the nearest and the
+  next-nearest neighbors;
+- a function of the bond lengths returning the J of every bond, e.g. an
+  exponential decay, which needs an explicit `cutoff`;
+- a dictionary of the above by pair of elements, e.g.
+  ``{("Cu", "Cu"): [(2.9, 23.0)], ("Cu", "Ni"): [(3.1, 5.0)]}``.
+
+Periodic structures are coupled across their boundaries, bonds to several
+images of the same site are added up.
+"""
+
+import itertools
+
+import numpy as np
+from aiida.orm import ArrayData, Dict
+from scipy.spatial import cKDTree
+
+# Elements with open d or f shells, the default magnetic species
+MAGNETIC_ELEMENTS = (
+    *("Ti", "V", "Cr", "Mn", "Fe", "Co", "Ni", "Cu"),
+    *("Mo", "Ru", "Rh", "Re", "Os", "Ir"),
+    *("Ce", "Pr", "Nd", "Pm", "Sm", "Eu", "Gd", "Tb", "Dy", "Ho", "Er"),
+    *("Tm", "Yb", "U", "Np", "Pu"),
+)
+
+
+def read_structure(structure):
+    """Return the symbols, positions, cell and periodicity of a structure.
+
+    :param structure: ASE `Atoms`, pymatgen `Structure` or `Molecule`, or
+        AiiDA `StructureData`.
+    :return: tuple of the symbols, the (N, 3) positions in Angstrom, the
+        (3, 3) cell and the three periodic boundary conditions.
+    """
+    if hasattr(structure, "get_ase"):
+        structure = structure.get_ase()
+
+    if hasattr(structure, "get_chemical_symbols"):
+        symbols = structure.get_chemical_symbols()
+        positions = structure.get_positions()
+        cell = structure.cell.array
+        pbc = structure.pbc
+    elif hasattr(structure, "cart_coords"):
+        symbols = [site.specie.symbol for site in structure]
+        positions = structure.cart_coords
+        lattice = getattr(structure, "lattice", None)
+        cell = np.zeros((3, 3)) if lattice is None else lattice.matrix
+        pbc = (False,) * 3 if lattice is None else lattice.pbc
+    else:
+        raise TypeError(f"unsupported structure {type(structure).__name__}")
+
+    positions = np.asarray(positions, dtype=float).reshape(-1, 3)
+    return np.array(symbols), positions, np.asarray(cell), np.asarray(pbc)
+
+
+def get_image_shifts(cell, pbc, cutoff):
+    """Return the lattice translations reaching all neighbors in `cutoff`.
+
+    :return: (M, 3) array of the translations, the origin first.
+    """
+    cell = np.asarray(cell, dtype=float)
+    ranges = []
+    for axis in range(3):
+        if not pbc[axis]:
+            ranges.append([0])
+            continue
+        # Distance between the lattice planes spanned by the other vectors
+        normal = np.cross(cell[axis - 2], cell[axis - 1])
+        height = abs(np.dot(cell[axis], normal)) / np.linalg.norm(normal)
+        count = int(np.ceil(cutoff / height))
+        ranges.append([0, *range(1, count + 1), *range(-count, 0)])
+    shifts = np.array(list(itertools.product(*ranges)), dtype=float)
+    return shifts @ cell
+
+
+def get_neighbor_pairs(positions, cutoff, cell=None, pbc=(False,) * 3):
+    """Find all pairs of sites closer than `cutoff` with a KD-tree.
+
+    :return: tuple of the arrays `rows` and `cols` with ``rows < cols`` and
+        the `distances`, one entry per bond and periodic image.
+    """
+    positions = np.asarray(positions, dtype=float)
+    cell = np.zeros((3, 3)) if cell is None else cell
+    translations = get_image_shifts(cell, pbc, cutoff)
+    images = positions[np.newaxis] + translations[:, np.newaxis]
+
+    sites = cKDTree(positions)
+    images = cKDTree(images.reshape(-1, 3))
+    pairs = sites.sparse_distance_matrix(images, cutoff, output_type="ndarray")
+    rows, cols = pairs["i"], pairs["j"] % len(positions)
+
+    # Every bond to an image is found from both of its sites
+    keep = rows < cols
+    return rows[keep], cols[keep], pairs["v"][keep]
+
+
+def _get_range(exchange, tolerance):
+    """Return the longest bond of shells, or None for a function."""
+    if callable(exchange):
+        return None
+    shells = np.asarray(exchange, dtype=float).reshape(-1, 2)
+    return shells[:, 0].max() + tolerance
+
+
+def _get_exchange(exchange, distances, tolerance):
+    """Return the J of bonds of the given lengths, 0 outside the shells."""
+    if callable(exchange):
+        return np.asarray(exchange(distances), dtype=float)
+    shells = np.asarray(exchange, dtype=float).reshape(-1, 2)
+    matches = np.abs(distances[:, np.newaxis] - shells[:, 0]) <= tolerance
+    values = shells[matches.argmax(axis=1), 1]
+    return np.where(matches.any(axis=1), values, 0.0)
+
+
+def couplings_from_structure(
+    structure, exchange, species=None, cutoff=None, tolerance=1e-2
+):
+    """Create the couplings node of the magnetic sites of a structure.
+
+    :param structure: ASE `Atoms`, pymatgen `Structure` or `Molecule`, or
+        AiiDA `StructureData`.
+    :param exchange: shells, a function of the bond lengths, or a
+        dictionary of those by pair of elements, see the module docstring.
+    :param species: the magnetic elements, by default `MAGNETIC_ELEMENTS`.
+    :param cutoff: longest bond in Angstrom, required with functions.
+    :param tolerance: largest deviation in Angstrom of a bond from a shell.
+    :return: an `ArrayData` with the arrays `rows`, `cols` and `values`,
+        and `sites`, the index in the structure of every DMRG site.
+    :raises ValueError: if there are no magnetic sites or no range.
+    """
+    symbols, positions, cell, pbc = read_structure(structure)
+    species = MAGNETIC_ELEMENTS if species is None else species
+    sites = np.flatnonzero(np.isin(symbols, list(species)))
+    if not sites.size:
+        raise ValueError("the structure has no magnetic sites")
+
+    rules = exchange if isinstance(exchange, dict) else {None: exchange}
+    if cutoff is None:
+        ranges = [_get_range(rule, tolerance) for rule in rules.values()]
+        if None in ranges:
+            raise ValueError("a `cutoff` is required for exchange functions")
+        cutoff = max(ranges)
+
+    positions = positions[sites]
+    rows, cols, distances = get_neighbor_pairs(positions, cutoff, cell, pbc)
+    values = np.zeros(distances.size)
+    elements = symbols[sites]
+    for pair, rule in rules.items():
+        if pair is None:
+            selected = np.ones(distances.size, dtype=bool)
+        else:
+            first, second = elements[rows], elements[cols]
+            selected = (first == pair[0]) & (second == pair[1])
+            selected |= (first == pair[1]) & (second == pair[0])
+        selected = np.flatnonzero(selected)
+        values[selected] = _get_exchange(rule, distances[selected], tolerance)
+
+    # Bonds to several images of a site are added up
+    bonds, inverse = np.unique(rows * sites.size + cols, return_inverse=True)
+    values = np.bincount(inverse.ravel(), weights=values)
+    nonzero = values != 0
+
+    couplings = ArrayData()
+    couplings.set_array("rows", (bonds // sites.size)[nonzero])
+    couplings.set_array("cols", (bonds % sites.size)[nonzero])
+    couplings.set_array("values", values[nonzero])
+    couplings.set_array("sites", sites)
+    return couplings
+
+
+def get_heisenberg_inputs(structure, exchange, parameters, **kwargs):
+    """Return the `parameters` and `couplings` inputs of a structure.
+
+    :param parameters: the DMRG parameters without `N_sites` and `J`.
+    :param kwargs: passed on to `couplings_from_structure`.
+    :return: dictionary of the inputs of a `DMRGCalculation`.
+    """
+    couplings = couplings_from_structure(structure, exchange, **kwargs)
+    n_sites = couplings.get_shape("sites")[0]
+    return {
+        "parameters": Dict({**parameters, "N_sites": n_sites}),
+        "couplings": couplings,
+    }
@@ -1,37 +1,148 @@
 """Base workchain for DMRG calculations."""
 
+from aiida.common import AttributeDict
 from aiida.engine import (  # noqa: E501
     BaseRestartWorkChain,
     ProcessHandlerReport,
+    calcfunction,
     process_handler,
+    while_,
 )
-from aiida.orm import RemoteData
+from aiida.orm import Bool, Dict, List, Str
 from aiida.plugins import CalculationFactory
 
+from ..utils.index import (  # noqa: E501
+    find_ground_states,
+    get_output_flags,
+    index_calculation,
+)
+from ..utils.resources import ResourceEstimator
+
 DMRGCalculation = CalculationFactory("dmrg")
 
+# Uses of an earlier calculation of the same Hamiltonian, see `reuse`
+REUSE_MODES = ("skip", "warm_start")
+
+
+@calcfunction
+def build_escalation_history(escalations):
+    """Return the escalation history of a `List` of resource changes."""
+    return Dict({"escalations": escalations.get_list()})
+
+
+def validate_resource_limits(value, _):
+    """Validate the `resource_limits` input."""
+    if value is None:
+        return None
+    limits = value.get_dict()
+
+    unknown = set(limits) - set(DMRGBaseWorkChain.resource_defaults)
+    if unknown:
+        return f"Unknown `resource_limits`: {', '.join(sorted(unknown))}."
+    for key, limit in limits.items():
+        if isinstance(limit, bool) or not isinstance(limit, (int, float)):
+            return f"`resource_limits.{key}` must be a number."
+        if key.endswith("_factor") and limit <= 1:
+            return f"`resource_limits.{key}` must be larger than 1."
+        if limit <= 0:
+            return f"`resource_limits.{key}` must be positive."
+    return None
+
+
+def validate_reuse(value, _):
+    """Validate the `reuse` input."""
+    if value is not None and value.value not in REUSE_MODES:
+        return f"`reuse` must be one of {', '.join(REUSE_MODES)}."
+    return None
+
 
 class DMRGBaseWorkChain(BaseRestartWorkChain):
-    """Base workchain for DMRG calculations."""
+    """Base workchain for DMRG calculations.
+
+    Runs the `DMRGCalculation` until it finishes successfully. A calculation
+    that runs out of walltime is continued from its last MPS checkpoint, see
+    the `checkpoint_sweeps` parameter.
+    """
 
     _process_class = DMRGCalculation
 
+    # Factors by which the resources are scaled after a failure, and the
+    # largest values they are scaled to. No limit by default.
+    resource_defaults = {
+        "memory_factor": 2,
+        "walltime_factor": 2,
+        "machines_factor": 2,
+        "max_memory_kb": None,
+        "max_wallclock_seconds": None,
+        "max_num_machines": None,
+    }
+
     @classmethod
     def define(cls, spec):
 
         super().define(spec)
         spec.expose_inputs(DMRGCalculation, namespace="dmrg")
+        spec.input(
+            "resource_limits",
+            valid_type=Dict,
+            required=False,
+            validator=validate_resource_limits,
+            help="""Scaling factors (`memory_factor`, `walltime_factor`,
+            `machines_factor`) and caps (`max_memory_kb`,
+            `max_wallclock_seconds`, `max_num_machines`) of the resources
+            of a resubmitted calculation""",
+        )
+        spec.input(
+            "estimate_resources",
+            valid_type=Bool,
+            default=lambda: Bool(False),
+            help="""Set the `max_wallclock_seconds` and `max_memory_kb`
+            options that are not given from a fit to the earlier
+            calculations of the same code""",
+        )
+        spec.input(
+            "reuse",
+            valid_type=Str,
+            required=False,
+            validator=validate_reuse,
+            help="""Use an earlier calculation of the same Hamiltonian from
+            the index: `skip` returns the outputs of one with at least as
+            many states and a cutoff at least as tight instead of running,
+            `warm_start` starts from the checkpoint of the one with the
+            tightest cutoff""",
+        )
 
         spec.outline(
             cls.setup,
-            cls.run_dmrg,
-            cls.finalize,
+            while_(cls.should_run_process)(
+                cls.run_process,
+                cls.inspect_process,
+            ),
+            cls.results,
         )
 
-        spec.output("remote_folder", valid_type=RemoteData, required=True)
+        spec.expose_outputs(DMRGCalculation)
+        spec.output(
+            "escalation_history",
+            valid_type=Dict,
+            required=False,
+            help="""The resources changed after every failed calculation,
+            with the reason""",
+        )
 
         spec.outputs.dynamic = True
 
+        spec.exit_code(
+            310,
+            "ERROR_UNRECOVERABLE_FAILURE",
+            message="The DMRG calculation failed with an unrecoverable error.",
+        )
+        spec.exit_code(
+            320,
+            "ERROR_RESOURCE_LIMIT_REACHED",
+            message="The resources cannot be scaled beyond their limits.",
+        )
+
     def setup(self):
         """Call the `setup` and create the inputs dictionary
         in `self.ctx.inputs`.
@@ -41,47 +152,288 @@ class DMRGBaseWorkChain(BaseRestartWorkChain):
         in the internal loop.
         """
         super().setup()
-        self.ctx.inputs = self.exposed_inputs(DMRGCalculation, "dmrg")
-        self.ctx.remote_folder = None
+        inputs = self.exposed_inputs(DMRGCalculation, "dmrg")
+        self.ctx.inputs = AttributeDict(inputs)
+        # Remote folder of the latest calculation that wrote a checkpoint
+        self.ctx.checkpoint_folder = None
+
+        self.ctx.resource_limits = dict(self.resource_defaults)
+        if "resource_limits" in self.inputs:
+            limits = self.inputs.resource_limits.get_dict()
+            self.ctx.resource_limits.update(limits)
+        self.ctx.escalations = []
+
+        if "reuse" in self.inputs:
+            self._reuse_earlier_calculation(self.inputs.reuse.value)
+
+        if self.inputs.estimate_resources:
+            self._estimate_resources()
+
+    def inspect_process(self):
+        """Analyse the last calculation, index it if it finished and record
+        the escalations if the workchain aborts."""
+        exit_code = super().inspect_process()
+        if exit_code is not None and exit_code.status:
+            self._output_escalation_history()
+
+        # Index the Hamiltonian for the lookup of earlier results, cached
+        # clones are found through their source already
+        node = self.ctx.children[self.ctx.iteration - 1]
+        cached = node.base.caching.get_cache_source() is not None
+        if node.is_finished_ok and not cached:
+            index_calculation(node)
+        return exit_code
+
+    def results(self):
+        """Attach the outputs of the last calculation and the escalations."""
+        self._output_escalation_history()
+        return super().results()
 
     @process_handler(
         priority=400,
         exit_codes=[
             DMRGCalculation.exit_codes.ERROR_UNPHYISCAL_INPUT,
             DMRGCalculation.exit_codes.ERROR_TERMINATION,
+            DMRGCalculation.exit_codes.ERROR_ENERGY_DIVERGED,
         ],
     )
     def inspect_dmrg(self, node):
-        """Verify that the DMRG calculation finished successfully."""
-        node = self.ctx.dmrg
+        """Abort on errors that a restart cannot fix."""
+        self.report(
+            f"{node.process_label}<{node.pk}> failed with exit status "
+            f"{node.exit_status}: {node.exit_message}"
+        )
+        exit_code = self.exit_codes.ERROR_UNRECOVERABLE_FAILURE
+        return ProcessHandlerReport(True, exit_code)
+
+    @process_handler(
+        priority=600,
+        exit_codes=[
+            DMRGCalculation.exit_codes.ERROR_SCHEDULER_OUT_OF_MEMORY,
+            DMRGCalculation.exit_codes.ERROR_MEMORY_GROWTH,
+        ],
+    )
+    def handle_out_of_memory(self, node):
+        """Resubmit with more memory, or on more machines at the limit."""
+        changes = self._scale_memory() or self._scale_machines()
+        return self._escalate(node, "out of memory", changes)
+
+    @process_handler(
+        priority=590,
+        exit_codes=[
+            DMRGCalculation.exit_codes.ERROR_MPI_ABORT,
+            DMRGCalculation.exit_codes.ERROR_SCHEDULER_NODE_FAILURE,
+        ],
+    )
+    def handle_mpi_abort(self, node):
+        """Resubmit on more machines after a killed MPI process.
+
+        Processes are mostly killed for exceeding the memory of a machine,
+        so the same memory is spread over more machines, or increased.
+        """
+        changes = self._scale_machines() or self._scale_memory()
+        return self._escalate(node, "killed MPI process", changes)
+
+    @process_handler(
+        priority=500,
+        exit_codes=[
+            DMRGCalculation.exit_codes.ERROR_SCHEDULER_OUT_OF_WALLTIME,
+        ],
+    )
+    def handle_out_of_walltime(self, node):
+        """Continue from the last checkpoint after running out of walltime.
+
+        A calculation that wrote a checkpoint is continued with the same
+        walltime. Otherwise the walltime is increased and the calculation
+        continues from the previous checkpoint, or from the original inputs.
+        """
+        checkpoint_sweep = self._get_checkpoint_sweep(node)
+        if checkpoint_sweep is not None:
+            self.ctx.checkpoint_folder = node.outputs.remote_folder
+            self.ctx.inputs.parent_calc_folder = self.ctx.checkpoint_folder
+            self.report(
+                f"{node.process_label}<{node.pk}> ran out of walltime, "
+                f"restarting from the checkpoint after sweep "
+                f"{checkpoint_sweep} in "
+                f"RemoteData<{self.ctx.checkpoint_folder.pk}>"
+            )
+            return ProcessHandlerReport(True)
+
+        if self.ctx.checkpoint_folder is not None:
+            self.ctx.inputs.parent_calc_folder = self.ctx.checkpoint_folder
+
+        changes = self._scale_option(
+            "max_wallclock_seconds",
+            self.ctx.resource_limits["walltime_factor"],
+            self.ctx.resource_limits["max_wallclock_seconds"],
+        )
+        return self._escalate(node, "out of walltime", changes)
+
+    def _reuse_earlier_calculation(self, mode):
+        """Skip the run or warm-start from an earlier calculation.
+
+        The calculations of the same Hamiltonian are looked up in the index
+        of `aiida_dmrg.utils.index`. A skipped run returns the outputs of the
+        earlier calculation as if it was the first iteration, so it must
+        also have written the same HDF5 file and checkpoints.
+        """
+        inputs = self.ctx.inputs
+        parameters = inputs.parameters.get_dict()
+        matches = find_ground_states(
+            parameters,
+            inputs.get("couplings"),
+            inputs.get("coupling_matrix"),
+            tighter_only=mode == "skip",
+        )
+        if mode == "skip":
+            flags = get_output_flags(parameters)
+            matches = [
+                node
+                for node in matches
+                if get_output_flags(node.inputs.parameters.get_dict()) == flags
+            ]
+        if mode == "skip" and matches:
+            node = matches[0]
+            label = f"{node.process_label}<{node.pk}>"
+            self.report(f"Reusing the results of {label}")
+            self.ctx.children = [node]
+            self.ctx.iteration = 1
+            self.ctx.is_finished = True
+            return
+
+        if mode == "warm_start" and "parent_calc_folder" not in inputs:
+            for node in matches:
+                results = node.outputs.output_parameters.get_dict()
+                if "checkpoint_sweep" not in results:
+                    continue
+                label = f"{node.process_label}<{node.pk}>"
+                self.report(f"Warm-starting from {label}")
+                inputs.parent_calc_folder = node.outputs.remote_folder
+                return
+
+    def _estimate_resources(self):
+        """Fill the missing resource options from the earlier calculations.
+
+        The estimates are capped by the `resource_limits`. Without enough
+        earlier calculations the options are left unchanged.
+        """
         try:
-            if not node.is_finished_ok:
-                self.report(
-                    f"""calculation failed with
-                             exit status {node.exit_status}"""
-                )
-                return self.exit_codes.ERROR_TERMINATION
-        except Exception as e:
-            self.report(f"calculation failed with exception: {e}")
-            return self.exit_codes.ERROR_UNPHYISCAL_INPUT
+            code = self.ctx.inputs.code
+            estimator = ResourceEstimator.from_database(code=code)
+        except ValueError as exc:
+            self.report(f"Not estimating the resources: {exc}")
+            return
+        if estimator.n_skipped:
+            self.report(
+                f"Skipped {estimator.n_skipped} earlier calculations with "
+                "malformed parameters in the resource estimate"
+            )
+
+        parameters = self.ctx.inputs.parameters.get_dict()
+        options = self.ctx.inputs.metadata.setdefault("options", {})
+        for key, value in estimator.get_options(parameters).items():
+            if options.get(key) is not None:
+                continue
+            limit = self.ctx.resource_limits[key]
+            options[key] = value if limit is None else min(value, int(limit))
+            self.report(
+                f"Estimated {key} = {options[key]} from "
+                f"{estimator.n_samples} earlier calculations"
+            )
+
+    def _escalate(self, node, reason, changes):
+        """Record the changed resources, or abort if none could be changed.
 
+        :param node: the failed calculation.
+        :param reason: short description of the failure.
+        :param changes: dictionary of the changed options with their old and
+            new values.
+        """
+        if not changes:
+            self.report(
+                f"{node.process_label}<{node.pk}> failed ({reason}), but "
+                "the resources are already at their limits"
+            )
+            exit_code = self.exit_codes.ERROR_RESOURCE_LIMIT_REACHED
+            return ProcessHandlerReport(True, exit_code)
+
+        self.ctx.escalations.append(
+            {
+                "iteration": self.ctx.iteration,
+                "calculation": node.uuid,
+                "reason": reason,
+                "changes": changes,
+            }
+        )
+        summary = ", ".join(
+            f"{key} {old} -> {new}" for key, (old, new) in changes.items()
+        )
+        self.report(
+            f"{node.process_label}<{node.pk}> failed ({reason}), "
+            f"resubmitting with {summary}"
+        )
         return ProcessHandlerReport(True)
 
-    def run_dmrg(self):
-        """Run the DMRG calculation."""
-        builder = DMRGCalculation.get_builder()
+    @staticmethod
+    def _scale(old, factor, limit):
+        """Return the scaled value up to the limit, or None at the limit."""
+        new = int(old * factor)
+        if limit is not None:
+            new = min(new, int(limit))
+        return new if new > old else None
+
+    def _scale_option(self, key, factor, limit):
+        """Scale a scheduler option up to its limit.
+
+        :return: the change as ``{key: [old, new]}``, or None if the option
+            is not set or already at its limit.
+        """
+        options = self.ctx.inputs.metadata["options"]
+        old = options.get(key)
+        new = None if old is None else self._scale(old, factor, limit)
+        if new is None:
+            return None
+        options[key] = new
+        return {key: [old, new]}
+
+    def _scale_memory(self):
+        """Scale the memory of the calculation up to its limit."""
+        return self._scale_option(
+            "max_memory_kb",
+            self.ctx.resource_limits["memory_factor"],
+            self.ctx.resource_limits["max_memory_kb"],
+        )
+
+    def _scale_machines(self):
+        """Scale the number of machines up to its limit.
 
-        builder.code = self.inputs.dmrg.code
-        builder.parameters = self.inputs.dmrg.parameters
-        if self.ctx.remote_folder is not None:
-            builder.parent_calc_folder = self.ctx.remote_folder
-        builder.metadata.options = self.ctx.inputs.metadata.options
-        self.report("Submitting DMRG calculation.")
-        self.to_context(dmrg=self.submit(builder))
+        The total number of MPI processes is kept, so every process gets the
+        memory of a larger share of a machine.
+        """
+        options = self.ctx.inputs.metadata["options"]
+        resources = options.get("resources", {})
+        old = resources.get("num_machines")
+        limits = self.ctx.resource_limits
+        new = None
+        if old is not None:
+            factor = limits["machines_factor"]
+            new = self._scale(old, factor, limits["max_num_machines"])
+        if new is None:
+            return None
+        options["resources"] = {**resources, "num_machines": new}
+        return {"num_machines": [old, new]}
 
-    def finalize(self):
-        """Finalize the workchain."""
-        self.ctx.remote_folder = self.ctx.dmrg.outputs.remote_folder
-        self.out("remote_folder", self.ctx.remote_folder)
+    def _output_escalation_history(self):
+        """Attach the escalation history as output, if there is one."""
+        if not self.ctx.escalations or "escalation_history" in self.outputs:
+            return
+        history = build_escalation_history(List(self.ctx.escalations))
+        self.out("escalation_history", history)
 
-        self.report("DMRG workchain completed successfully")
+    @staticmethod
+    def _get_checkpoint_sweep(node):
+        """Return the sweep of the last checkpoint written by a calculation."""
+        if "output_parameters" not in node.outputs:
+            return None
+        parameters = node.outputs.output_parameters.get_dict()
+        return parameters.get("checkpoint_sweep")
@@ -0,0 +1,280 @@
+"""Workchain converging the DMRG energy with respect to the cutoff."""
+
+import numpy as np
+from aiida.common import AttributeDict
+from aiida.engine import ToContext, WorkChain, calcfunction, while_
+from aiida.orm import Dict, Float, Int, List
+from aiida.plugins import WorkflowFactory
+
+from ..calculations.dmrggen import validate_inputs as validate_dmrg_inputs
+from ..utils.resources import DEFAULT_CUTOFF, get_total_time
+
+DMRGBaseWorkChain = WorkflowFactory("dmrg.base")
+
+
+def extrapolate_energy(truncation_errors, energies):
+    """Extrapolate the energies linearly to zero truncation error.
+
+    The DMRG energy approaches the exact one linearly in the discarded
+    weight of its final sweep, so the intercept of a linear fit is the
+    extrapolated energy.
+
+    :return: the extrapolated energy, or None with fewer than two distinct
+        truncation errors.
+    """
+    points = [
+        (error, energy)
+        for error, energy in zip(truncation_errors, energies)
+        if error is not None and energy is not None
+    ]
+    if len({error for error, _ in points}) < 2:
+        return None
+    errors, energies = np.array(points).T
+    _, intercept = np.polyfit(errors, energies, 1)
+    return float(intercept)
+
+
+def step_label(index):
+    """Return the link label of the step with an index."""
+    return f"step_{index}"
+
+
+def get_step(cutoff, results, previous=None):
+    """Return the row of a step in the convergence table.
+
+    :param cutoff: the cutoff of the step.
+    :param results: the `output_parameters` dictionary of the step.
+    :param previous: the row of the previous step, if any.
+    """
+    step = {
+        "cutoff": cutoff,
+        "energy": results.get("energy_min"),
+        "truncation_error": results.get("final_truncation_error"),
+        "max_bond_dimension": results.get("max_bond_dimension"),
+        "total_time": get_total_time(results),
+    }
+    energies = (step["energy"], previous and previous["energy"])
+    if None not in energies:
+        step["energy_change"] = abs(step["energy"] - previous["energy"])
+    return step
+
+
+@calcfunction
+def collect_convergence(cutoffs, energy_tolerance, **output_parameters):
+    """Tabulate the steps and extrapolate the energy.
+
+    :param cutoffs: `List` of the cutoffs of the steps.
+    :param energy_tolerance: `Float` largest energy change of a converged
+        step.
+    :param output_parameters: the `output_parameters` of the steps by
+        `step_label`.
+    """
+    steps = []
+    cutoffs = cutoffs.get_list()[: len(output_parameters)]
+    for index, cutoff in enumerate(cutoffs):
+        results = output_parameters[step_label(index)].get_dict()
+        steps.append(get_step(cutoff, results, steps[-1] if steps else None))
+
+    energy_change = steps[-1].get("energy_change", np.inf)
+    convergence = {
+        "converged": energy_change < energy_tolerance.value,
+        "cutoff": steps[-1]["cutoff"],
+        "energy": steps[-1]["energy"],
+        "steps": steps,
+        "total_time": sum(step["total_time"] or 0 for step in steps),
+    }
+    extrapolated = extrapolate_energy(
+        [step["truncation_error"] for step in steps],
+        [step["energy"] for step in steps],
+    )
+    if extrapolated is not None:
+        convergence["extrapolated_energy"] = extrapolated
+    return Dict(convergence)
+
+
+def validate_inputs(inputs, _):
+    """Validate the sequence of cutoffs."""
+    if "cutoffs" in inputs:
+        cutoffs = inputs["cutoffs"].get_list()
+        if not cutoffs or any(cutoff <= 0 for cutoff in cutoffs):
+            return "`cutoffs` must be a list of positive numbers."
+        if any(new >= old for old, new in zip(cutoffs, cutoffs[1:])):
+            return "`cutoffs` must be decreasing."
+    if not 0 < inputs["cutoff_factor"].value < 1:
+        return "`cutoff_factor` must be between 0 and 1."
+    if inputs["max_iterations"].value < 2:
+        return "`max_iterations` must be at least 2."
+
+    dmrg = inputs["base"]["dmrg"]
+    parameters = dmrg["parameters"].get_dict()
+    if "checkpoint_sweeps" not in parameters:
+        return "The warm starts need `checkpoint_sweeps` in `parameters`."
+
+    # The template is completed with the `cutoff` of every step
+    parameters = Dict({"cutoff": DEFAULT_CUTOFF, **parameters})
+    return validate_dmrg_inputs({**dmrg, "parameters": parameters}, None)
+
+
+class CutoffConvergenceWorkChain(WorkChain):
+    """
+    WorkChain tightening the DMRG `cutoff` until the energy is converged.
+
+    Every step runs a `DMRGBaseWorkChain` with a smaller cutoff, starting
+    from the MPS of the previous step through its `parent_calc_folder`.
+    The MPS is only written with the `checkpoint_sweeps` parameter, which
+    is therefore required. The sequence stops once the lowest energy
+    changes by less than `energy_tolerance`.
+    """
+
+    @classmethod
+    def define(cls, spec):
+        super().define(spec)
+
+        spec.expose_inputs(DMRGBaseWorkChain, namespace="base")
+        spec.input(
+            "cutoffs",
+            valid_type=List,
+            required=False,
+            help="""Decreasing cutoffs of the steps. By default the cutoff
+            of the parameters, or the default cutoff 1e-10 of the code, is
+            multiplied by `cutoff_factor` at every step.""",
+        )
+        spec.input(
+            "cutoff_factor",
+            valid_type=Float,
+            default=lambda: Float(0.1),
+            help="Factor by which the cutoff is reduced at every step",
+        )
+        spec.input(
+            "max_iterations",
+            valid_type=Int,
+            default=lambda: Int(6),
+            help="The most steps without an explicit list of `cutoffs`",
+        )
+        spec.input(
+            "energy_tolerance",
+            valid_type=Float,
+            default=lambda: Float(1e-6),
+            help="""Largest change of the lowest energy between two steps
+            for the energy to be converged""",
+        )
+        spec.inputs.validator = validate_inputs
+        # `cutoff` is set for every step, see `validate_inputs`
+        spec.inputs["base"]["dmrg"].validator = None
+
+        spec.outline(
+            cls.setup,
+            while_(cls.should_run_step)(
+                cls.run_step,
+                cls.inspect_step,
+            ),
+            cls.results,
+        )
+
+        spec.expose_outputs(DMRGBaseWorkChain)
+        spec.output(
+            "convergence",
+            valid_type=Dict,
+            help="""The cutoff, energy, energy change, truncation error,
+            bond dimension and compute time of every step, and the energy
+            extrapolated to zero truncation error""",
+        )
+
+        spec.exit_code(
+            400,
+            "ERROR_STEP_FAILED",
+            message="The DMRG calculation of a cutoff step failed.",
+        )
+        spec.exit_code(
+            401,
+            "ERROR_NOT_CONVERGED",
+            message="The energy did not converge within the cutoffs.",
+        )
+
+    def setup(self):
+        """Prepare the sequence of cutoffs."""
+        if "cutoffs" in self.inputs:
+            self.ctx.cutoffs = self.inputs.cutoffs.get_list()
+        else:
+            parameters = self.inputs.base.dmrg.parameters.get_dict()
+            cutoff = parameters.get("cutoff", DEFAULT_CUTOFF)
+            factor = self.inputs.cutoff_factor.value
+            self.ctx.cutoffs = [
+                cutoff * factor**step
+                for step in range(self.inputs.max_iterations.value)
+            ]
+
+        self.ctx.steps = []
+        self.ctx.output_parameters = {}
+        self.ctx.converged = False
+        dmrg_inputs = self.inputs.base.dmrg
+        self.ctx.parent_calc_folder = dmrg_inputs.get("parent_calc_folder")
+
+    def should_run_step(self):
+        """Return whether another cutoff has to be computed."""
+        if self.ctx.converged:
+            return False
+        return len(self.ctx.steps) < len(self.ctx.cutoffs)
+
+    def run_step(self):
+        """Run the DMRG with the next cutoff from the previous MPS."""
+        cutoff = self.ctx.cutoffs[len(self.ctx.steps)]
+        inputs = AttributeDict(self.exposed_inputs(DMRGBaseWorkChain, "base"))
+        inputs.dmrg = AttributeDict(inputs.dmrg)
+        parameters = inputs.dmrg.parameters.get_dict()
+        inputs.dmrg.parameters = Dict({**parameters, "cutoff": cutoff})
+        if self.ctx.parent_calc_folder is not None:
+            inputs.dmrg.parent_calc_folder = self.ctx.parent_calc_folder
+        inputs.metadata = {"call_link_label": step_label(len(self.ctx.steps))}
+
+        running = self.submit(DMRGBaseWorkChain, **inputs)
+        label = f"{running.process_label}<{running.pk}>"
+        self.report(f"Launched {label} with cutoff {cutoff:g}")
+        return ToContext(workchain=running)
+
+    def inspect_step(self):
+        """Record the energy of the step and check its convergence."""
+        workchain = self.ctx.workchain
+        if not workchain.is_finished_ok:
+            self.report(
+                f"{workchain.process_label}<{workchain.pk}> failed with "
+                f"exit status {workchain.exit_status}"
+            )
+            return self.exit_codes.ERROR_STEP_FAILED
+
+        output_parameters = workchain.outputs.output_parameters
+        step = get_step(
+            self.ctx.cutoffs[len(self.ctx.steps)],
+            output_parameters.get_dict(),
+            self.ctx.steps[-1] if self.ctx.steps else None,
+        )
+        if "energy_change" in step:
+            tolerance = self.inputs.energy_tolerance.value
+            self.ctx.converged = step["energy_change"] < tolerance
+
+        label = step_label(len(self.ctx.steps))
+        self.ctx.output_parameters[label] = output_parameters
+        self.ctx.steps.append(step)
+        self.ctx.parent_calc_folder = workchain.outputs.remote_folder
+        self.report(
+            f"Cutoff {step['cutoff']:g}: energy {step['energy']}, change "
+            f"{step.get('energy_change')}, {step['total_time']} s"
+        )
+        return None
+
+    def results(self):
+        """Attach the outputs of the last step and the convergence."""
+        convergence = collect_convergence(
+            List(self.ctx.cutoffs),
+            self.inputs.energy_tolerance,
+            **self.ctx.output_parameters,
+        )
+        self.out("convergence", convergence)
+
+        outputs = self.exposed_outputs(self.ctx.workchain, DMRGBaseWorkChain)
+        self.out_many(outputs)
+
+        if not self.ctx.converged:
+            self.report("The energy did not converge within the cutoffs.")
+            return self.exit_codes.ERROR_NOT_CONVERGED
+        return None
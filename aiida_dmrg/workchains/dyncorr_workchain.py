@@ -1,16 +1,99 @@
 # DYNCORR_WORKCHAIN.PY
-from aiida.engine import WorkChain
-from aiida.orm import Code, Dict, RemoteData
+import numpy as np
+from aiida.engine import WorkChain, append_, calcfunction, if_
+from aiida.orm import ArrayData, Code, Dict, Int, RemoteData
 from aiida.plugins import CalculationFactory, WorkflowFactory
 
 DMRGBaseWorkChain = WorkflowFactory("dmrg.base")
 DynCorrCalculation = CalculationFactory("dyncorr")
 
 
+def get_omega_chunks(parameters, n_chunks):
+    """Split the omega grid of the parameters into consecutive windows.
+
+    Every window is computed with the same number of Chebyshev terms `N`,
+    so its points are exactly those of the full grid.
+
+    :param parameters: the dynamical correlator parameters.
+    :param n_chunks: the number of windows.
+    :return: list of the parameters of every window.
+    """
+    num_points = int(parameters["num_points"])
+    omega = np.linspace(0, parameters["E_range"], num_points)
+    chunks = []
+    for indices in np.array_split(np.arange(num_points), n_chunks):
+        chunk = dict(parameters)
+        chunk["omega_min"] = float(omega[indices[0]])
+        chunk["E_range"] = float(omega[indices[-1]])
+        chunk["num_points"] = int(indices.size)
+        chunks.append(chunk)
+    return chunks
+
+
+@calcfunction
+def merge_omega_chunks(**chunks):
+    """Concatenate the dynamical correlators of the omega windows.
+
+    :param chunks: the `output_matrix` of every window, in the order of the
+        grid when sorted by their labels.
+    """
+    matrices = [chunks[label] for label in sorted(chunks)]
+    axes = {matrix.base.attributes.get("omega_axis") for matrix in matrices}
+    if len(axes) != 1 or None in axes:
+        raise ValueError("The omega axis of the windows is not consistent.")
+    (axis,) = axes
+
+    merged = ArrayData()
+    merged.set_array(
+        "matrix",
+        np.concatenate([m.get_array("matrix") for m in matrices], axis),
+    )
+    merged.set_array(
+        "omega",
+        np.concatenate([m.get_array("omega") for m in matrices]),
+    )
+    merged.base.attributes.set("omega_axis", axis)
+    return merged
+
+
+def validate_inputs(inputs, _):
+    """Validate the ground state and the splitting of the omega grid."""
+    if "parent_calc_folder" not in inputs:
+        dmrg_inputs = ("dmrg_code", "dmrg_params")
+        missing = [key for key in dmrg_inputs if key not in inputs]
+        if missing:
+            return (
+                f"{', '.join(missing)} required to compute the ground "
+                "state without `parent_calc_folder`."
+            )
+
+    if ("dyncorr_params" in inputs) == bool(inputs.get("dyncorr_scan")):
+        return "Specify either `dyncorr_params` or `dyncorr_scan`."
+
+    n_chunks = inputs["n_chunks"].value
+    if n_chunks < 1:
+        return "`n_chunks` must be positive."
+    if n_chunks == 1:
+        return None
+
+    scan = inputs.get("dyncorr_scan") or {"": inputs["dyncorr_params"]}
+    for parameters in scan.values():
+        parameters = parameters.get_dict()
+        if "N" not in parameters:
+            return "`N` is required in the parameters to use `n_chunks`."
+        if n_chunks > int(parameters["num_points"]):
+            return "`n_chunks` cannot exceed `num_points`."
+    return None
+
+
 class DynCorrWorkChain(WorkChain):
     """
     WorkChain that runs DMRG calculation followed
     by Dynamic Correlator calculation.
+
+    The DMRG ground state is computed once, or taken from the
+    `parent_calc_folder`, and shared by all dynamical correlators of the
+    `dyncorr_scan`, which run at the same time.
     """
 
     @classmethod
@@ -21,6 +104,7 @@ class DynCorrWorkChain(WorkChain):
         spec.input(
             "dmrg_code",
             valid_type=Code,
+            required=False,
             help="The `dmrg` code.",
         )
         spec.input(
@@ -34,18 +118,36 @@ class DynCorrWorkChain(WorkChain):
             "parent_calc_folder",
             valid_type=RemoteData,
             required=False,
-            help="DMRG calculation folder",
+            help="""Folder of a finished DMRG calculation, whose ground
+            state is used instead of running the DMRG""",
         )
         spec.input(
             "dmrg_params",
             valid_type=Dict,
+            required=False,
             help="DMRG parameters",
         )
         spec.input(
             "dyncorr_params",
             valid_type=Dict,
+            required=False,
             help="Dynamic Correlator parameters",
         )
+        spec.input_namespace(
+            "dyncorr_scan",
+            valid_type=Dict,
+            dynamic=True,
+            help="""Dynamic Correlator parameters of several calculations
+            from the same ground state, by label""",
+        )
+        spec.input(
+            "n_chunks",
+            valid_type=Int,
+            default=lambda: Int(1),
+            help="""Number of windows of the omega grid computed by
+            concurrent calculations from the same DMRG folder""",
+        )
+        spec.inputs.validator = validate_inputs
         spec.input_namespace(
             "options",
             valid_type=int,
@@ -55,13 +157,22 @@ class DynCorrWorkChain(WorkChain):
         )
 
         spec.outline(
-            # cls.setup,
-            cls.run_dmrg,
+            cls.setup,
+            if_(cls.should_run_dmrg)(
+                cls.run_dmrg,
+                cls.inspect_dmrg,
+            ),
             cls.run_dyncorr,
             cls.finalize,
         )
 
-        spec.output("output_matrix", valid_type=Dict)
+        spec.output("output_matrix", valid_type=ArrayData, required=False)
+        spec.output_namespace(
+            "output_matrices",
+            valid_type=ArrayData,
+            dynamic=True,
+            help="The output matrix of every label of the `dyncorr_scan`",
+        )
         spec.outputs.dynamic = True
 
         spec.exit_code(
@@ -75,6 +186,14 @@ class DynCorrWorkChain(WorkChain):
             message="Dynamic Correlator calculation failed.",
         )
 
+    def setup(self):
+        """Take the ground state from the inputs, if it is given."""
+        self.ctx.parent_calc_folder = self.inputs.get("parent_calc_folder")
+
+    def should_run_dmrg(self):
+        """Return whether the ground state has to be computed."""
+        return self.ctx.parent_calc_folder is None
+
     def run_dmrg(self):
         self.report("Running DMRG calculation...")
         builder = DMRGBaseWorkChain.get_builder()
@@ -82,35 +201,91 @@ class DynCorrWorkChain(WorkChain):
         builder.dmrg.metadata.options = self.inputs.options["dmrg"]
         builder.dmrg.parameters = self.inputs.dmrg_params
 
-        if "parent_calc_folder" in self.inputs:
-            builder.parent_calc_folder = self.inputs.parent_calc_folder
-
         dmrg_running = self.submit(builder)
         self.to_context(dmrg=dmrg_running)
 
+    def inspect_dmrg(self):
+        """Use the ground state of a successful DMRG calculation."""
+        if not self.ctx.dmrg.is_finished_ok:
+            self.report("DMRG calculation did not finish successfully.")
+            return self.exit_codes.ERROR_DMRG_FAILED
+        self.ctx.parent_calc_folder = self.ctx.dmrg.outputs.remote_folder
+        return None
+
     def run_dyncorr(self):
         self.report("Running Dynamic Correlator calculation...")
 
-        # if not self.ctx.dmrg.is_finished_ok:
-        #     self.report("DMRG calculation did not finish successfully.")
-        #     return self.exit_codes.ERROR_DMRG_FAILED
-
         builder = DynCorrCalculation.get_builder()
-        builder.parent_calc_folder = self.ctx.dmrg.outputs.remote_folder
+        builder.parent_calc_folder = self.ctx.parent_calc_folder
         builder.code = self.inputs.dyncorr_code
-        builder.parameters = self.inputs.dyncorr_params
         builder.metadata.options = self.inputs.options["dyncorr"]
 
-        dyncorr_running = self.submit(builder)
-        self.to_context(dyncorr=dyncorr_running)
+        # All calculations and omega windows share the ground state and
+        # run at the same time
+        n_chunks = self.inputs.n_chunks.value
+        for label, parameters in self._get_dyncorr_parameters().items():
+            if n_chunks == 1:
+                chunks = [parameters]
+            else:
+                chunks = get_omega_chunks(parameters, n_chunks)
+            for chunk in chunks:
+                builder.parameters = Dict(chunk)
+                future = self.submit(builder)
+                key = self._context_key(label)
+                self.to_context(**{key: append_(future)})
+
+        if n_chunks > 1:
+            self.report(f"Computing the omega grids in {n_chunks} windows...")
 
     def finalize(self):
-        ctx = self.ctx
-        if not ctx.dyncorr.is_finished_ok:
+        failed = False
+        for label in self._get_dyncorr_parameters():
+            output_matrix = self._collect(label)
+            if output_matrix is None:
+                failed = True
+            elif label is None:
+                self.out("output_matrix", output_matrix)
+            else:
+                self.out(f"output_matrices.{label}", output_matrix)
+
+        if failed:
+            return self.exit_codes.ERROR_DYNCCORR_FAILED
+        return None
+
+    def _get_dyncorr_parameters(self):
+        """Return the parameters of the dynamical correlators by label.
+
+        A single calculation of `dyncorr_params` has the label None.
+        """
+        if "dyncorr_params" in self.inputs:
+            return {None: self.inputs.dyncorr_params.get_dict()}
+        scan = self.inputs.dyncorr_scan
+        return {label: scan[label].get_dict() for label in sorted(scan)}
+
+    @staticmethod
+    def _context_key(label):
+        """Return the context key of the calculations of a label."""
+        return "dyncorr" if label is None else f"dyncorr_{label}"
+
+    def _collect(self, label):
+        """Return the output matrix of a label, merging its windows.
+
+        :return: the `ArrayData`, or None if a calculation failed.
+        """
+        calculations = self.ctx[self._context_key(label)]
+        failed = [calc for calc in calculations if not calc.is_finished_ok]
+        if failed:
+            pks = ", ".join(str(calc.pk) for calc in failed)
             self.report(
-                """Dynamic Correlator calculation
-                        did not finish successfully."""
+                f"Dynamic Correlator calculations <{pks}> did not finish "
+                "successfully."
             )
-            return self.exit_codes.ERROR_DYNCCORR_FAILED
+            return None
 
-        self.out("output_matrix", ctx.dyncorr.outputs.output_matrix)
+        if len(calculations) == 1:
+            return calculations[0].outputs.output_matrix
+        chunks = {
+            f"chunk_{index:04d}": calc.outputs.output_matrix
+            for index, calc in enumerate(calculations)
+        }
+        return merge_omega_chunks(**chunks)
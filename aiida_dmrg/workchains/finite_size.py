@@ -0,0 +1,255 @@
+"""Workchain extrapolating DMRG results of several chain lengths."""
+
+import numpy as np
+from aiida.common import AttributeDict
+from aiida.engine import WorkChain, calcfunction, while_
+from aiida.orm import ArrayData, Bool, Dict, Int, List
+from aiida.plugins import WorkflowFactory
+
+from ..calculations.dmrggen import validate_inputs as validate_dmrg_inputs
+
+DMRGBaseWorkChain = WorkflowFactory("dmrg.base")
+
+
+def size_label(n_sites):
+    """Return the link label of a chain length, e.g. ``n_16``."""
+    return f"n_{n_sites}"
+
+
+def get_chains(sizes, warm_start):
+    """Return the sizes grouped into the sequences run one after the other.
+
+    With `warm_start` the sizes of the same parity form one sequence, each
+    started from the MPS of the next smaller size; the sequences are
+    independent of each other. Otherwise every size is independent.
+    """
+    sizes = sorted(set(sizes))
+    if not warm_start:
+        return [[n_sites] for n_sites in sizes]
+    chains = [[n for n in sizes if n % 2 == parity] for parity in (0, 1)]
+    return [chain for chain in chains if chain]
+
+
+def fit_inverse_size(sizes, values, order):
+    """Fit polynomials in 1/N to several observables at once.
+
+    :param sizes: array of the N chain lengths.
+    :param values: (N, M) array of M observables, NaN where missing.
+    :param order: the order of the polynomials, reduced if fewer sizes
+        are available.
+    :return: (order + 1, M) array of the coefficients, the limit N -> oo
+        first, NaN for the observables that are missing at any size.
+    """
+    values = np.asarray(values, dtype=float).reshape(len(sizes), -1)
+    order = min(order, len(sizes) - 1)
+    coefficients = np.full((order + 1, values.shape[1]), np.nan)
+    complete = ~np.isnan(values).any(axis=0)
+    if order < 1 or not complete.any():
+        return coefficients
+
+    inverse = 1 / np.asarray(sizes, dtype=float)
+    vandermonde = np.vander(inverse, order + 1, increasing=True)
+    solution = np.linalg.lstsq(vandermonde, values[:, complete], rcond=None)
+    coefficients[:, complete] = solution[0]
+    return coefficients
+
+
+@calcfunction
+def extrapolate_finite_size(fit_order, **arrays):
+    """Extrapolate the energy per site and the gap to infinite length.
+
+    :param fit_order: `Int` order of the polynomials in 1/N.
+    :param arrays: the `output_arrays` of the sizes by `size_label`.
+    """
+    sizes = np.array(sorted(int(label[2:]) for label in arrays))
+    values = np.full((sizes.size, 2), np.nan)
+    for row, n_sites in enumerate(sizes):
+        energies = np.sort(arrays[size_label(n_sites)].get_array("energies"))
+        values[row, 0] = energies[0] / n_sites
+        if energies.size > 1:
+            values[row, 1] = energies[1] - energies[0]
+
+    coefficients = fit_inverse_size(sizes, values, fit_order.value)
+    scaling = ArrayData()
+    scaling.set_array("n_sites", sizes)
+    scaling.set_array("energy_per_site", values[:, 0])
+    scaling.set_array("gap", values[:, 1])
+
+    extrapolation = {"n_sites": sizes.tolist()}
+    for column, key in enumerate(("energy_per_site", "gap")):
+        if np.isnan(coefficients[0, column]):
+            continue
+        extrapolation[key] = float(coefficients[0, column])
+        extrapolation[f"{key}_coefficients"] = coefficients[:, column].tolist()
+
+    return {"scaling": scaling, "extrapolation": Dict(extrapolation)}
+
+
+def validate_inputs(inputs, _):
+    """Validate the chain lengths and the uniform coupling."""
+    sizes = inputs["sizes"].get_list()
+    if any(not isinstance(n, int) or n < 2 for n in sizes):
+        return "`sizes` must be integers of at least 2."
+    if len(set(sizes)) < 2:
+        return "At least two different `sizes` are required."
+
+    dmrg = inputs["base"]["dmrg"]
+    parameters = dmrg["parameters"].get_dict()
+    if not isinstance(parameters.get("J"), (int, float)):
+        return "A uniform coupling `J` is required in `parameters`."
+    if inputs["warm_start"] and "checkpoint_sweeps" not in parameters:
+        return "`warm_start` needs `checkpoint_sweeps` in `parameters`."
+
+    # The template is completed with the `N_sites` of every size
+    parameters = Dict({**parameters, "N_sites": min(sizes)})
+    error = validate_dmrg_inputs({**dmrg, "parameters": parameters}, None)
+    if error:
+        return error
+
+    if inputs["fit_order"].value < 1:
+        return "`fit_order` must be positive."
+    return None
+
+
+class FiniteSizeScalingWorkChain(WorkChain):
+    """
+    WorkChain computing a uniform spin chain at several lengths `N_sites`
+    and extrapolating the energy per site and the gap to infinite length.
+
+    The sizes are independent and run at the same time. With `warm_start`
+    every size starts from the MPS of the next smaller size of the same
+    parity through its `parent_calc_folder`, so the even and the odd sizes
+    form two sequences run side by side.
+    """
+
+    @classmethod
+    def define(cls, spec):
+        super().define(spec)
+
+        spec.expose_inputs(
+            DMRGBaseWorkChain,
+            namespace="base",
+            exclude=(
+                "dmrg.parent_calc_folder",
+                "dmrg.couplings",
+                "dmrg.coupling_matrix",
+            ),
+        )
+        spec.input(
+            "sizes",
+            valid_type=List,
+            help="The chain lengths `N_sites` to compute",
+        )
+        spec.input(
+            "warm_start",
+            valid_type=Bool,
+            default=lambda: Bool(False),
+            help="""Start every size from the MPS of the next smaller size
+            of the same parity, which needs `checkpoint_sweeps`""",
+        )
+        spec.input(
+            "fit_order",
+            valid_type=Int,
+            default=lambda: Int(2),
+            help="Order of the polynomials in 1/N of the extrapolation",
+        )
+        spec.inputs.validator = validate_inputs
+        # `N_sites` is set for every size, see `validate_inputs`
+        spec.inputs["base"]["dmrg"].validator = None
+
+        spec.outline(
+            cls.setup,
+            while_(cls.should_run_sizes)(
+                cls.run_sizes,
+                cls.inspect_sizes,
+            ),
+            cls.results,
+        )
+
+        spec.output(
+            "scaling",
+            valid_type=ArrayData,
+            help="""The arrays `n_sites`, `energy_per_site` and `gap` of
+            the finished sizes; the gap is NaN with a single state""",
+        )
+        spec.output(
+            "extrapolation",
+            valid_type=Dict,
+            help="""The energy per site and the gap extrapolated to
+            infinite length, with the coefficients of their fits""",
+        )
+
+        spec.exit_code(
+            400,
+            "ERROR_NOT_ENOUGH_SIZES",
+            message="Fewer than two sizes finished, nothing to extrapolate.",
+        )
+        spec.exit_code(
+            401,
+            "ERROR_SIZES_FAILED",
+            message="The calculations of some sizes failed.",
+        )
+
+    def setup(self):
+        """Group the sizes into the sequences to run."""
+        warm_start = self.inputs.warm_start.value
+        self.ctx.chains = get_chains(self.inputs.sizes.get_list(), warm_start)
+        self.ctx.parents = [None] * len(self.ctx.chains)
+        self.ctx.running = []
+        self.ctx.finished = []
+        self.ctx.failed = []
+
+    def should_run_sizes(self):
+        """Return whether sizes are left to compute."""
+        return any(self.ctx.chains)
+
+    def run_sizes(self):
+        """Submit the next size of every sequence."""
+        parameters = self.inputs.base.dmrg.parameters.get_dict()
+        self.ctx.running = []
+        for index, chain in enumerate(self.ctx.chains):
+            if not chain:
+                continue
+            n_sites = chain.pop(0)
+            inputs = self.exposed_inputs(DMRGBaseWorkChain, "base")
+            inputs = AttributeDict(inputs)
+            inputs.dmrg = AttributeDict(inputs.dmrg)
+            inputs.dmrg.parameters = Dict({**parameters, "N_sites": n_sites})
+            if self.ctx.parents[index] is not None:
+                inputs.dmrg.parent_calc_folder = self.ctx.parents[index]
+            inputs.metadata = {"call_link_label": size_label(n_sites)}
+
+            running = self.submit(DMRGBaseWorkChain, **inputs)
+            self.report(f"Launched {running.process_label}<{running.pk}>")
+            self.to_context(**{size_label(n_sites): running})
+            self.ctx.running.append((index, n_sites))
+
+    def inspect_sizes(self):
+        """Collect the finished sizes and the folders of the next ones."""
+        for index, n_sites in self.ctx.running:
+            node = self.ctx[size_label(n_sites)]
+            if node.is_finished_ok and "output_arrays" in node.outputs:
+                self.ctx.finished.append(n_sites)
+                self.ctx.parents[index] = node.outputs.remote_folder
+            else:
+                self.report(f"The size N_sites = {n_sites} failed.")
+                self.ctx.failed.append(n_sites)
+        self.ctx.running = []
+
+    def results(self):
+        """Fit the finished sizes and extrapolate to infinite length."""
+        if len(self.ctx.finished) < 2:
+            return self.exit_codes.ERROR_NOT_ENOUGH_SIZES
+
+        arrays = {
+            size_label(n): self.ctx[size_label(n)].outputs.output_arrays
+            for n in self.ctx.finished
+        }
+        fit_order = self.inputs.fit_order
+        results = extrapolate_finite_size(fit_order, **arrays)
+        self.out("scaling", results["scaling"])
+        self.out("extrapolation", results["extrapolation"])
+
+        if self.ctx.failed:
+            return self.exit_codes.ERROR_SIZES_FAILED
+        return None
@@ -0,0 +1,282 @@
+"""Workchain computing the low-energy spectrum of all Sz sectors."""
+
+import numpy as np
+from aiida.common import AttributeDict
+from aiida.engine import WorkChain, calcfunction, while_
+from aiida.orm import ArrayData, Dict, Float, Int, List
+from aiida.plugins import WorkflowFactory
+
+from ..calculations.dmrggen import validate_inputs as validate_dmrg_inputs
+
+DMRGBaseWorkChain = WorkflowFactory("dmrg.base")
+
+
+def get_sz_sectors(spin, n_sites):
+    """Return the non-negative Sz sectors of a chain, lowest first.
+
+    The sectors of negative Sz have the same energies without a magnetic
+    field and are not included.
+    """
+    twice_max = int(round(2 * spin * n_sites))
+    values = [value / 2 for value in range(twice_max % 2, twice_max + 1, 2)]
+    return [int(sz) if sz.is_integer() else sz for sz in values]
+
+
+def sector_label(sz):
+    """Return the link label of the sector, e.g. ``sz_1_5`` or ``sz_m1``."""
+    sign = "m" if sz < 0 else ""
+    return f"sz_{sign}{abs(sz):g}".replace(".", "_")
+
+
+def validate_inputs(inputs, _):
+    """Validate the sectors of the spin chain."""
+    parameters = inputs["base"]["dmrg"]["parameters"].get_dict()
+    missing = [key for key in ("S", "N_sites") if key not in parameters]
+    if missing:
+        return f"`parameters` is missing: {', '.join(missing)}."
+
+    if "sz_sectors" in inputs:
+        sectors = inputs["sz_sectors"].get_list()
+        valid = get_sz_sectors(parameters["S"], parameters["N_sites"])
+        invalid = [sz for sz in sectors if abs(sz) not in valid]
+        if not sectors or invalid:
+            return f"Invalid `sz_sectors`, the valid ones are: {valid}."
+
+    if "max_concurrent" in inputs and inputs["max_concurrent"].value < 1:
+        return "`max_concurrent` must be positive."
+    if "energy_window" in inputs and inputs["energy_window"].value < 0:
+        return "`energy_window` must not be negative."
+
+    # The template is completed with the `Sz` of every sector
+    dmrg = inputs["base"]["dmrg"]
+    parameters = Dict({**parameters, "Sz": 0})
+    return validate_dmrg_inputs({**dmrg, "parameters": parameters}, None)
+
+
+def _as_rows(array, n_states):
+    """Return the per-site values of the states as rows of a 2D array."""
+    return np.asarray(array, dtype=float).reshape(n_states, -1)
+
+
+@calcfunction
+def merge_sz_sectors(sectors, failed_sectors, skipped_sectors, **arrays):
+    """Merge the states of the Sz sectors into one spectrum sorted by energy.
+
+    :param sectors: `Dict` of the Sz value of every label.
+    :param failed_sectors: `List` of the Sz of the failed sectors.
+    :param skipped_sectors: `List` of the Sz of the skipped sectors.
+    :param arrays: the `output_arrays` of the sectors by label.
+    :return: the `spectrum` and the `output_parameters`.
+    """
+    sz_values = sectors.get_dict()
+    energies, spin_squared, spin_z, total_sz = [], [], [], []
+    lowest = {}
+    for label in sorted(arrays):
+        sector_energies = arrays[label].get_array("energies").ravel()
+        lowest[label] = sector_energies.min()
+        n_states = sector_energies.size
+        energies.append(sector_energies)
+        spin_squared.append(arrays[label].get_array("spin_squared").ravel())
+        spin_z.append(_as_rows(arrays[label].get_array("spin_z"), n_states))
+        total_sz.append(np.full(n_states, float(sz_values[label])))
+
+    energies = np.concatenate(energies)
+    order = np.argsort(energies, kind="stable")
+    spectrum = ArrayData()
+    spectrum.set_array("energies", energies[order])
+    spectrum.set_array("spin_squared", np.concatenate(spin_squared)[order])
+    spectrum.set_array("spin_z", np.concatenate(spin_z)[order])
+    spectrum.set_array("sz", np.concatenate(total_sz)[order])
+
+    ground_state = min(lowest, key=lowest.get)
+    output_parameters = Dict(
+        {
+            "energy_min": float(lowest[ground_state]),
+            "ground_state_sz": sz_values[ground_state],
+            "sectors": sorted(sz_values.values()),
+            "failed_sectors": failed_sectors.get_list(),
+            "skipped_sectors": skipped_sectors.get_list(),
+        }
+    )
+    return {"spectrum": spectrum, "output_parameters": output_parameters}
+
+
+class SzSectorWorkChain(WorkChain):
+    """
+    WorkChain computing the low-energy spectrum of a spin chain with
+    `conserve_symmetry`, one DMRG calculation per Sz sector.
+
+    The sectors are run at the same time, starting from the lowest Sz, in
+    batches of at most `max_concurrent`: the next batch is only submitted
+    once the whole previous one finished, since the engine cannot wake the
+    workchain after each single sector. With an `energy_window`, the higher
+    sectors are skipped as soon as a finished sector lies entirely above
+    the window: the lowest energy grows with Sz for antiferromagnetic
+    couplings, so the higher sectors cannot contribute states within it.
+    """
+
+    @classmethod
+    def define(cls, spec):
+        super().define(spec)
+
+        spec.expose_inputs(
+            DMRGBaseWorkChain,
+            namespace="base",
+            exclude=("dmrg.parent_calc_folder",),
+        )
+        spec.input(
+            "sz_sectors",
+            valid_type=List,
+            required=False,
+            help="""The Sz sectors to compute. By default all sectors from
+            the lowest non-negative Sz up to `S * N_sites`.""",
+        )
+        spec.input(
+            "max_concurrent",
+            valid_type=Int,
+            required=False,
+            help="""The most sectors in a batch, by default all. The next
+            batch is submitted once all sectors of the batch finished.""",
+        )
+        spec.input(
+            "energy_window",
+            valid_type=Float,
+            required=False,
+            help="""Only states up to this energy above the lowest one are
+            needed: higher sectors entirely above it are not computed""",
+        )
+        spec.inputs.validator = validate_inputs
+        # `Sz` is set for every sector, see `validate_inputs`
+        spec.inputs["base"]["dmrg"].validator = None
+
+        spec.outline(
+            cls.setup,
+            while_(cls.should_run_sectors)(
+                cls.run_sectors,
+                cls.inspect_sectors,
+            ),
+            cls.results,
+        )
+
+        spec.output(
+            "spectrum",
+            valid_type=ArrayData,
+            help="""The states of all sectors sorted by energy, as the
+            arrays `energies`, `spin_squared`, `spin_z` and `sz`""",
+        )
+        spec.output(
+            "output_parameters",
+            valid_type=Dict,
+            help="""The lowest energy and its sector, and the computed,
+            failed and skipped sectors""",
+        )
+
+        spec.exit_code(
+            400,
+            "ERROR_ALL_SECTORS_FAILED",
+            message="The calculations of all Sz sectors failed.",
+        )
+        spec.exit_code(
+            401,
+            "ERROR_SECTORS_FAILED",
+            message="The calculations of some Sz sectors failed.",
+        )
+
+    def setup(self):
+        """Sort the sectors to compute by Sz."""
+        parameters = self.inputs.base.dmrg.parameters.get_dict()
+        if "sz_sectors" in self.inputs:
+            sectors = self.inputs.sz_sectors.get_list()
+        else:
+            sectors = get_sz_sectors(parameters["S"], parameters["N_sites"])
+
+        self.ctx.pending = sorted(set(sectors), key=lambda sz: (abs(sz), sz))
+        self.ctx.running = []
+        self.ctx.finished = {}
+        self.ctx.failed = []
+        self.ctx.skipped = []
+
+    def should_run_sectors(self):
+        """Return whether sectors are left to compute."""
+        return bool(self.ctx.pending)
+
+    def run_sectors(self):
+        """Submit the next batch of up to `max_concurrent` sectors."""
+        count = len(self.ctx.pending)
+        if "max_concurrent" in self.inputs:
+            count = min(count, self.inputs.max_concurrent.value)
+        self.ctx.running = self.ctx.pending[:count]
+        self.ctx.pending = self.ctx.pending[count:]
+
+        parameters = self.inputs.base.dmrg.parameters.get_dict()
+        parameters["conserve_symmetry"] = "true"
+        for sz in self.ctx.running:
+            inputs = self.exposed_inputs(DMRGBaseWorkChain, "base")
+            inputs = AttributeDict(inputs)
+            inputs.dmrg = AttributeDict(inputs.dmrg)
+            inputs.dmrg.parameters = Dict({**parameters, "Sz": sz})
+            inputs.metadata = {"call_link_label": sector_label(sz)}
+            running = self.submit(DMRGBaseWorkChain, **inputs)
+            self.report(f"Launched {running.process_label}<{running.pk}>")
+            self.to_context(**{sector_label(sz): running})
+
+    def inspect_sectors(self):
+        """Collect the finished sectors and skip those above the window."""
+        for sz in self.ctx.running:
+            node = self.ctx[sector_label(sz)]
+            if node.is_finished_ok and "output_arrays" in node.outputs:
+                self.ctx.finished[sector_label(sz)] = sz
+            else:
+                self.report(f"The sector Sz = {sz} failed.")
+                self.ctx.failed.append(sz)
+        self.ctx.running = []
+
+        if "energy_window" not in self.inputs or not self.ctx.finished:
+            return
+
+        lowest = self._lowest_energies()
+        limit = min(lowest.values()) + self.inputs.energy_window.value
+        finished = self.ctx.finished
+        above = [abs(finished[key]) for key in lowest if lowest[key] > limit]
+        if not above:
+            return
+
+        # The higher sectors lie even further above the window
+        threshold = min(above)
+        pending = self.ctx.pending
+        skipped = [sz for sz in pending if abs(sz) > threshold]
+        if skipped:
+            self.report(
+                f"The sector |Sz| = {threshold} lies above the energy "
+                f"window, skipping Sz = {skipped}"
+            )
+            self.ctx.skipped.extend(skipped)
+            self.ctx.pending = [sz for sz in pending if abs(sz) <= threshold]
+
+    def results(self):
+        """Merge the spectra of the finished sectors."""
+        if not self.ctx.finished:
+            return self.exit_codes.ERROR_ALL_SECTORS_FAILED
+
+        arrays = {}
+        for label in self.ctx.finished:
+            arrays[label] = self.ctx[label].outputs.output_arrays
+        results = merge_sz_sectors(
+            Dict(self.ctx.finished),
+            List(self.ctx.failed),
+            List(self.ctx.skipped),
+            **arrays,
+        )
+        self.out("spectrum", results["spectrum"])
+        self.out("output_parameters", results["output_parameters"])
+
+        if self.ctx.failed:
+            return self.exit_codes.ERROR_SECTORS_FAILED
+        return None
+
+    def _lowest_energies(self):
+        """Return the lowest energy of every finished sector by label."""
+        return {
+            label: self.ctx[label].outputs.output_parameters["energy_min"]
+            for label in self.ctx.finished
+        }
@@ -0,0 +1,69 @@
+# pylint: disable=invalid-name
+"""Measure the startup time of Julia with the launcher options"""
+
+
+import json
+import statistics
+import subprocess
+import sys
+import time
+
+import click
+
+from aiida_dmrg.utils.julia import get_julia_cmdline, validate_julia_options
+
+# Packages loaded by the DMRG and dynamical correlator scripts
+DEFAULT_IMPORTS = "using ITensors, ITensorMPS, HDF5"
+
+
+def time_command(command, repeat):
+    """Return the wall times in seconds of running the command."""
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        subprocess.run(command, check=True, capture_output=True)
+        times.append(time.perf_counter() - start)
+    return times
+
+
+@click.command("cli")
+@click.option("--julia", default="julia", help="Julia executable")
+@click.option(
+    "--options",
+    "options_json",
+    default="{}",
+    help='`julia` settings as JSON, e.g. \'{"sysimage": "/apps/it.so"}\'',
+)
+@click.option("--imports", default=DEFAULT_IMPORTS, help="Code to load")
+@click.option("--repeat", default=3, help="Number of runs per setup")
+def cli(julia, options_json, imports, repeat):
+    """Compare the startup of plain Julia, of Julia loading the packages,
+    and of Julia loading them with the launcher options of the plugin."""
+    options = json.loads(options_json)
+    error = validate_julia_options(options)
+    if error:
+        print(error)
+        sys.exit(1)
+
+    flags = get_julia_cmdline(options)
+    setups = {
+        "julia": [julia, "-e", ""],
+        "packages": [julia, "-e", imports],
+        "packages with options": [julia, *flags, "-e", imports],
+    }
+    print(f"Launcher flags: {' '.join(flags) or '(none)'}")
+    results = {}
+    for name, command in setups.items():
+        times = time_command(command, repeat)
+        results[name] = statistics.median(times)
+        print(
+            f"{name:>24}: median {results[name]:.2f} s, "
+            f"min {min(times):.2f} s over {repeat} runs"
+        )
+
+    saved = results["packages"] - results["packages with options"]
+    print(f"Startup saved by the options: {saved:.2f} s per calculation")
+
+
+if __name__ == "__main__":
+    cli()  # pylint: disable=no-value-for-parameter
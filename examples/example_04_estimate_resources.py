@@ -0,0 +1,54 @@
+# pylint: disable=invalid-name
+"""Predict the resources of a DMRG calculation from earlier runs"""
+
+
+import sys
+
+import click
+from aiida.common import NotExistent
+from aiida.orm import load_code
+
+from aiida_dmrg.utils import ResourceEstimator
+
+
+@click.command("cli")
+@click.argument("codelabel", default="dmrg@daint-julia")
+@click.option("--spin", "-S", default=0.5, help="Spin of every site")
+@click.option("--n-sites", "-N", default=40, help="Number of sites")
+@click.option("--cutoff", default=1e-10, help="Truncation cutoff")
+@click.option("--n-excitations", default=0, help="Number of excited states")
+@click.option("--conserve-symmetry", is_flag=True, help="Conserve Sz")
+def cli(codelabel, spin, n_sites, cutoff, n_excitations, conserve_symmetry):
+    """Print the predicted bond dimension, runtime and options"""
+    try:
+        code = load_code(codelabel)
+    except NotExistent:
+        print(f"The code '{codelabel}' does not exist")
+        sys.exit(1)
+
+    try:
+        estimator = ResourceEstimator.from_database(code=code)
+    except ValueError as exc:
+        print(exc)
+        sys.exit(1)
+
+    parameters = {
+        "S": spin,
+        "N_sites": n_sites,
+        "cutoff": cutoff,
+        "n_excitations": n_excitations,
+        "conserve_symmetry": "true" if conserve_symmetry else "false",
+    }
+    print(f"Fitted to {estimator.n_samples} calculations")
+    for target, exponents in estimator.coefficients.items():
+        terms = ", ".join(f"{k}={v:.3g}" for k, v in exponents.items())
+        print(f"  {target}: {terms}")
+
+    for key, value in estimator.predict(parameters).items():
+        print(f"Predicted {key}: {value:.6g}")
+    for key, value in estimator.get_options(parameters).items():
+        print(f"metadata.options.{key} = {value}")
+
+
+if __name__ == "__main__":
+    cli()  # pylint: disable=no-value-for-parameter
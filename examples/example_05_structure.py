@@ -0,0 +1,76 @@
+# pylint: disable=invalid-name
+"""Run a DMRG calculation of the magnetic sites of a structure"""
+
+
+import sys
+
+import click
+from aiida.common import NotExistent
+from aiida.engine import run_get_node
+from aiida.orm import load_code
+from aiida.plugins import CalculationFactory
+from ase import Atoms
+
+from aiida_dmrg.utils import get_heisenberg_inputs
+
+DMRGCalculation = CalculationFactory("dmrg")
+
+
+def example_dmrg(dmrg_code):
+    """Run a DMRG calculation of a dimerized CuO chain"""
+
+    num_cores = 2
+    memory_mb = 20000
+
+    # Cu sites with alternating Cu-Cu bonds of 2.9 and 3.1 Angstrom,
+    # bridged by oxygen sites which carry no spin
+    n_cells = 5
+    positions = []
+    for cell in range(n_cells):
+        positions += [(6 * cell, 0, 0), (6 * cell + 1.45, 0.5, 0)]
+        positions += [(6 * cell + 2.9, 0, 0), (6 * cell + 4.45, 0.5, 0)]
+    atoms = Atoms("CuOCuO" * n_cells, positions=positions)
+
+    # The exchange of the nearest neighbors and of the second neighbors
+    exchange = [(2.9, 23.0), (3.1, 38.0), (6.0, 2.0)]
+    parameters = {
+        "S": 0.5,
+        "cutoff": 1e-8,
+        "n_excitations": 0,
+        "conserve_symmetry": "false",
+    }
+
+    builder = DMRGCalculation.get_builder()
+    builder.update(get_heisenberg_inputs(atoms, exchange, parameters))
+    builder.code = dmrg_code
+    builder.metadata.options.withmpi = True
+
+    builder.metadata.options.resources = {
+        "num_machines": 1,
+        "tot_num_mpiprocs": num_cores,
+    }
+
+    # Should ask for extra +25% extra memory
+    builder.metadata.options.max_memory_kb = int(1.25 * memory_mb) * 1024
+    builder.metadata.options.max_wallclock_seconds = 20 * 60
+
+    print("Running calculation...")
+    res, _node = run_get_node(builder)
+
+    print("Calculation finished with state: ", res)
+
+
+@click.command("cli")
+@click.argument("codelabel", default="dmrg@daint-julia")
+def cli(codelabel):
+    """Click interface"""
+    try:
+        code = load_code(codelabel)
+    except NotExistent:
+        print(f"The code '{codelabel}' does not exist")
+        sys.exit(1)
+    example_dmrg(code)
+
+
+if __name__ == "__main__":
+    cli()  # pylint: disable=no-value-for-parameter
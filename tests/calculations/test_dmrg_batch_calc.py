@@ -0,0 +1,88 @@
+"""Tests for the DMRG batch calculation class."""
+
+import pytest
+from aiida.common import CodeRunMode
+from aiida.orm import Dict
+
+from aiida_dmrg.calculations import DMRGBatchCalculation
+
+
+def generate_inputs(fixture_code, concurrent=False, **tasks):
+    """Return the inputs of a batch of tasks with the given parameters."""
+    return {
+        "code": fixture_code("dmrg.batch"),
+        "tasks": {label: Dict(value) for label, value in tasks.items()},
+        "settings": Dict({"cmdline": ["dmrg.jl"]}),
+        "metadata": {
+            "options": {
+                "resources": {"num_machines": 1, "tot_num_mpiprocs": 4},
+                "concurrent": concurrent,
+            },
+        },
+    }
+
+
+@pytest.mark.parametrize("concurrent", [False, True])
+def test_dmrg_batch_calculation(fixture_code, generate_calc_job, concurrent):
+    """Test that every task gets its input file in its own subfolder."""
+    inputs = generate_inputs(
+        fixture_code,
+        concurrent,
+        sz_1={"S": 0.5, "N_sites": 4, "J": 1, "Sz": 1},
+        sz_0={"S": 0.5, "N_sites": 4, "J": 1, "Sz": 0},
+    )
+
+    tmp_dir, calc_info = generate_calc_job(DMRGBatchCalculation, inputs)
+
+    assert (tmp_dir / "sz_0" / "dmrg.inp").read_text() == "0.5 4 1 0"
+    assert (tmp_dir / "sz_1" / "dmrg.inp").read_text() == "0.5 4 1 1"
+    assert [info.stdin_name for info in calc_info.codes_info] == [
+        "sz_0/dmrg.inp",
+        "sz_1/dmrg.inp",
+    ]
+    assert calc_info.codes_info[0].cmdline_params == ["dmrg.jl"]
+    assert calc_info.codes_info[0].withmpi is not concurrent
+    run_mode = CodeRunMode.PARALLEL if concurrent else CodeRunMode.SERIAL
+    assert calc_info.codes_run_mode == run_mode
+    assert calc_info.retrieve_list == [
+        ("sz_0/dmrg.out", ".", 2),
+        ("sz_1/dmrg.out", ".", 2),
+    ]
+
+
+@pytest.mark.parametrize(
+    "parameters, message",
+    [
+        ({"S": 0.5, "N_sites": 4}, "Task `a` is missing: J"),
+        (
+            {"S": 0.5, "N_sites": 4, "J": 1, "print_HDF5": "true"},
+            "not supported in a batch",
+        ),
+    ],
+)
+def test_dmrg_batch_calculation_invalid(
+    fixture_code, generate_calc_job, parameters, message
+):
+    """Test that tasks writing to the working directory are rejected."""
+    inputs = generate_inputs(fixture_code, a=parameters)
+
+    with pytest.raises(ValueError, match=message):
+        generate_calc_job(DMRGBatchCalculation, inputs)
+
+
+def test_dmrg_batch_concurrent_machines(fixture_code, generate_calc_job):
+    """Test that concurrent tasks are rejected on several machines."""
+    parameters = {"S": 0.5, "N_sites": 4, "J": 1}
+    inputs = generate_inputs(fixture_code, True, a=parameters)
+    inputs["metadata"]["options"]["resources"]["num_machines"] = 2
+
+    with pytest.raises(ValueError, match="single machine"):
+        generate_calc_job(DMRGBatchCalculation, inputs)
+
+
+def test_dmrg_batch_exit_codes():
+    """Test that the exit codes of the tasks do not shadow the batch's."""
+    exit_codes = DMRGBatchCalculation.exit_codes
+    assert exit_codes(394).message.startswith("The tasks {tasks}")
+    assert exit_codes.ERROR_STALLED.status == 380
+    assert exit_codes.ERROR_MPI_ABORT.status == 393
@@ -1,10 +1,14 @@
 """Tests for the DMRG calculation class."""
 
+import io
 from collections import OrderedDict
 
-from aiida.orm import Dict
+import numpy as np
+import pytest
+from aiida.orm import ArrayData, Dict, SinglefileData
 
 from aiida_dmrg.calculations.dmrggen import DMRGCalculation
+from aiida_dmrg.utils import couplings_from_edges
 
 
 def test_dmrg_calculation_default(fixture_code, generate_calc_job):
@@ -117,3 +121,255 @@ def test_dmrg_calculation_matrix(fixture_code, generate_calc_job):
     expected_content = """1 4 1e-06 [[0, 23, 0, 0], [23, 0, 38, 0], \
 [0, 38, 0, 23], [0, 0, 23, 0]] 0 0 false true true"""
     assert content_input_file.strip() == expected_content
+
+
+def test_dmrg_calculation_couplings(fixture_code, generate_calc_job):
+    """
+    Test a calculation with sparse couplings for
+    :class.`aiida_dmrg.calculations.dmrg.DmrgCalculation`.
+    """
+
+    parameters = Dict(
+        dict=OrderedDict(
+            [
+                ("S", 0.5),
+                ("N_sites", 4),
+                ("cutoff", 1e-6),
+                ("n_excitations", 0),
+                ("conserve_symmetry", "false"),
+            ]
+        )
+    )
+
+    # (1, 0) duplicates (0, 1) and zero couplings are dropped
+    couplings = couplings_from_edges(
+        [(2, 3, 23), (0, 1, 23.0), (1, 2, 38.5), (1, 0, 23.0), (0, 3, 0)]
+    )
+
+    inputs = {
+        "code": fixture_code("dmrg"),
+        "parameters": parameters,
+        "couplings": couplings,
+        "metadata": {
+            "options": {
+                "resources": {"num_machines": 1, "tot_num_mpiprocs": 1},
+                "max_wallclock_seconds": 5 * 60,
+            },
+        },
+    }
+
+    tmp_dir, _ = generate_calc_job(DMRGCalculation, inputs)
+    content_input_file = (tmp_dir / DMRGCalculation.INPUT_FILE).read_text()
+
+    expected_content = "0.5 4 1e-06 edges[1,2,23.0;2,3,38.5;3,4,23.0] 0 false"
+    assert content_input_file.strip() == expected_content
+
+
+def test_dmrg_calculation_reorder(fixture_code, generate_calc_job):
+    """Test that the sites of scrambled couplings are put in order."""
+    parameters = Dict({"S": 0.5, "N_sites": 4, "cutoff": 1e-6})
+    couplings = couplings_from_edges([(0, 2, 1.0), (2, 1, 2.0), (1, 3, 1.0)])
+    inputs = {
+        "code": fixture_code("dmrg"),
+        "parameters": parameters,
+        "couplings": couplings,
+        "settings": Dict({"reorder": "rcm"}),
+        "metadata": {"options": {"resources": {"num_machines": 1}}},
+    }
+
+    tmp_dir, calc_info = generate_calc_job(DMRGCalculation, inputs)
+    content_input_file = (tmp_dir / DMRGCalculation.INPUT_FILE).read_text()
+    order = (tmp_dir / "site_order.txt").read_text()
+
+    assert order in ("0 2 1 3", "3 1 2 0")
+    expected_content = "0.5 4 1e-06 edges[1,2,1.0;2,3,2.0;3,4,1.0]"
+    assert content_input_file.strip() == expected_content
+    assert "site_order.txt" in calc_info.retrieve_list
+
+
+def test_dmrg_calculation_reorder_invalid(fixture_code, generate_calc_job):
+    """Test that a uniform J cannot be reordered."""
+    inputs = {
+        "code": fixture_code("dmrg"),
+        "parameters": Dict({"S": 0.5, "N_sites": 4, "J": 1}),
+        "settings": Dict({"reorder": "fiedler"}),
+        "metadata": {"options": {"resources": {"num_machines": 1}}},
+    }
+    with pytest.raises(ValueError, match="Reordering requires `couplings`"):
+        generate_calc_job(DMRGCalculation, inputs)
+
+
+# The parameters of the warm-start examples in the README
+CUTOFF_EXAMPLE_PARAMETERS = {
+    "S": 0.5,
+    "N_sites": 64,
+    "cutoff": 1e-6,
+    "J": 2,
+    "Sz": 0,
+    "n_excitations": 0,
+    "conserve_symmetry": "false",
+    "print_HDF5": "false",
+    "maximal_energy": "false",
+    "checkpoint_sweeps": 2,
+}
+FINITE_SIZE_EXAMPLE_PARAMETERS = {
+    "S": 1,
+    "cutoff": 1e-8,
+    "J": 2,
+    "Sz": 0,
+    "n_excitations": 1,
+    "conserve_symmetry": "false",
+    "print_HDF5": "false",
+    "maximal_energy": "false",
+    "checkpoint_sweeps": 2,
+}
+
+
+@pytest.mark.parametrize(
+    "parameters, expected",
+    [
+        (CUTOFF_EXAMPLE_PARAMETERS, "0.5 64 1e-06 2 0 0 false false false 2"),
+        (
+            {**FINITE_SIZE_EXAMPLE_PARAMETERS, "N_sites": 16},
+            "1 16 1e-08 2 0 1 false false false 2",
+        ),
+    ],
+)
+def test_dmrg_calculation_checkpoint_sweeps(
+    fixture_code, generate_calc_job, parameters, expected
+):
+    """Test that `checkpoint_sweeps` is rendered as the last token."""
+    inputs = {
+        "code": fixture_code("dmrg"),
+        "parameters": Dict(parameters),
+        "metadata": {"options": {"resources": {"num_machines": 1}}},
+    }
+    tmp_dir, _ = generate_calc_job(DMRGCalculation, inputs)
+    content = (tmp_dir / DMRGCalculation.INPUT_FILE).read_text()
+    assert content.strip() == expected
+
+
+def test_dmrg_calculation_checkpoint_sparse(fixture_code, generate_calc_job):
+    """Test that `checkpoint_sweeps` is rejected without the earlier keys."""
+    parameters = {
+        "S": 0.5,
+        "N_sites": 64,
+        "cutoff": 1e-6,
+        "J": 2,
+        "checkpoint_sweeps": 2,
+    }
+    inputs = {
+        "code": fixture_code("dmrg"),
+        "parameters": Dict(parameters),
+        "metadata": {"options": {"resources": {"num_machines": 1}}},
+    }
+    with pytest.raises(ValueError, match="missing: Sz, n_excitations"):
+        generate_calc_job(DMRGCalculation, inputs)
+
+
+def test_dmrg_calculation_couplings_invalid(fixture_code, generate_calc_job):
+    """Test that couplings outside of the lattice are rejected."""
+
+    inputs = {
+        "code": fixture_code("dmrg"),
+        "parameters": Dict({"S": 0.5, "N_sites": 2}),
+        "couplings": couplings_from_edges([(0, 2, 1.0)]),
+        "metadata": {
+            "options": {
+                "resources": {"num_machines": 1, "tot_num_mpiprocs": 1},
+            },
+        },
+    }
+
+    with pytest.raises(ValueError, match="site indices must be in"):
+        generate_calc_job(DMRGCalculation, inputs)
+
+
+def test_dmrg_calculation_coupling_matrix(fixture_code, generate_calc_job):
+    """Test that a dense J matrix is copied as a binary file."""
+
+    matrix = np.diag([1.0, 2.0], 1) + np.diag([1.0, 2.0], -1)
+    coupling_matrix = ArrayData()
+    coupling_matrix.set_array("J", matrix)
+
+    inputs = {
+        "code": fixture_code("dmrg"),
+        "parameters": Dict({"S": 0.5, "N_sites": 3, "cutoff": 1e-6}),
+        "coupling_matrix": coupling_matrix,
+        "metadata": {
+            "options": {
+                "resources": {"num_machines": 1, "tot_num_mpiprocs": 1},
+            },
+        },
+    }
+
+    tmp_dir, calc_info = generate_calc_job(DMRGCalculation, inputs)
+    content_input_file = (tmp_dir / DMRGCalculation.INPUT_FILE).read_text()
+
+    assert content_input_file.strip() == "0.5 3 1e-06 J.npy"
+    copy_info = (coupling_matrix.uuid, "J.npy", "J.npy")
+    assert calc_info.local_copy_list == [copy_info]
+
+
+@pytest.mark.parametrize(
+    "extra_inputs, message",
+    [
+        ({"parameters": {"N_sites": 2, "J": 1}}, "only one"),
+        ({"shape": (3, 3)}, "expected"),
+        ({"filename": "J.txt"}, "unsupported file"),
+    ],
+)
+def test_dmrg_calculation_coupling_matrix_invalid(
+    fixture_code, generate_calc_job, extra_inputs, message
+):
+    """Test the validation of the `coupling_matrix` input."""
+
+    if "filename" in extra_inputs:
+        coupling_matrix = SinglefileData(
+            io.BytesIO(b"0 1\n1 0\n"), filename=extra_inputs["filename"]
+        )
+    else:
+        coupling_matrix = ArrayData()
+        shape = extra_inputs.get("shape", (2, 2))
+        coupling_matrix.set_array("J", np.zeros(shape))
+
+    inputs = {
+        "code": fixture_code("dmrg"),
+        "parameters": Dict(extra_inputs.get("parameters", {"N_sites": 2})),
+        "coupling_matrix": coupling_matrix,
+        "metadata": {
+            "options": {
+                "resources": {"num_machines": 1, "tot_num_mpiprocs": 1},
+            },
+        },
+    }
+
+    with pytest.raises(ValueError, match=message):
+        generate_calc_job(DMRGCalculation, inputs)
+
+
+def test_dmrg_calculation_julia_options(fixture_code, generate_calc_job):
+    """Test that the Julia launcher flags precede the `cmdline`."""
+    inputs = {
+        "code": fixture_code("dmrg"),
+        "parameters": Dict({"S": 0.5, "N_sites": 4, "J": 1}),
+        "settings": Dict(
+            {
+                "cmdline": ["dmrg.jl"],
+                "julia": {"sysimage": "/apps/itensors.so", "threads": "auto"},
+            }
+        ),
+        "metadata": {
+            "options": {
+                "resources": {"num_machines": 1, "tot_num_mpiprocs": 1},
+            },
+        },
+    }
+
+    _, calc_info = generate_calc_job(DMRGCalculation, inputs)
+
+    assert calc_info.codes_info[0].cmdline_params == [
+        "--sysimage=/apps/itensors.so",
+        "--threads=auto",
+        "dmrg.jl",
+    ]
@@ -0,0 +1,118 @@
+"""Tests for the progress monitor of the DMRG calculations."""
+
+import pytest
+from aiida.common import LinkType
+from aiida.orm import Dict
+from aiida.transports.plugins.local import LocalTransport
+
+from aiida_dmrg.calculations import monitors
+from aiida_dmrg.calculations.monitors import fetch_log_tail, monitor_progress
+from aiida_dmrg.calculations.nodes import DMRGCalcJobNode
+from aiida_dmrg.parsers.dmrg import MONITOR_ATTRIBUTE
+
+
+def sweep(number, energy, maxlinkdim=8):
+    """Return the summary line of a sweep."""
+    return (
+        f"After sweep {number} energy={energy} maxlinkdim={maxlinkdim} "
+        f"maxerr=1.0E-08 time=0.5\n"
+    )
+
+
+@pytest.fixture
+def generate_running_calc(fixture_localhost, tmp_path):
+    """Return a factory for a running `DMRGCalculation` and its log."""
+
+    def factory(parameters=None, max_memory_kb=None):
+        node = DMRGCalcJobNode(
+            computer=fixture_localhost,
+            process_type="aiida.calculations:dmrg",
+        )
+        parameters = Dict(parameters or {"S": 0.5, "N_sites": 8, "J": 1})
+        node.base.links.add_incoming(
+            parameters.store(),
+            link_type=LinkType.INPUT_CALC,
+            link_label="parameters",
+        )
+        node.set_option("resources", {"num_machines": 1})
+        if max_memory_kb is not None:
+            node.set_option("max_memory_kb", max_memory_kb)
+        node.store()
+        node.set_remote_workdir(str(tmp_path))
+        return node, tmp_path / "dmrg.out"
+
+    return factory
+
+
+def test_fetch_log_tail(tmp_path):
+    """Test that only complete lines after the offset are returned."""
+    path = tmp_path / "dmrg.out"
+    with LocalTransport(use_login_shell=False) as transport:
+        assert fetch_log_tail(transport, str(path), 0) is None
+
+        path.write_text("first\nsecond\nthi")
+        lines, offset = fetch_log_tail(transport, str(path), 0)
+        assert lines == ["first", "second"]
+        assert offset == 13
+
+        with path.open("a") as handle:
+            handle.write("rd\n")
+        assert fetch_log_tail(transport, str(path), offset) == (["third"], 19)
+        # A line longer than the chunk is cut
+        assert fetch_log_tail(transport, str(path), 0, 3) == (["fir"], 3)
+
+
+def test_monitor_energy_diverged(generate_running_calc):
+    """Test that a rising energy stops the calculation."""
+    node, log = generate_running_calc()
+    with LocalTransport(use_login_shell=False) as transport:
+        # The job is queued
+        assert monitor_progress(node, transport) is None
+
+        log.write_text(sweep(1, -3.0) + sweep(2, -3.4) + "After sw")
+        assert monitor_progress(node, transport) is None
+        state = node.base.attributes.get(MONITOR_ATTRIBUTE)
+        assert state["sweep"] == 2
+        assert state["best_energy"] == -3.4
+
+        # The excited state starts over at a higher energy
+        with log.open("a") as handle:
+            handle.write("eep 3 energy=-3.41 maxlinkdim=8 time=0.5\n")
+            handle.write(sweep(1, -2.5) + sweep(2, -2.0))
+        result = monitor_progress(node, transport)
+
+    assert "rose from -2.5 to -2.0" in result.message
+    assert not result.override_exit_code
+    state = node.base.attributes.get(MONITOR_ATTRIBUTE)
+    assert state["state"] == 1
+    assert state["exit_code"] == "ERROR_ENERGY_DIVERGED"
+
+
+def test_monitor_stalled(generate_running_calc, monkeypatch):
+    """Test that a calculation without a finished sweep is stopped."""
+    node, log = generate_running_calc()
+    log.write_text(sweep(1, -3.0))
+    monkeypatch.setattr(monitors.time, "time", lambda: 1000.0)
+    with LocalTransport(use_login_shell=False) as transport:
+        assert monitor_progress(node, transport, stall_seconds=60) is None
+        monkeypatch.setattr(monitors.time, "time", lambda: 1100.0)
+        result = monitor_progress(node, transport, stall_seconds=60)
+
+    assert result.message == "no sweep finished in 100 seconds"
+    state = node.base.attributes.get(MONITOR_ATTRIBUTE)
+    assert state["exit_code"] == "ERROR_STALLED"
+
+
+def test_monitor_memory_growth(generate_running_calc):
+    """Test that the memory of the bond dimension is compared to the limit."""
+    node, log = generate_running_calc(max_memory_kb=2 * 1024**2)
+    log.write_text(sweep(1, -3.0, maxlinkdim=64))
+    with LocalTransport(use_login_shell=False) as transport:
+        assert monitor_progress(node, transport) is None
+        with log.open("a") as handle:
+            handle.write(sweep(2, -3.1, maxlinkdim=4096))
+        result = monitor_progress(node, transport)
+
+    assert "bond dimension 4096" in result.message
+    state = node.base.attributes.get(MONITOR_ATTRIBUTE)
+    assert state["exit_code"] == "ERROR_MEMORY_GROWTH"
@@ -3,9 +3,14 @@
 from collections import OrderedDict
 from copy import copy
 
-from aiida.orm import Dict
+import pytest
+from aiida.orm import Dict, QueryBuilder, load_node
 
-from aiida_dmrg.calculations.dyncorr_calc import DynCorrCalculation
+from aiida_dmrg.calculations.dyncorr_calc import (  # noqa: E501
+    DynCorrCalculation,
+    validate_settings,
+)
+from aiida_dmrg.calculations.nodes import DMRGCalcJobNode, DynCorrCalcJobNode
 
 
 def test_dmrg_calculation_default(
@@ -77,3 +82,93 @@ def test_dmrg_calculation_default(
         print("content of the output:", content_input_file.strip())
 
         assert content_input_file.strip() == expected_content
+
+
+def test_dyncorr_calculation_retrieve_policy(
+    fixture_code,
+    generate_calc_job,
+    fixture_remote_data,
+):
+    """Test that the parent folder is not retrieved and the retrieve
+    policy of the settings is applied."""
+
+    inputs = {
+        "code": fixture_code("dyncorr"),
+        "parameters": Dict({"E_range": 2, "num_points": 10}),
+        "parent_calc_folder": fixture_remote_data,
+        "settings": Dict(
+            {"retrieve": {"include": ["*.h5"], "temporary": ["sites.h5"]}}
+        ),
+        "metadata": {
+            "options": {
+                "resources": {"num_machines": 1, "tot_num_mpiprocs": 1},
+            },
+        },
+    }
+
+    _, calc_info = generate_calc_job(DynCorrCalculation, inputs)
+
+    assert calc_info.retrieve_list == [DynCorrCalculation.OUTPUT_FILE]
+    assert calc_info.retrieve_temporary_list == [
+        ("*.h5", ".", None),
+        ("sites.h5", ".", None),
+    ]
+
+
+@pytest.mark.parametrize(
+    "settings, message",
+    [
+        ({"cmdline": ["--quiet"], "julia": {"threads": 4}}, None),
+        ({"reorder": "fiedler"}, "Unknown `settings` keys: reorder"),
+        ({"artifacts": ["H.h5"]}, "Unknown `settings` keys: artifacts"),
+        ({"retrieve": {"max_size": 1}}, "Unknown `retrieve` keys"),
+    ],
+)
+def test_validate_settings(settings, message):
+    """Test that only the settings used by dyncorr are accepted."""
+    error = validate_settings(Dict(settings), None)
+    if message is None:
+        assert error is None
+    else:
+        assert message in error
+
+
+def test_dyncorr_calculation_omega_window(
+    fixture_code,
+    generate_calc_job,
+    fixture_remote_data,
+):
+    """Test that the start of the omega window follows `N`."""
+    inputs = {
+        "code": fixture_code("dyncorr"),
+        "parameters": Dict(
+            {"E_range": 2, "num_points": 10, "N": 200, "omega_min": 1.0}
+        ),
+        "parent_calc_folder": fixture_remote_data,
+        "metadata": {
+            "options": {
+                "resources": {"num_machines": 1, "tot_num_mpiprocs": 1},
+            },
+        },
+    }
+
+    tmp_dir, _ = generate_calc_job(DynCorrCalculation, inputs)
+    input_file = tmp_dir / DynCorrCalculation.INPUT_FILE
+    assert input_file.read_text() == "2 10 200 1.0"
+
+    parameters = {"E_range": 2, "num_points": 10, "omega_min": 1}
+    inputs["parameters"] = Dict(parameters)
+    with pytest.raises(ValueError, match="`N` is required"):
+        generate_calc_job(DynCorrCalculation, inputs)
+
+
+def test_dyncorr_calculation_node(aiida_profile):
+    """Test that the dyncorr nodes are queried apart from the DMRG ones."""
+    assert DynCorrCalculation._node_class is DynCorrCalcJobNode
+    node = DynCorrCalcJobNode(process_type="aiida.calculations:dyncorr")
+    node.store()
+    assert isinstance(load_node(node.pk), DynCorrCalcJobNode)
+
+    for node_class, count in ((DynCorrCalcJobNode, 1), (DMRGCalcJobNode, 0)):
+        query = QueryBuilder().append(node_class, filters={"id": node.pk})
+        assert query.count() == count
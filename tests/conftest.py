@@ -8,8 +8,15 @@ from aiida.common.folders import Folder
 from aiida.common.links import LinkType
 from aiida.engine.utils import instantiate_process
 from aiida.manage.manager import get_manager
-from aiida.orm import CalcJobNode, FolderData, InstalledCode, RemoteData
-from aiida.plugins import ParserFactory
+from aiida.orm import (
+    CalcJobNode,
+    Dict,
+    FolderData,
+    InstalledCode,
+    RemoteData,
+    WorkChainNode,
+)
+from aiida.plugins import ParserFactory, WorkflowFactory
 
 pytest_plugins = [
     "aiida.manage.tests.pytest_fixtures"
@@ -95,6 +102,78 @@ def generate_calc_job(tmp_path):
     return factory
 
 
+@pytest.fixture
+def generate_workchain():
+    """Return a factory to instantiate a :class:`aiida.engine.WorkChain`."""
+
+    def factory(entry_point, inputs):
+        """Instantiate the workchain of the entry point with the inputs."""
+        process_class = WorkflowFactory(entry_point)
+        runner = get_manager().get_runner()
+        return instantiate_process(runner, process_class, **inputs)
+
+    return factory
+
+
+@pytest.fixture
+def generate_finished_node(fixture_localhost):
+    """Return a factory for a finished calculation or workchain node.
+
+    The processes are not run, the node only has the given inputs and
+    outputs, e.g. to test the steps of a workchain that inspect it.
+    """
+
+    def factory(process_type, outputs=None, inputs=None, exit_status=0):
+        """Create and return the stored node of a finished process.
+
+        :param process_type: e.g. ``aiida.calculations:dmrg`` or
+            ``aiida.workflows:dmrg.base``, which sets the node class.
+        :param outputs: the output nodes by link label, created by a
+            calculation or returned by a workchain. Dictionaries are
+            stored as `Dict`.
+        :param inputs: the input nodes of a calculation by link label.
+        :param exit_status: the exit status of the process.
+        """
+        is_calculation = process_type.startswith("aiida.calculations:")
+        if is_calculation:
+            node = CalcJobNode(
+                computer=fixture_localhost,
+                process_type=process_type,
+            )
+            link_type = LinkType.CREATE
+        else:
+            node = WorkChainNode(process_type=process_type)
+            link_type = LinkType.RETURN
+
+        for label, input_node in (inputs or {}).items():
+            if isinstance(input_node, dict):
+                input_node = Dict(input_node)
+            node.base.links.add_incoming(
+                input_node.store(),
+                link_type=LinkType.INPUT_CALC,
+                link_label=label,
+            )
+        node.set_process_state("finished")
+        node.set_exit_status(exit_status)
+        node.store()
+
+        for label, output in (outputs or {}).items():
+            if isinstance(output, dict):
+                output = Dict(output)
+            # Returned nodes must be stored before they are linked
+            if not is_calculation:
+                output.store()
+            output.base.links.add_incoming(
+                node,
+                link_type=link_type,
+                link_label=label,
+            )
+            output.store()
+        return node
+
+    return factory
+
+
 @pytest.fixture
 def generate_calc_job_node(filepath_tests, aiida_computer_local):
     """Create and return a :class:`aiida.orm.CalcJobNode` instance."""
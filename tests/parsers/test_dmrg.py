@@ -1,6 +1,11 @@
+import io
+import pathlib
+import tempfile
 import unittest
-from unittest.mock import MagicMock, PropertyMock
+from unittest.mock import MagicMock, PropertyMock, patch
 
+import h5py
+import numpy as np
 from aiida.orm import Node
 
 from aiida_dmrg.parsers.dmrg import DMRGBaseParser
@@ -12,6 +17,11 @@ class TestDMRGBaseParser(unittest.TestCase):
         mock_process_class = MagicMock()
         mock_process_class.OUTPUT_FILE = "dmrg.out"
         mock_node.process_class = mock_process_class
+        mock_node.inputs = MagicMock()
+        mock_node.exit_status = None
+        mock_node.inputs.parameters.get_dict.return_value = {}
+        attributes = mock_node.base.attributes
+        attributes.get.side_effect = lambda key, default=None: default
         self.parser = DMRGBaseParser(node=mock_node)
         self.out_folder = MagicMock()
 
@@ -19,11 +29,17 @@ class TestDMRGBaseParser(unittest.TestCase):
         type(self.parser).retrieved = PropertyMock(
             return_value=self.out_folder,
         )
+        self.addCleanup(delattr, DMRGBaseParser, "retrieved")
+
+    def set_log(self, content):
+        repo = self.out_folder.base.repository
+        repo.open.return_value = io.BytesIO(content.encode("utf-8"))
 
     def test_parse_success(self):
         repo = self.out_folder.base.repository
         repo.list_object_names.return_value = ["dmrg.out"]
-        repo.get_object_content.return_value = """
+        self.set_log(
+            """
         List of E:
         [1.0, 2.0, 3.0]
         List of S²:
@@ -32,6 +48,7 @@ class TestDMRGBaseParser(unittest.TestCase):
         [0.1, 0.1, 0.1]
         total time = 123.45
         """
+        )
         exit_code = self.parser.parse()
         self.assertEqual(exit_code.status, 0)
 
@@ -45,7 +62,7 @@ class TestDMRGBaseParser(unittest.TestCase):
     def test_error_in_log(self):
         repo = self.out_folder.base.repository
         repo.list_object_names.return_value = ["dmrg.out"]
-        repo.get_object_content.return_value = "Error: Calculation failed."
+        self.set_log("Error: Calculation failed.")
         exit_code = self.parser.parse()
         ec = self.parser.exit_codes
         self.assertEqual(exit_code, ec.ERROR_CALCULATION_FAILED)
@@ -53,11 +70,199 @@ class TestDMRGBaseParser(unittest.TestCase):
     def test_invalid_output(self):
         repo = self.out_folder.base.repository
         repo.list_object_names.return_value = ["dmrg.out"]
-        repo.get_object_content.return_value = "Invalid content"
+        self.set_log("Invalid content")
         exit_code = self.parser.parse()
         ec = self.parser.exit_codes
         self.assertEqual(exit_code, ec.ERROR_OUTPUT_MISSING)
 
+    def test_parse_arrays(self):
+        repo = self.out_folder.base.repository
+        repo.list_object_names.return_value = ["dmrg.out"]
+        self.set_log(
+            "List of E:\n"
+            "[-3.5, -2.0]\n"
+            "List of S²:\n"
+            "[0.0, 2.0]\n"
+            "List of Sz(i):\n"
+            "[[0.5, -0.5], [0.25, 0.25]]\n"
+            "\n"
+            "total time = 1.5 seconds\n"
+        )
+        self.parser.out = MagicMock()
+        exit_code = self.parser.parse()
+        self.assertEqual(exit_code.status, 0)
+        outputs = dict(call[0] for call in self.parser.out.call_args_list)
+        self.assertEqual(
+            outputs["output_parameters"].get_dict(),
+            {
+                "total_time": "1.5 seconds",
+                "n_states": 2,
+                "energy_min": -3.5,
+                "energy_max": -2.0,
+                "n_sites": 2,
+            },
+        )
+        arrays = outputs["output_arrays"]
+        np.testing.assert_allclose(arrays.get_array("energies"), [-3.5, -2.0])
+        np.testing.assert_allclose(arrays.get_array("spin_squared"), [0, 2])
+        np.testing.assert_allclose(
+            arrays.get_array("spin_z"),
+            [[0.5, -0.5], [0.25, 0.25]],
+        )
+
+    def test_parse_site_order(self):
+        repo = self.out_folder.base.repository
+        repo.list_object_names.return_value = ["dmrg.out", "site_order.txt"]
+        repo.get_object_content.return_value = "1 2 0"
+        self.set_log(
+            "List of E:\n"
+            "[-1.0]\n"
+            "List of Sz(i):\n"
+            "[[0.5, -0.5, 0.25]]\n"
+            "\n"
+            "total time = 1.5 seconds\n"
+        )
+        self.parser.out = MagicMock()
+        exit_code = self.parser.parse()
+        self.assertEqual(exit_code.status, 0)
+        outputs = dict(call[0] for call in self.parser.out.call_args_list)
+        order = outputs["site_order"].get_array("order")
+        self.assertEqual(order.tolist(), [1, 2, 0])
+        np.testing.assert_allclose(
+            outputs["output_arrays"].get_array("spin_z"),
+            [[0.25, 0.5, -0.5]],
+        )
+
+    def test_parse_sweeps(self):
+        repo = self.out_folder.base.repository
+        repo.list_object_names.return_value = ["dmrg.out"]
+        self.set_log(
+            "After sweep 1 energy=-1.0 maxlinkdim=4 maxerr=1.0E-05 time=0.5\n"
+            "After sweep 2 energy=-1.5 maxlinkdim=8 maxerr=2.0E-08 time=1.0\n"
+            "After sweep 1 energy=-0.5 maxlinkdim=16 time=2.0\n"
+            "After sweep 2 energy=-0.75 maxlinkdim=16 time=2.5\n"
+            "total time = 6.0\n"
+        )
+        self.parser.out = MagicMock()
+        exit_code = self.parser.parse()
+        self.assertEqual(exit_code.status, 0)
+        outputs = dict(call[0] for call in self.parser.out.call_args_list)
+
+        sweeps = outputs["output_sweeps"]
+        np.testing.assert_array_equal(sweeps.get_array("state"), [0, 0, 1, 1])
+        np.testing.assert_array_equal(sweeps.get_array("sweep"), [1, 2, 1, 2])
+        np.testing.assert_allclose(
+            sweeps.get_array("maxerr"), [1e-5, 2e-8, np.nan, np.nan]
+        )
+        self.assertEqual(
+            outputs["output_parameters"].get_dict(),
+            {
+                "total_time": "6.0",
+                "n_sweeps": 4,
+                "sweep_time": 6.0,
+                "max_bond_dimension": 16,
+                "max_truncation_error": 1e-5,
+                "final_truncation_error": 2e-8,
+                "max_final_energy_change": 0.5,
+            },
+        )
+
+    def test_parse_walltime_checkpoint(self):
+        repo = self.out_folder.base.repository
+        repo.list_object_names.return_value = ["dmrg.out"]
+        self.set_log(
+            "After sweep 1 energy=-1.0 maxlinkdim=4 maxerr=1.0E-05 time=0.5\n"
+            "Checkpoint saved after sweep 1\n"
+            "After sweep 2 energy=-1.5 maxlinkdim=8 maxerr=2.0E-08 time=1.0\n"
+        )
+        self.parser.node.exit_status = 120
+        self.parser.node.exit_message = "out of walltime"
+        self.parser.out = MagicMock()
+        exit_code = self.parser.parse()
+        self.assertEqual(exit_code.status, 120)
+        outputs = dict(call[0] for call in self.parser.out.call_args_list)
+        parameters = outputs["output_parameters"].get_dict()
+        self.assertEqual(parameters["checkpoint_sweep"], 1)
+        self.assertEqual(parameters["n_sweeps"], 2)
+
+    def test_parse_stopped_by_monitor(self):
+        repo = self.out_folder.base.repository
+        repo.list_object_names.return_value = ["dmrg.out"]
+        self.set_log(
+            "After sweep 1 energy=-1.0 maxlinkdim=4 maxerr=1.0E-05 time=0.5\n"
+            "Checkpoint saved after sweep 1\n"
+        )
+        state = {"offset": 100, "exit_code": "ERROR_STALLED"}
+        attributes = self.parser.node.base.attributes
+        attributes.get.side_effect = lambda key, default=None: state
+        self.parser.out = MagicMock()
+        exit_code = self.parser.parse()
+        self.assertEqual(exit_code, self.parser.exit_codes.ERROR_STALLED)
+        outputs = dict(call[0] for call in self.parser.out.call_args_list)
+        parameters = outputs["output_parameters"].get_dict()
+        self.assertEqual(parameters["checkpoint_sweep"], 1)
+
+    def test_parse_out_of_memory(self):
+        repo = self.out_folder.base.repository
+        repo.list_object_names.return_value = ["dmrg.out"]
+        self.set_log(
+            "After sweep 1 energy=-1.0 maxlinkdim=4 maxerr=1.0E-05 time=0.5\n"
+            "ERROR: LoadError: OutOfMemoryError()\n"
+        )
+        self.parser.out = MagicMock()
+        exit_code = self.parser.parse()
+        ec = self.parser.exit_codes
+        self.assertEqual(exit_code, ec.ERROR_SCHEDULER_OUT_OF_MEMORY)
+        outputs = dict(call[0] for call in self.parser.out.call_args_list)
+        parameters = outputs["output_parameters"].get_dict()
+        self.assertEqual(parameters["n_sweeps"], 1)
+
+    def test_error_priority(self):
+        repo = self.out_folder.base.repository
+        repo.list_object_names.return_value = ["dmrg.out"]
+        self.set_log("ERROR: Failed to parse J\nCheck s, N and Sz\n")
+        exit_code = self.parser.parse()
+        ec = self.parser.exit_codes
+        self.assertEqual(exit_code, ec.ERROR_UNPHYISCAL_INPUT)
+
+    def test_parse_hdf5_metadata(self):
+        repo = self.out_folder.base.repository
+        repo.list_object_names.return_value = ["dmrg.out"]
+        self.set_log("total time = 1.5 seconds\n")
+        node = self.parser.node
+        node.inputs.parameters.get_dict.return_value = {"print_HDF5": "true"}
+        node.outputs = MagicMock()
+        node.outputs.remote_folder.get_remote_path.return_value = "/scratch"
+        self.parser.out = MagicMock()
+
+        with tempfile.TemporaryDirectory() as folder:
+            exit_code = self.parser.parse(retrieved_temporary_folder=folder)
+            ec = self.parser.exit_codes
+            self.assertEqual(exit_code, ec.ERROR_HDF5_WRITE)
+
+            # An unreadable file is reported in the log of the calculation
+            (pathlib.Path(folder) / "H.h5").write_bytes(b"not HDF5")
+            kwargs = {"retrieved_temporary_folder": folder}
+            self.set_log("total time = 1.5 seconds\n")
+            logger = PropertyMock()
+            with patch.object(DMRGBaseParser, "logger", logger):
+                exit_code = self.parser.parse(**kwargs)
+            self.assertEqual(exit_code, ec.ERROR_HDF5_WRITE)
+            logger.return_value.error.assert_called_once()
+
+            with h5py.File(pathlib.Path(folder) / "H.h5", "w") as handle:
+                handle["data"] = np.zeros((3, 2))
+            self.set_log("total time = 1.5 seconds\n")
+            exit_code = self.parser.parse(retrieved_temporary_folder=folder)
+
+        self.assertEqual(exit_code.status, 0)
+        outputs = dict(call[0] for call in self.parser.out.call_args_list)
+        metadata = outputs["hdf5_metadata"].get_dict()
+        self.assertEqual(metadata["remote_path"], "/scratch")
+        (summary,) = metadata["files"]
+        self.assertEqual(summary["filename"], "H.h5")
+        self.assertEqual(summary["datasets"][0]["shape"], [3, 2])
+
 
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,61 @@
+"""Tests for the DMRG batch parser."""
+
+import io
+
+from aiida.common import LinkType
+from aiida.orm import CalcJobNode, Dict, FolderData
+
+from aiida_dmrg.parsers.dmrg_batch import DMRGBatchParser
+
+LOG = """
+List of E:
+[-1.5, -0.5]
+List of S²:
+[0.0, 2.0]
+List of Sz(i):
+[[0.0, 0.0], [0.5, -0.5]]
+
+total time = 2.5 seconds
+"""
+
+
+def test_dmrg_batch_parser(fixture_localhost):
+    """Test that the logs are split into the outputs of the tasks."""
+    node = CalcJobNode(
+        computer=fixture_localhost,
+        process_type="aiida.calculations:dmrg.batch",
+    )
+    for label in ("good", "failed"):
+        parameters = Dict({"S": 0.5, "N_sites": 2, "J": 1}).store()
+        node.base.links.add_incoming(
+            parameters,
+            link_type=LinkType.INPUT_CALC,
+            link_label=f"tasks__{label}",
+        )
+    node.store()
+
+    retrieved = FolderData()
+    repository = retrieved.base.repository
+    good_log = io.BytesIO(LOG.encode())
+    repository.put_object_from_filelike(good_log, "good/dmrg.out")
+    failed_log = io.BytesIO(b"ERROR: LoadError: Failed to parse J\n")
+    repository.put_object_from_filelike(failed_log, "failed/dmrg.out")
+    retrieved.base.links.add_incoming(
+        node, link_type=LinkType.CREATE, link_label="retrieved"
+    )
+    retrieved.store()
+
+    results, calcfunction = DMRGBatchParser.parse_from_node(
+        node, store_provenance=False
+    )
+
+    assert calcfunction.exit_status == 394
+    assert "failed" in calcfunction.exit_message
+    good = results["tasks"]["good"]
+    assert good["output_parameters"]["total_time"] == "2.5 seconds"
+    energies = good["output_arrays"].get_array("energies")
+    assert energies.tolist() == [-1.5, -0.5]
+    assert "failed" not in results["tasks"]
+    status = results["task_status"].get_dict()
+    assert status["good"] == {"exit_status": 0, "exit_message": None}
+    assert status["failed"]["exit_status"] == 203
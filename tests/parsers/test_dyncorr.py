@@ -1,6 +1,7 @@
 import unittest
-from unittest.mock import MagicMock, PropertyMock
+from unittest.mock import MagicMock, PropertyMock, patch
 
+import numpy as np
 from aiida.orm import Node
 
 from aiida_dmrg.parsers.dyncorr_parser import DynCorrParser
@@ -33,6 +34,68 @@ class TestDynCorrParser(unittest.TestCase):
         exit_code = self.parser.parse()
         self.assertEqual(exit_code.status, 0)
 
+    def test_parse_matrix_with_omega(self):
+        parameters = MagicMock()
+        parameters.get_dict.return_value = {"E_range": 2, "num_points": 2}
+        self.parser.node.inputs = MagicMock(parameters=parameters)
+        self.parser.out = MagicMock()
+        repo = self.out_folder.base.repository
+        repo.list_object_names.return_value = ["dyncorr.out"]
+        repo.get_object_content.return_value = (
+            "N > N_max\n[0.1 0.2; 0.3 Inf; NaN 0.4]\n"
+        )
+        exit_code = self.parser.parse()
+        self.assertEqual(exit_code.status, 0)
+        link_label, output = self.parser.out.call_args[0]
+        self.assertEqual(link_label, "output_matrix")
+        np.testing.assert_allclose(
+            output.get_array("matrix"),
+            [[0.1, 0.2], [0.3, np.inf], [np.nan, 0.4]],
+        )
+        np.testing.assert_allclose(output.get_array("omega"), [0, 2])
+        self.assertEqual(output.base.attributes.get("omega_axis"), 1)
+
+    def test_parse_square_matrix(self):
+        # Omega is the last axis, also if the sites axis has the same size
+        parameters = MagicMock()
+        parameters.get_dict.return_value = {"E_range": 1, "num_points": 2}
+        self.parser.node.inputs = MagicMock(parameters=parameters)
+        self.parser.out = MagicMock()
+        repo = self.out_folder.base.repository
+        repo.list_object_names.return_value = ["dyncorr.out"]
+        repo.get_object_content.return_value = "N > N_max\n[1 2; 3 4]\n"
+        exit_code = self.parser.parse()
+        self.assertEqual(exit_code.status, 0)
+        _, output = self.parser.out.call_args[0]
+        self.assertEqual(output.base.attributes.get("omega_axis"), 1)
+
+        # A matrix without one column per omega has no grid
+        parameters.get_dict.return_value = {"E_range": 1, "num_points": 3}
+        logger = PropertyMock()
+        with patch.object(DynCorrParser, "logger", logger):
+            self.parser.parse()
+        logger.return_value.warning.assert_called_once()
+        _, output = self.parser.out.call_args[0]
+        self.assertNotIn("omega", output.get_arraynames())
+
+    def test_parse_omega_window(self):
+        parameters = MagicMock()
+        parameters.get_dict.return_value = {
+            "E_range": 2,
+            "num_points": 3,
+            "omega_min": 1,
+        }
+        self.parser.node.inputs = MagicMock(parameters=parameters)
+        self.parser.out = MagicMock()
+        repo = self.out_folder.base.repository
+        repo.list_object_names.return_value = ["dyncorr.out"]
+        repo.get_object_content.return_value = "N > N_max\n[0.1 0.2 0.3]\n"
+        exit_code = self.parser.parse()
+        self.assertEqual(exit_code.status, 0)
+        _, output = self.parser.out.call_args[0]
+        np.testing.assert_allclose(output.get_array("omega"), [1, 1.5, 2])
+        self.assertEqual(output.base.attributes.get("omega_axis"), 1)
+
     def test_missing_output_file(self):
         self.out_folder.base.repository.list_object_names.return_value = []
         exit_code = self.parser.parse()
@@ -0,0 +1,95 @@
+"""Tests for the parser utilities."""
+
+import numpy as np
+import pytest
+
+from aiida_dmrg.parsers import utils
+from aiida_dmrg.parsers.utils import read_array, read_julia_matrix
+
+
+@pytest.mark.parametrize(
+    "text, expected",
+    [
+        ("[1.0, 2.0, 3.0]", [1.0, 2.0, 3.0]),
+        ("Float64[-1.5e-3, 2]", [-1.5e-3, 2.0]),
+        ("[[0.5, -0.5], [0.25, 0.25]]", [[0.5, -0.5], [0.25, 0.25]]),
+        ("[]", []),
+    ],
+)
+def test_read_array(text, expected):
+    """Test reading printed arrays."""
+    np.testing.assert_allclose(read_array(text), expected)
+
+
+def test_read_array_special_values():
+    """Test that `Inf` and `NaN` are read."""
+    array = read_array("[Inf, -Inf, NaN]")
+    assert np.isposinf(array[0]) and np.isneginf(array[1])
+    assert np.isnan(array[2])
+
+
+@pytest.mark.parametrize(
+    "text",
+    ["no array", "[[1.0, 2.0], [3.0]]", "[[[1.0]]]", "[1.0, abc]"],
+)
+def test_read_array_invalid(text):
+    """Test that malformed arrays raise a `ValueError`."""
+    with pytest.raises(ValueError):
+        read_array(text)
+
+
+@pytest.mark.parametrize(
+    "text, expected",
+    [
+        ("[1 2; 3 4]", [[1.0, 2.0], [3.0, 4.0]]),
+        ("[1.0 -2.0]", [[1.0, -2.0]]),
+        ("[1.0, 2.0e-3]", [1.0, 2.0e-3]),
+        ("[5.0;;]", [[5.0]]),
+        ("Matrix{Float64}[Inf -Inf; 0.0 1.0]", [[np.inf, -np.inf], [0, 1]]),
+    ],
+)
+def test_read_julia_matrix(text, expected):
+    """Test reading real Julia matrices."""
+    np.testing.assert_array_equal(read_julia_matrix(text), expected)
+
+
+def test_read_julia_matrix_complex():
+    """Test reading a complex Julia matrix."""
+    matrix = read_julia_matrix(
+        "ComplexF64[1.0 + 2.0im 3.0 - 1.0e-3im; NaN + NaN*im -0.5 + 0.0im]"
+    )
+    assert matrix.dtype == complex
+    np.testing.assert_array_equal(
+        matrix,
+        [[1 + 2j, 3 - 1e-3j], [complex(np.nan, np.nan), -0.5]],
+    )
+
+
+@pytest.mark.parametrize("text", ["1 2; 3 4", "[1 2; 3]", "[1 a; 3 4]"])
+def test_read_julia_matrix_invalid(text):
+    """Test that malformed matrices raise a `ValueError`."""
+    with pytest.raises(ValueError):
+        read_julia_matrix(text)
+
+
+SCANNER = utils.ErrorScanner(
+    [
+        ("Failed to parse J", "ERROR_J_VALUE"),
+        ("Check s", "ERROR_UNPHYISCAL_INPUT"),
+        ("Error", "ERROR_CALCULATION_FAILED"),
+    ]
+)
+
+
+@pytest.mark.parametrize(
+    "text, expected",
+    [
+        ("All good\n", None),
+        ("Error: something\n", "ERROR_CALCULATION_FAILED"),
+        ("Check s\nError: Failed to parse J\n", "ERROR_J_VALUE"),
+        ("Check s, N and Sz\nError\n", "ERROR_UNPHYISCAL_INPUT"),
+    ],
+)
+def test_error_scanner(text, expected):
+    """Test that the message with the highest priority is returned."""
+    assert SCANNER.scan(text) == expected
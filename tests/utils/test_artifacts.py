@@ -0,0 +1,82 @@
+"""Tests for the content-addressed artifact store."""
+
+import hashlib
+import uuid
+
+from aiida_dmrg.utils.artifacts import (
+    artifact_link_label,
+    collect_artifacts,
+    find_artifact,
+)
+
+
+def write_files(folder, files):
+    """Write the files given by their relative path and content."""
+    for name, content in files.items():
+        filepath = folder / name
+        filepath.parent.mkdir(parents=True, exist_ok=True)
+        filepath.write_bytes(content)
+
+
+def test_artifact_link_label():
+    """Test that the labels are valid and without namespace separators."""
+    assert artifact_link_label("sites.h5") == "artifact_sites_h5"
+    assert artifact_link_label("1/__H__.h5") == "artifact_1_H_h5"
+    assert artifact_link_label("a-b", "0123456789abcdef") == (
+        "artifact_a_b_0123456789ab"
+    )
+
+
+def test_collect_artifacts_collision(aiida_profile, tmp_path):
+    """Test that paths with the same label get unique labels."""
+    token = uuid.uuid4()
+    files = {name: f"{name} {token}".encode() for name in ("a-b", "a_b")}
+    write_files(tmp_path, files)
+
+    _, new_artifacts = collect_artifacts(tmp_path, ["*"])
+
+    sha256 = hashlib.sha256(files["a_b"]).hexdigest()
+    assert set(new_artifacts) == {
+        "artifact_a_b",
+        artifact_link_label("a_b", sha256),
+    }
+
+
+def test_collect_artifacts(aiida_profile, tmp_path):
+    """Test that identical files are only stored once."""
+    # Unique content, the artifacts are looked up in the whole database
+    sites = f"sites {uuid.uuid4()}".encode()
+    first = tmp_path / "first"
+    write_files(
+        first,
+        {"sites.h5": sites, "H.h5": b"hamiltonian", "copy/H.h5": sites},
+    )
+
+    index, new_artifacts = collect_artifacts(first, ["*.h5"])
+
+    assert "artifact_copy_H_h5" in new_artifacts
+    assert [item["filename"] for item in index] == [
+        "H.h5",
+        "copy/H.h5",
+        "sites.h5",
+    ]
+    # Identical content within a calculation shares one artifact
+    assert index[1]["uuid"] == index[2]["uuid"]
+    for artifact in new_artifacts.values():
+        artifact.store()
+
+    second = tmp_path / "second"
+    write_files(second, {"sites.h5": sites, "psi.h5": b"wavefunction"})
+    index, new_artifacts = collect_artifacts(second, ["sites.h5"])
+
+    assert not new_artifacts
+    sha256 = hashlib.sha256(sites).hexdigest()
+    assert index == [
+        {
+            "filename": "sites.h5",
+            "sha256": sha256,
+            "uuid": find_artifact(sha256).uuid,
+        }
+    ]
+    other = f"other {uuid.uuid4()}".encode()
+    assert find_artifact(hashlib.sha256(other).hexdigest()) is None
@@ -0,0 +1,106 @@
+"""Tests for the canonical hashes of the calculation inputs."""
+
+import numpy as np
+import pytest
+from aiida.common import LinkType
+from aiida.orm import ArrayData, CalcJobNode, Dict, RemoteData
+
+from aiida_dmrg.calculations.nodes import DMRGCalcJobNode
+from aiida_dmrg.utils import couplings_from_edges
+from aiida_dmrg.utils.caching import normalize_value, parse_matrix
+
+
+@pytest.mark.parametrize(
+    "text", ["[[0, 1], [1, 0]]", "[0 1; 1 0]", "[0.0 1.0;1.0 0.0]"]
+)
+def test_parse_matrix(text):
+    """Test matrices written in Python and Julia."""
+    np.testing.assert_array_equal(parse_matrix(text), [[0, 1], [1, 0]])
+
+
+def test_normalize_value():
+    """Test that equal numbers and matrices have one canonical form."""
+    assert normalize_value(2) == normalize_value(2.0) == 2.0
+    assert normalize_value(-0.0) == 0.0
+    assert normalize_value("true") == "true"
+    edges = {"edges": [[0, 1, 23.0]]}
+    assert normalize_value([[0, 23], [23, 0]]) == edges
+    assert normalize_value("[0 23.0; 23 0]") == edges
+    assert normalize_value([[1, 2], [3, 4]]) == {"matrix": [[1, 2], [3, 4]]}
+
+
+@pytest.fixture
+def get_hash(fixture_code):
+    """Return a factory for the hash of a DMRG calculation."""
+    code = fixture_code("dmrg").store()
+
+    def factory(**inputs):
+        node = DMRGCalcJobNode(process_type="aiida.calculations:dmrg")
+        for label, input_node in {"code": code, **inputs}.items():
+            node.base.links.add_incoming(
+                input_node.store(),
+                link_type=LinkType.INPUT_CALC,
+                link_label=label,
+            )
+        # The hash that is looked up in the cache when the node is stored
+        return node.base.caching._compute_hash()
+
+    return factory
+
+
+def test_hash_parameters(get_hash):
+    """Test that cosmetic differences of the inputs are ignored."""
+    parameters = {"S": 0.5, "N_sites": 2, "J": [[0, 2], [2, 0]]}
+    reference = get_hash(parameters=Dict(parameters))
+
+    cosmetic = {**parameters, "title": "Dimer", "S": 0.5, "N_sites": 2.0}
+    assert get_hash(parameters=Dict(cosmetic)) == reference
+    julia = {**parameters, "J": "[0 2.0; 2.0 0]"}
+    assert get_hash(parameters=Dict(julia)) == reference
+    couplings = couplings_from_edges([(0, 1, 2.0)])
+    sparse = {"S": 0.5, "N_sites": 2}
+    assert get_hash(parameters=Dict(sparse), couplings=couplings) == reference
+    matrix = ArrayData()
+    matrix.set_array("J", np.array([[0, 2], [2, 0]]))
+    dense = get_hash(parameters=Dict(sparse), coupling_matrix=matrix)
+    assert dense == reference
+
+    physics = {**parameters, "J": [[0, 3], [3, 0]]}
+    assert get_hash(parameters=Dict(physics)) != reference
+
+    julia_options = Dict({"julia": {"threads": 4}})
+    assert get_hash(parameters=Dict(parameters), settings=julia_options) == (
+        get_hash(parameters=Dict(parameters), settings=Dict())
+    )
+
+
+def test_hash_parent_calc_folder(get_hash, fixture_localhost):
+    """Test that parent folders are hashed by their creator."""
+    # The creators have the same hash, as they have the same inputs
+
+    def create_folder(path, checkpoint_sweep):
+        node = CalcJobNode(
+            computer=fixture_localhost,
+            process_type="aiida.calculations:dmrg",
+        )
+        node.store()
+        folder = RemoteData(computer=fixture_localhost)
+        folder.set_remote_path(path)
+        results = Dict({"checkpoint_sweep": checkpoint_sweep})
+        outputs = {"output_parameters": results, "remote_folder": folder}
+        for label, output in outputs.items():
+            output.base.links.add_incoming(
+                node, link_type=LinkType.CREATE, link_label=label
+            )
+            output.store()
+        return outputs["remote_folder"]
+
+    parameters = {"S": 0.5, "N_sites": 2, "J": 1}
+    hashes = [
+        get_hash(
+            parameters=Dict(parameters),
+            parent_calc_folder=create_folder(path, sweep),
+        )
+        for path, sweep in (("/a", 4), ("/b", 4), ("/c", 6))
+    ]
+    assert hashes[0] == hashes[1] != hashes[2]
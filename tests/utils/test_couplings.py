@@ -0,0 +1,52 @@
+"""Tests for the sparse coupling utilities."""
+
+import numpy as np
+import pytest
+
+from aiida_dmrg.utils import couplings_from_edges, couplings_from_matrix
+from aiida_dmrg.utils.couplings import get_edge_list, render_edge_list
+
+
+def test_couplings_from_matrix():
+    """Test the conversion of a dense J matrix to an edge list."""
+    matrix = np.zeros((4, 4))
+    for i, value in enumerate([23, 38, 23]):
+        matrix[i, i + 1] = matrix[i + 1, i] = value
+
+    rows, cols, values = get_edge_list(couplings_from_matrix(matrix), 4)
+    np.testing.assert_array_equal(rows, [0, 1, 2])
+    np.testing.assert_array_equal(cols, [1, 2, 3])
+    np.testing.assert_array_equal(values, [23, 38, 23])
+    expected = "edges[1,2,23.0;2,3,38.0;3,4,23.0]"
+    assert render_edge_list(rows, cols, values) == expected
+
+
+@pytest.mark.parametrize(
+    "matrix",
+    [np.ones((2, 3)), [[0, 1], [2, 0]], [[1, 1], [1, 0]]],
+)
+def test_couplings_from_matrix_invalid(matrix):
+    """Test that non-symmetric or non-square matrices are rejected."""
+    with pytest.raises(ValueError):
+        couplings_from_matrix(matrix)
+
+
+@pytest.mark.parametrize(
+    "edges, message",
+    [
+        ([(0, 0, 1.0)], "on-site"),
+        ([(0, 5, 1.0)], r"\[0, 3\)"),
+        ([(0, 1, 1.0), (1, 0, 2.0)], "different J"),
+        ([(0, 1, np.inf)], "finite"),
+    ],
+)
+def test_get_edge_list_invalid(edges, message):
+    """Test the validation of the edge list."""
+    with pytest.raises(ValueError, match=message):
+        get_edge_list(couplings_from_edges(edges), 3)
+
+
+def test_couplings_from_edges_non_integer():
+    """Test that fractional site indices are rejected."""
+    with pytest.raises(ValueError, match="integers"):
+        couplings_from_edges([(0.5, 1, 1.0)])
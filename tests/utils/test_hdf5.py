@@ -0,0 +1,79 @@
+"""Tests for the HDF5 metadata utilities."""
+
+import hashlib
+
+import h5py
+import numpy as np
+
+from aiida_dmrg.utils.hdf5 import hdf5_requested, summarize_hdf5
+
+
+def write_index(group, name, dim, tags):
+    """Write an `Index` in the HDF5 format of ITensors.jl."""
+    index = group.create_group(name)
+    index.attrs["type"] = "Index"
+    index["dim"] = dim
+    index["tags"] = tags
+
+
+def write_mps(handle, name, link_dims):
+    """Write an MPS with the given link dimensions of S=1/2 sites."""
+    mps = handle.create_group(name)
+    mps.attrs["type"] = "MPS"
+    mps["length"] = len(link_dims) + 1
+    for n in range(1, len(link_dims) + 2):
+        tensor = mps.create_group(f"MPS[{n}]")
+        tensor.attrs["type"] = "ITensor"
+        inds = tensor.create_group("inds")
+        inds.attrs["type"] = "IndexSet"
+        dims = [2]
+        write_index(inds, "index_1", 2, f"S=1/2,Site,n={n}")
+        if n > 1:
+            dims.append(link_dims[n - 2])
+            write_index(inds, "index_2", dims[-1], f"Link,l={n - 1}")
+        if n <= len(link_dims):
+            dims.append(link_dims[n - 1])
+            write_index(inds, f"index_{len(dims)}", dims[-1], f"Link,l={n}")
+        tensor.create_group("storage")["data"] = np.zeros(np.prod(dims))
+
+
+def test_summarize_hdf5(tmp_path):
+    """Test the metadata of an MPS and the sites."""
+    filepath = tmp_path / "psi.h5"
+    with h5py.File(filepath, "w") as handle:
+        write_mps(handle, "psi", [2, 4, 2])
+        sites = handle.create_group("sites")
+        sites.attrs["type"] = "IndexSet"
+        for n in range(1, 5):
+            write_index(sites, f"index_{n}", 2, f"S=1/2,Site,n={n}")
+
+    summary = summarize_hdf5(filepath)
+
+    assert summary["filename"] == "psi.h5"
+    assert summary["size"] == filepath.stat().st_size
+    sha256 = hashlib.sha256(filepath.read_bytes()).hexdigest()
+    assert summary["sha256"] == sha256
+    assert summary["tensor_networks"] == [
+        {
+            "name": "psi",
+            "type": "MPS",
+            "length": 4,
+            "bond_dimensions": [2, 4, 2],
+            "site_types": ["S=1/2"],
+            "max_bond_dimension": 4,
+        }
+    ]
+    assert summary["index_sets"] == [
+        {"name": "sites", "dimensions": [2, 2, 2, 2], "site_types": ["S=1/2"]}
+    ]
+    datasets = {item["name"]: item for item in summary["datasets"]}
+    assert datasets["psi/MPS[2]/storage/data"]["shape"] == [16]
+    assert datasets["psi/length"]["dtype"] == "int64"
+
+
+def test_hdf5_requested():
+    """Test the detection of the `print_HDF5` parameter."""
+    assert hdf5_requested({"print_HDF5": "true"})
+    assert hdf5_requested({"print_HDF5": True})
+    assert not hdf5_requested({"print_HDF5": "false"})
+    assert not hdf5_requested({})
@@ -0,0 +1,105 @@
+"""Tests for the index of the DMRG calculations by their Hamiltonian."""
+
+import uuid
+
+import numpy as np
+import pytest
+
+from aiida_dmrg.utils.couplings import couplings_from_edges
+from aiida_dmrg.utils.index import (
+    CUTOFF_EXTRA,
+    FINGERPRINT_EXTRA,
+    find_ground_states,
+    get_fingerprint,
+    index_calculation,
+    update_index,
+)
+
+PARAMETERS = {"S": 0.5, "N_sites": 3, "J": 1}
+
+
+def test_get_fingerprint():
+    """Test that only the system changes the fingerprint."""
+    fingerprint = get_fingerprint(PARAMETERS)
+    same = {"S": 0.5, "N_sites": 3.0, "J": 1.0 + 1e-14, "cutoff": 1e-5}
+    assert get_fingerprint({**same, "title": "chain"}) == fingerprint
+    assert get_fingerprint({**PARAMETERS, "Sz": 0.5}) == fingerprint
+    assert get_fingerprint({**PARAMETERS, "N_sites": 4}) != fingerprint
+    assert get_fingerprint({"N_sites": 3, "J": 1}) is None
+
+    symmetric = {**PARAMETERS, "conserve_symmetry": "true", "Sz": 0.5}
+    assert get_fingerprint(symmetric) != fingerprint
+    highest = {**PARAMETERS, "maximal_energy": "true"}
+    assert get_fingerprint(highest) != fingerprint
+
+
+def test_get_fingerprint_couplings():
+    """Test that all the inputs of the same couplings match."""
+    matrix = np.array([[0, 1, 0], [1, 0, 2], [0, 2, 0]])
+    parameters = {"S": 0.5, "N_sites": 3, "J": matrix.tolist()}
+    fingerprint = get_fingerprint(parameters)
+
+    couplings = couplings_from_edges([(1, 2, 2.0), (0, 1, 1.0)])
+    assert get_fingerprint(PARAMETERS, couplings=couplings) == fingerprint
+    julia = {**parameters, "J": "[0 1 0; 1 0 2; 0 2 0]"}
+    assert get_fingerprint(julia) == fingerprint
+
+
+@pytest.fixture
+def system():
+    """Return the parameters of a chain not computed in earlier tests."""
+    return {"S": 0.5, "N_sites": 3, "J": uuid.uuid4().int % 10**6 + 1}
+
+
+@pytest.fixture
+def generate_finished_calc(generate_finished_node):
+    """Return a factory for a finished `DMRGCalculation` node."""
+
+    def factory(parameters, n_states=1, exit_status=0, couplings=None):
+        inputs = {"parameters": parameters}
+        if couplings is not None:
+            inputs["couplings"] = couplings
+        results = {"n_states": n_states, "energy_min": -1.0}
+        return generate_finished_node(
+            "aiida.calculations:dmrg",
+            {"output_parameters": results},
+            inputs,
+            exit_status,
+        )
+
+    return factory
+
+
+def test_index_calculation(generate_finished_calc, system):
+    """Test the extras of finished and failed calculations."""
+    node = generate_finished_calc({**system, "cutoff": 1e-8})
+    assert index_calculation(node)
+    extras = node.base.extras.all
+    assert extras[FINGERPRINT_EXTRA] == get_fingerprint(system)
+    assert extras[CUTOFF_EXTRA] == 1e-8
+
+    failed = generate_finished_calc(system, exit_status=300)
+    assert not index_calculation(failed)
+    assert FINGERPRINT_EXTRA not in failed.base.extras.all
+
+
+def test_find_ground_states(generate_finished_calc, system):
+    """Test that only tighter cutoffs with enough states are found."""
+    loose = generate_finished_calc({**system, "cutoff": 1e-6})
+    tight = generate_finished_calc({**system, "cutoff": 1e-10})
+    excited = generate_finished_calc(
+        {**system, "cutoff": 1e-9, "n_excitations": 2}, n_states=3
+    )
+    generate_finished_calc({**system, "S": 1, "cutoff": 1e-12})
+    # Calculations finished before the index existed
+    assert update_index() >= 4
+    assert update_index() == 0
+
+    parameters = {**system, "cutoff": 1e-8}
+    matches = find_ground_states(parameters)
+    assert [node.pk for node in matches] == [tight.pk, excited.pk]
+
+    parameters["n_excitations"] = 1
+    assert find_ground_states(parameters) == [excited]
+    matches = find_ground_states(system, tighter_only=False)
+    assert [node.pk for node in matches] == [tight.pk, excited.pk, loose.pk]
@@ -0,0 +1,42 @@
+"""Tests for the Julia launcher options."""
+
+import pytest
+
+from aiida_dmrg.utils.julia import get_julia_cmdline, validate_julia_options
+
+
+def test_get_julia_cmdline():
+    """Test that the options are rendered as flags in a fixed order."""
+    options = {
+        "startup_file": False,
+        "threads": 4,
+        "sysimage": "/apps/itensors.so",
+        "compile": "min",
+    }
+    assert validate_julia_options(options) is None
+    assert get_julia_cmdline(options) == [
+        "--sysimage=/apps/itensors.so",
+        "--threads=4",
+        "--compile=min",
+        "--startup-file=no",
+    ]
+    assert get_julia_cmdline({}) == []
+
+
+@pytest.mark.parametrize(
+    "options, message",
+    [
+        (["--threads=4"], "must be a dictionary"),
+        ({"procs": 2}, "Unknown `julia` options: procs"),
+        ({"sysimage": "itensors.so"}, "must be an absolute path"),
+        ({"threads": 0}, "must be a positive integer"),
+        ({"threads": True}, "must be a positive integer"),
+        ({"compile": "fast"}, "must be one of yes, no, all, min"),
+        ({"optimize": 4}, "must be 0, 1, 2 or 3"),
+        ({"startup_file": "no"}, "must be a boolean"),
+        ({"heap_size_hint": "8 GB"}, "must be a memory size"),
+    ],
+)
+def test_validate_julia_options(options, message):
+    """Test that invalid options are rejected."""
+    assert message in validate_julia_options(options)
@@ -0,0 +1,46 @@
+"""Tests for the reordering of the sites."""
+
+import numpy as np
+import pytest
+
+from aiida_dmrg.utils.reorder import (
+    get_bandwidth,
+    get_site_order,
+    get_weight_matrix,
+    permute_couplings,
+    restore_site_order,
+)
+
+# A chain 0-5-2-4-1-3 with scrambled site labels
+ROWS = np.array([0, 2, 2, 1, 1])
+COLS = np.array([5, 5, 4, 4, 3])
+VALUES = np.array([1.0, -1.0, 2.0, 1.0, 0.5])
+
+
+@pytest.mark.parametrize("method", ["rcm", "fiedler"])
+def test_get_site_order(method):
+    """Test that a scrambled chain is put back in order."""
+    weights = get_weight_matrix(ROWS, COLS, VALUES, 6)
+    order = get_site_order(method, weights)
+    assert sorted(order) == list(range(6))
+    assert get_bandwidth(ROWS, COLS) == 5
+    assert get_bandwidth(ROWS, COLS, order) == 1
+
+
+def test_get_site_order_unknown():
+    """Test that unknown methods are rejected."""
+    with pytest.raises(ValueError, match="unknown ordering"):
+        get_site_order("random", np.eye(2))
+
+
+def test_restore_site_order():
+    """Test that the per-site values are mapped back to the input sites."""
+    order = np.array([0, 5, 2, 4, 1, 3])
+    rows, cols, values = permute_couplings(ROWS, COLS, VALUES, order)
+    assert rows.tolist() == [0, 1, 2, 3, 4]
+    assert (cols - rows).tolist() == [1, 1, 1, 1, 1]
+    assert values.tolist() == [1.0, -1.0, 2.0, 1.0, 0.5]
+
+    spin_z = np.arange(12.0).reshape(2, 6)
+    reordered = spin_z[:, order]
+    np.testing.assert_array_equal(restore_site_order(reordered, order), spin_z)
@@ -0,0 +1,139 @@
+"""Tests for the resource estimator."""
+
+import itertools
+
+import pytest
+from aiida.common import LinkType
+from aiida.orm import CalcJobNode, Dict
+
+from aiida_dmrg.utils.resources import (
+    ResourceEstimator,
+    estimate_memory_kb,
+    get_total_time,
+    query_training_data,
+)
+
+
+def make_records():
+    """Return runs following exact power laws in the parameters."""
+    records = []
+    grid = itertools.product((10, 20, 40), (0.5, 1), (1e-6, 1e-8), (0, 2))
+    for n_sites, spin, cutoff, n_excitations in grid:
+        parameters = {
+            "S": spin,
+            "N_sites": n_sites,
+            "cutoff": cutoff,
+            "n_excitations": n_excitations,
+            "conserve_symmetry": "false",
+        }
+        local_dim = 2 * spin + 1
+        bond_dimension = 2 * local_dim * cutoff**-0.25
+        total_time = 0.1 * n_sites**1.5 * (n_excitations + 1) / cutoff**0.2
+        records.append(
+            {
+                "uuid": None,
+                "parameters": parameters,
+                "bond_dimension": bond_dimension,
+                "total_time": total_time,
+            }
+        )
+    return records
+
+
+def test_predict():
+    """Test that the fitted model recovers the scaling laws."""
+    estimator = ResourceEstimator(make_records())
+    exponents = estimator.coefficients["total_time"]
+    assert exponents["log_n_sites"] == pytest.approx(1.5)
+    assert exponents["log_inverse_cutoff"] == pytest.approx(0.2)
+
+    parameters = {"S": 0.5, "N_sites": 80, "cutoff": 1e-8}
+    prediction = estimator.predict(parameters)
+    assert prediction["total_time"] == pytest.approx(0.1 * 80**1.5 * 1e8**0.2)
+    bond_dimension = prediction["bond_dimension"]
+    assert bond_dimension == pytest.approx(400, abs=1)
+    memory_kb = estimate_memory_kb(parameters, bond_dimension)
+    assert prediction["memory_kb"] == memory_kb
+
+    options = estimator.get_options(parameters, margin=1, overhead=0)
+    assert options["max_wallclock_seconds"] >= prediction["total_time"]
+
+    # An exact MPS of few sites needs a small bond dimension only
+    prediction = estimator.predict({"S": 0.5, "N_sites": 4, "cutoff": 1e-8})
+    assert prediction["bond_dimension"] == 4
+
+
+def test_not_enough_samples():
+    """Test that the model is not fitted to too few calculations."""
+    with pytest.raises(ValueError, match="At least 8 finished calculations"):
+        ResourceEstimator(make_records()[:5])
+
+
+def test_skip_malformed_records():
+    """Test that records with malformed parameters are not fitted."""
+    records = make_records()
+    malformed = [{"N_sites": 10}, {"S": 0.5, "N_sites": None}, {"S": "x"}]
+    for parameters in malformed:
+        records.append({**records[0], "parameters": parameters})
+    records.append({**records[0], "total_time": 0})
+
+    estimator = ResourceEstimator(records)
+    assert estimator.n_skipped == 4
+    assert estimator.n_samples == len(make_records())
+
+    with pytest.raises(ValueError, match="found 0"):
+        ResourceEstimator(records[-4:])
+
+
+@pytest.mark.parametrize(
+    "output_parameters, expected",
+    [
+        ({"total_time": "12.5 seconds"}, 12.5),
+        ({"total_time": "1.0e3"}, 1000.0),
+        ({"sweep_time": 3.0}, 3.0),
+        ({}, None),
+    ],
+)
+def test_get_total_time(output_parameters, expected):
+    """Test reading the runtime of a calculation."""
+    assert get_total_time(output_parameters) == expected
+
+
+def test_query_training_data(fixture_code, fixture_localhost):
+    """Test that only the finished calculations of the code are used."""
+    code = fixture_code("dmrg").store()
+
+    def create_calculation(exit_status, results):
+        node = CalcJobNode(
+            computer=fixture_localhost,
+            process_type="aiida.calculations:dmrg",
+        )
+        parameters = Dict({"S": 0.5, "N_sites": 8}).store()
+        for label, input_node in (("code", code), ("parameters", parameters)):
+            node.base.links.add_incoming(
+                input_node, link_type=LinkType.INPUT_CALC, link_label=label
+            )
+        node.set_process_state("finished")
+        node.set_exit_status(exit_status)
+        node.store()
+        output = Dict(results)
+        output.base.links.add_incoming(
+            node, link_type=LinkType.CREATE, link_label="output_parameters"
+        )
+        output.store()
+        return node
+
+    node = create_calculation(
+        0, {"total_time": "4.0 seconds", "max_bond_dimension": 16}
+    )
+    create_calculation(0, {"total_time": "4.0 seconds"})
+    create_calculation(1, {"total_time": "4.0", "max_bond_dimension": 16})
+
+    assert query_training_data(code=code) == [
+        {
+            "uuid": node.uuid,
+            "parameters": {"S": 0.5, "N_sites": 8},
+            "bond_dimension": 16,
+            "total_time": 4.0,
+        }
+    ]
@@ -0,0 +1,78 @@
+"""Tests for the retrieve policy utilities."""
+
+import pytest
+
+from aiida_dmrg.utils.retrieve import (
+    collect_retrieved_files,
+    get_retrieve_policy,
+    validate_retrieve_policy,
+)
+
+
+@pytest.fixture
+def retrieved_folder(tmp_path):
+    """Return a temporary folder with some retrieved files."""
+    (tmp_path / "data").mkdir()
+    for name, size in [
+        ("H.h5", 10),
+        ("psi.h5", 100),
+        ("sites.h5", 5),
+        ("data/J.npy", 20),
+        ("dmrg.log", 1),
+    ]:
+        (tmp_path / name).write_bytes(b"0" * size)
+    return tmp_path
+
+
+def test_collect_retrieved_files(retrieved_folder):
+    """Test the include, exclude and temporary patterns."""
+    settings = {
+        "retrieve": {
+            "include": ["*.h5", "data/*"],
+            "exclude": ["psi*"],
+            "temporary": ["sites.h5"],
+        }
+    }
+    policy = get_retrieve_policy(settings)
+    retrieved_files = collect_retrieved_files(retrieved_folder, policy)
+
+    repository = retrieved_files.base.repository
+    assert repository.list_object_names() == ["H.h5", "data"]
+    assert repository.list_object_names("data") == ["J.npy"]
+
+
+def test_collect_retrieved_files_max_stored_size(retrieved_folder):
+    """Test that files beyond `max_stored_size` are skipped."""
+    settings = {"retrieve": {"include": ["*.h5"], "max_stored_size": 20}}
+    policy = get_retrieve_policy(settings)
+    retrieved_files = collect_retrieved_files(retrieved_folder, policy)
+
+    repository = retrieved_files.base.repository
+    assert repository.list_object_names() == ["H.h5", "sites.h5"]
+
+
+def test_collect_retrieved_files_none(retrieved_folder):
+    """Test that nothing is returned without matching files."""
+    policy = get_retrieve_policy({})
+    assert collect_retrieved_files(retrieved_folder, policy) is None
+
+
+@pytest.mark.parametrize(
+    "policy, message",
+    [
+        ({"include": ["*.h5"], "max_stored_size": 10}, None),
+        ([], "must be a dictionary"),
+        ({"patterns": []}, "Unknown"),
+        ({"include": "*.h5"}, "list of glob patterns"),
+        ({"exclude": ["/scratch/*"]}, "relative paths"),
+        ({"max_stored_size": -1}, "non-negative"),
+        ({"max_stored_size": 1.5}, "non-negative"),
+    ],
+)
+def test_validate_retrieve_policy(policy, message):
+    """Test the validation of the retrieve policy."""
+    error = validate_retrieve_policy(policy)
+    if message is None:
+        assert error is None
+    else:
+        assert message in error
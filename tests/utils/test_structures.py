@@ -0,0 +1,93 @@
+"""Tests for the couplings of atomic structures."""
+
+import numpy as np
+import pytest
+from ase import Atoms
+from pymatgen.core import Lattice, Structure
+
+from aiida_dmrg.utils import couplings_from_structure
+from aiida_dmrg.utils.structures import get_heisenberg_inputs
+
+
+def get_edges(couplings):
+    """Return the couplings as a list of ``(i, j, J_ij)``."""
+    arrays = [couplings.get_array(key) for key in ("rows", "cols", "values")]
+    return [(int(i), int(j), float(value)) for i, j, value in zip(*arrays)]
+
+
+def make_chain(n_cells, pbc=False):
+    """Return a CuO chain with Cu-Cu bonds of 3 Angstrom."""
+    return Atoms(
+        "CuO" * n_cells,
+        positions=[(1.5 * index, 0, 0) for index in range(2 * n_cells)],
+        cell=[3 * n_cells, 10, 10],
+        pbc=(pbc, False, False),
+    )
+
+
+def test_couplings_from_structure(aiida_profile):
+    """Test the shells of an open chain, without the oxygen sites."""
+    shells = [(3.0, 23.0), (6.0, 2.0)]
+    couplings = couplings_from_structure(make_chain(4), shells)
+    assert couplings.get_array("sites").tolist() == [0, 2, 4, 6]
+    assert get_edges(couplings) == [
+        (0, 1, 23.0),
+        (0, 2, 2.0),
+        (1, 2, 23.0),
+        (1, 3, 2.0),
+        (2, 3, 23.0),
+    ]
+
+
+def test_couplings_periodic(aiida_profile):
+    """Test the bonds across the boundary and to several images."""
+    couplings = couplings_from_structure(make_chain(4, pbc=True), [(3, 1)])
+    assert (0, 3, 1.0) in get_edges(couplings)
+    assert len(get_edges(couplings)) == 4
+
+    # Both neighbors of a site in a cell of two are the same site
+    couplings = couplings_from_structure(make_chain(2, pbc=True), [(3, 1)])
+    assert get_edges(couplings) == [(0, 1, 2.0)]
+
+
+def test_couplings_function(aiida_profile):
+    """Test a distance-dependent exchange, which needs a cutoff."""
+    with pytest.raises(ValueError, match="`cutoff` is required"):
+        couplings_from_structure(make_chain(3), lambda r: np.exp(-r))
+
+    chain = make_chain(3)
+    couplings = couplings_from_structure(chain, lambda r: 10 / r, cutoff=4)
+    assert get_edges(couplings) == [
+        (0, 1, pytest.approx(10 / 3)),
+        (1, 2, pytest.approx(10 / 3)),
+    ]
+
+
+def test_couplings_pymatgen(aiida_profile):
+    """Test the exchange by pair of elements of a pymatgen structure."""
+    structure = Structure(
+        Lattice.orthorhombic(12, 10, 10),
+        ["Cu", "Ni", "Cu", "Ni"],
+        [[0, 0, 0], [0.25, 0, 0], [0.5, 0, 0], [0.75, 0, 0]],
+    )
+    exchange = {("Cu", "Ni"): [(3.0, 5.0)], ("Cu", "Cu"): [(6.0, 1.0)]}
+    couplings = couplings_from_structure(structure, exchange)
+    assert get_edges(couplings) == [
+        (0, 1, 5.0),
+        (0, 2, 2.0),
+        (0, 3, 5.0),
+        (1, 2, 5.0),
+        (2, 3, 5.0),
+    ]
+
+
+def test_get_heisenberg_inputs(aiida_profile):
+    """Test the inputs of a calculation of a structure."""
+    inputs = get_heisenberg_inputs(
+        make_chain(5), [(3.0, 23.0)], {"S": 0.5, "cutoff": 1e-8}
+    )
+    assert inputs["parameters"]["N_sites"] == 5
+    assert len(get_edges(inputs["couplings"])) == 4
+
+    with pytest.raises(ValueError, match="no magnetic sites"):
+        couplings_from_structure(Atoms("O2"), [(1.2, 1.0)])
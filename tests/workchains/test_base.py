@@ -0,0 +1,293 @@
+"""Tests for the DMRG base workchain."""
+
+import uuid
+
+import pytest
+from aiida.engine import ProcessHandlerReport
+from aiida.orm import Bool, Dict, RemoteData, Str
+
+from aiida_dmrg.calculations.dmrggen import DMRGCalculation
+from aiida_dmrg.utils.index import FINGERPRINT_EXTRA, index_calculation
+from aiida_dmrg.workchains import base
+
+
+@pytest.fixture
+def generate_dmrg_workchain(fixture_code, generate_workchain):
+    """Return a factory for a `DMRGBaseWorkChain` after its setup."""
+
+    def factory(resource_limits=None):
+        inputs = {
+            "dmrg": {
+                "code": fixture_code("dmrg"),
+                "parameters": Dict(
+                    {
+                        "S": 0.5,
+                        "N_sites": 4,
+                        "cutoff": 1e-8,
+                        "J": 1,
+                        "Sz": 0,
+                        "n_excitations": 0,
+                        "conserve_symmetry": "false",
+                        "print_HDF5": "false",
+                        "maximal_energy": "false",
+                        "checkpoint_sweeps": 2,
+                    }
+                ),
+                "metadata": {
+                    "options": {
+                        "resources": {
+                            "num_machines": 1,
+                            "tot_num_mpiprocs": 1,
+                        },
+                        "max_wallclock_seconds": 3600,
+                        "max_memory_kb": 1024**2,
+                    },
+                },
+            },
+        }
+        if resource_limits is not None:
+            inputs["resource_limits"] = Dict(resource_limits)
+        process = generate_workchain("dmrg.base", inputs)
+        process.setup()
+        return process
+
+    return factory
+
+
+@pytest.fixture
+def generate_failed_calc(fixture_localhost, generate_finished_node):
+    """Return a factory for a failed `DMRGCalculation` node."""
+
+    def factory(exit_code, output_parameters=None):
+        remote_folder = RemoteData(
+            computer=fixture_localhost, remote_path="/scratch/dmrg"
+        )
+        outputs = {"remote_folder": remote_folder}
+        if output_parameters is not None:
+            outputs["output_parameters"] = output_parameters
+        return generate_finished_node(
+            "aiida.calculations:dmrg", outputs, exit_status=exit_code.status
+        )
+
+    return factory
+
+
+def test_handle_out_of_walltime(generate_dmrg_workchain, generate_failed_calc):
+    """Test the restart from the last checkpoint."""
+    process = generate_dmrg_workchain()
+    walltime = DMRGCalculation.exit_codes.ERROR_SCHEDULER_OUT_OF_WALLTIME
+
+    # Without any checkpoint the calculation starts from scratch with a
+    # longer walltime
+    node = generate_failed_calc(walltime)
+    result = process.handle_out_of_walltime(node)
+    assert isinstance(result, ProcessHandlerReport)
+    assert "parent_calc_folder" not in process.ctx.inputs
+    options = process.ctx.inputs.metadata["options"]
+    assert options["max_wallclock_seconds"] == 7200
+
+    checkpoint = generate_failed_calc(walltime, {"checkpoint_sweep": 2})
+    process.handle_out_of_walltime(checkpoint)
+    parent_calc_folder = process.ctx.inputs.parent_calc_folder
+    assert parent_calc_folder.uuid == checkpoint.outputs.remote_folder.uuid
+
+    assert options["max_wallclock_seconds"] == 7200
+
+    # A run without a new checkpoint continues from the previous one
+    process.handle_out_of_walltime(generate_failed_calc(walltime))
+    parent_calc_folder = process.ctx.inputs.parent_calc_folder
+    assert parent_calc_folder.uuid == checkpoint.outputs.remote_folder.uuid
+    assert options["max_wallclock_seconds"] == 14400
+
+
+def test_handle_out_of_memory(generate_dmrg_workchain, generate_failed_calc):
+    """Test the scaling of the memory and machines up to their limits."""
+    limits = {"max_memory_kb": 3 * 1024**2, "max_num_machines": 2}
+    process = generate_dmrg_workchain(limits)
+    out_of_memory = DMRGCalculation.exit_codes.ERROR_SCHEDULER_OUT_OF_MEMORY
+    options = process.ctx.inputs.metadata["options"]
+
+    expected = [
+        ("max_memory_kb", 2 * 1024**2),
+        ("max_memory_kb", 3 * 1024**2),
+        ("num_machines", 2),
+    ]
+    for key, value in expected:
+        node = generate_failed_calc(out_of_memory)
+        result = process.handle_out_of_memory(node)
+        assert result.exit_code.status == 0
+        assert process.ctx.escalations[-1]["changes"][key][1] == value
+
+    assert options["max_memory_kb"] == 3 * 1024**2
+    assert options["resources"]["num_machines"] == 2
+
+    result = process.handle_out_of_memory(generate_failed_calc(out_of_memory))
+    exit_code = process.exit_codes.ERROR_RESOURCE_LIMIT_REACHED
+    assert result.exit_code == exit_code
+    assert len(process.ctx.escalations) == 3
+
+    process._output_escalation_history()
+    history = process.outputs["escalation_history"]
+    assert history.creator.process_label == "build_escalation_history"
+    assert len(history["escalations"]) == 3
+
+
+def test_handle_mpi_abort(generate_dmrg_workchain, generate_failed_calc):
+    """Test that killed MPI processes are spread over more machines."""
+    process = generate_dmrg_workchain()
+    mpi_abort = DMRGCalculation.exit_codes.ERROR_MPI_ABORT
+
+    process.handle_mpi_abort(generate_failed_calc(mpi_abort))
+    (escalation,) = process.ctx.escalations
+    assert escalation["reason"] == "killed MPI process"
+    assert escalation["changes"] == {"num_machines": [1, 2]}
+
+
+def test_inspect_dmrg(generate_dmrg_workchain, generate_failed_calc):
+    """Test that unphysical inputs are not restarted."""
+    process = generate_dmrg_workchain()
+    exit_code = DMRGCalculation.exit_codes.ERROR_UNPHYISCAL_INPUT
+
+    result = process.inspect_dmrg(generate_failed_calc(exit_code))
+    assert result.do_break
+    assert result.exit_code == process.exit_codes.ERROR_UNRECOVERABLE_FAILURE
+
+
+def test_estimate_resources(monkeypatch, fixture_code, generate_workchain):
+    """Test that only the missing options are estimated, up to the limits."""
+    estimates = {"max_wallclock_seconds": 7200, "max_memory_kb": 8 * 1024**2}
+
+    class Estimator:
+        n_samples = 10
+        n_skipped = 0
+
+        @classmethod
+        def from_database(cls, code):
+            assert code.uuid == inputs["dmrg"]["code"].uuid
+            return cls()
+
+        def get_options(self, parameters):
+            assert parameters["N_sites"] == 4
+            return dict(estimates)
+
+    monkeypatch.setattr(base, "ResourceEstimator", Estimator)
+    inputs = {
+        "dmrg": {
+            "code": fixture_code("dmrg"),
+            "parameters": Dict({"S": 0.5, "N_sites": 4, "J": 1}),
+            "metadata": {
+                "options": {
+                    "resources": {"num_machines": 1},
+                    "max_wallclock_seconds": 600,
+                },
+            },
+        },
+        "estimate_resources": Bool(True),
+        "resource_limits": Dict({"max_memory_kb": 4 * 1024**2}),
+    }
+    process = generate_workchain("dmrg.base", inputs)
+    process.setup()
+
+    options = process.ctx.inputs.metadata["options"]
+    assert options["max_wallclock_seconds"] == 600
+    assert options["max_memory_kb"] == 4 * 1024**2
+
+
+def test_index_calculation(
+    fixture_code,
+    generate_finished_node,
+    generate_workchain,
+):
+    """Test that the finished calculations of the workchain are indexed."""
+    system = {"S": 0.5, "N_sites": 4, "J": uuid.uuid4().int % 10**6 + 1}
+    node = generate_finished_node(
+        "aiida.calculations:dmrg",
+        outputs={"output_parameters": {"n_states": 1, "energy_min": -1.6}},
+        inputs={"parameters": system},
+    )
+
+    inputs = {
+        "dmrg": {
+            "code": fixture_code("dmrg"),
+            "parameters": Dict(system),
+            "metadata": {"options": {"resources": {"num_machines": 1}}},
+        },
+    }
+    process = generate_workchain("dmrg.base", inputs)
+    process.setup()
+    process.ctx.children = [node]
+    process.ctx.iteration = 1
+    assert process.inspect_process() is None
+    assert FINGERPRINT_EXTRA in node.base.extras.all
+
+
+@pytest.mark.parametrize(
+    "mode, flags",
+    [("skip", {}), ("skip", {"print_HDF5": "true"}), ("warm_start", {})],
+)
+def test_reuse(
+    mode,
+    flags,
+    fixture_code,
+    fixture_localhost,
+    generate_finished_node,
+    generate_workchain,
+):
+    """Test that an indexed calculation is reused or warm-started from."""
+    # A chain not computed in earlier tests
+    system = {"S": 0.5, "N_sites": 4, "J": uuid.uuid4().int % 10**6 + 1}
+    outputs = {
+        "output_parameters": Dict(
+            {"n_states": 1, "energy_min": -1.6, "checkpoint_sweep": 4}
+        ),
+        "remote_folder": RemoteData(
+            computer=fixture_localhost, remote_path="/scratch/dmrg"
+        ),
+    }
+    node = generate_finished_node(
+        "aiida.calculations:dmrg",
+        outputs,
+        inputs={"parameters": {**system, "cutoff": 1e-8}},
+    )
+    assert index_calculation(node)
+
+    # The earlier cutoff is too loose to skip the tighter run
+    cutoff = 1e-6 if mode == "skip" else 1e-10
+    inputs = {
+        "dmrg": {
+            "code": fixture_code("dmrg"),
+            "parameters": Dict({**system, **flags, "cutoff": cutoff}),
+            "metadata": {"options": {"resources": {"num_machines": 1}}},
+        },
+        "reuse": Str(mode),
+    }
+    process = generate_workchain("dmrg.base", inputs)
+    process.setup()
+
+    if flags:
+        # The earlier calculation did not write the HDF5 file
+        assert process.should_run_process()
+        assert "parent_calc_folder" not in process.ctx.inputs
+    elif mode == "skip":
+        assert not process.should_run_process()
+        process.results()
+        output_parameters = process.outputs["output_parameters"]
+        assert output_parameters.uuid == outputs["output_parameters"].uuid
+    else:
+        assert process.should_run_process()
+        parent_calc_folder = process.ctx.inputs.parent_calc_folder
+        assert parent_calc_folder.uuid == outputs["remote_folder"].uuid
+
+
+def test_validate_reuse(fixture_code, generate_workchain):
+    """Test that unknown uses of earlier calculations are rejected."""
+    inputs = {
+        "dmrg": {
+            "code": fixture_code("dmrg"),
+            "parameters": Dict({"S": 0.5, "N_sites": 4, "J": 1}),
+            "metadata": {"options": {"resources": {"num_machines": 1}}},
+        },
+        "reuse": Str("restart"),
+    }
+    with pytest.raises(ValueError, match="`reuse` must be one of"):
+        generate_workchain("dmrg.base", inputs)
@@ -0,0 +1,178 @@
+"""Tests for the cutoff convergence workchain."""
+
+import pytest
+from aiida.orm import Dict, Float, Int, List, RemoteData
+
+from aiida_dmrg.utils.resources import DEFAULT_CUTOFF
+from aiida_dmrg.workchains.cutoff import extrapolate_energy
+
+
+def test_extrapolate_energy():
+    """Test the linear extrapolation to zero truncation error."""
+    energies = [-1.0 - 0.5 * error for error in (1e-4, 1e-3)]
+    extrapolated = extrapolate_energy([1e-4, 1e-3, None], energies + [-2])
+    assert extrapolated == pytest.approx(-1.0)
+    assert extrapolate_energy([1e-4, 1e-4], [-1.0, -1.1]) is None
+
+
+# The parameters before `checkpoint_sweeps`, except `cutoff`
+PARAMETERS = {
+    "S": 0.5,
+    "N_sites": 8,
+    "J": 1,
+    "Sz": 0,
+    "n_excitations": 0,
+    "conserve_symmetry": "false",
+    "print_HDF5": "false",
+    "maximal_energy": "false",
+}
+
+
+@pytest.fixture
+def generate_step(fixture_localhost, generate_finished_node):
+    """Return a factory for a finished `DMRGBaseWorkChain` of a step."""
+
+    def factory(energy, truncation_error, exit_status=0):
+        output_parameters = {
+            "energy_min": energy,
+            "max_truncation_error": 10 * truncation_error,
+            "final_truncation_error": truncation_error,
+            "max_bond_dimension": 32,
+            "total_time": "10.0 seconds",
+        }
+        remote_folder = RemoteData(computer=fixture_localhost)
+        remote_folder.set_remote_path("/tmp")
+        outputs = {
+            "output_parameters": output_parameters,
+            "remote_folder": remote_folder,
+        }
+        return generate_finished_node(
+            "aiida.workflows:dmrg.base", outputs, exit_status=exit_status
+        )
+
+    return factory
+
+
+@pytest.fixture
+def generate_inputs(fixture_code):
+    """Return the inputs of the workchain."""
+
+    def factory(**kwargs):
+        resources = {"num_machines": 1}
+        inputs = {
+            "base": {
+                "dmrg": {
+                    "code": fixture_code("dmrg"),
+                    "parameters": Dict(
+                        {**PARAMETERS, "cutoff": 1e-4, "checkpoint_sweeps": 2}
+                    ),
+                    "metadata": {"options": {"resources": resources}},
+                },
+            },
+        }
+        inputs.update(kwargs)
+        return inputs
+
+    return factory
+
+
+def test_cutoff_convergence(
+    generate_workchain, generate_inputs, generate_step, monkeypatch
+):
+    """Test the warm starts and the stop once the energy is converged."""
+    inputs = generate_inputs(energy_tolerance=Float(1e-3))
+    process = generate_workchain("dmrg.cutoff_convergence", inputs)
+    process.setup()
+    expected = [1e-4, 1e-5, 1e-6, 1e-7, 1e-8, 1e-9]
+    assert process.ctx.cutoffs == pytest.approx(expected)
+
+    submitted = []
+
+    def submit(_, **kwargs):
+        parent = kwargs["dmrg"].get("parent_calc_folder")
+        cutoff = kwargs["dmrg"]["parameters"]["cutoff"]
+        submitted.append((cutoff, parent))
+        return generate_step(0.0, 0.0)
+
+    monkeypatch.setattr(process, "submit", submit)
+
+    for energy, error in ((-3.0, 1e-4), (-3.01, 1e-5), (-3.0105, 1e-6)):
+        assert process.should_run_step()
+        process.run_step()
+        process.ctx.workchain = generate_step(energy, error)
+        assert process.inspect_step() is None
+    assert not process.should_run_step()
+
+    # Every step starts from the remote folder of the previous one
+    assert submitted[0] == (pytest.approx(1e-4), None)
+    assert submitted[1][1] is not None
+
+    assert process.results() is None
+    convergence = process.outputs["convergence"]
+    assert convergence.creator.process_label == "collect_convergence"
+    convergence = convergence.get_dict()
+    assert convergence["converged"]
+    assert convergence["cutoff"] == pytest.approx(1e-6)
+    assert convergence["steps"][2]["energy_change"] == pytest.approx(5e-4)
+    assert convergence["total_time"] == 30.0
+    assert convergence["steps"][2]["truncation_error"] == pytest.approx(1e-6)
+    assert "extrapolated_energy" in convergence
+    assert "remote_folder" in process.outputs
+
+
+def test_not_converged(generate_workchain, generate_inputs, generate_step):
+    """Test that a sequence without convergence is reported."""
+    inputs = generate_inputs(cutoffs=List([1e-5, 1e-6]))
+    process = generate_workchain("dmrg.cutoff_convergence", inputs)
+    process.setup()
+
+    for energy in (-3.0, -3.1):
+        process.ctx.workchain = generate_step(energy, 1e-5)
+        process.inspect_step()
+    assert not process.should_run_step()
+
+    exit_code = process.results()
+    assert exit_code == process.exit_codes.ERROR_NOT_CONVERGED
+    assert not process.outputs["convergence"]["converged"]
+
+    process.ctx.workchain = generate_step(-3.0, 1e-5, exit_status=300)
+    exit_code = process.inspect_step()
+    assert exit_code == process.exit_codes.ERROR_STEP_FAILED
+
+
+def test_validate_cutoffs(generate_workchain, generate_inputs):
+    """Test that increasing cutoffs are rejected."""
+    inputs = generate_inputs(cutoffs=List([1e-6, 1e-5]))
+    with pytest.raises(ValueError, match="must be decreasing"):
+        generate_workchain("dmrg.cutoff_convergence", inputs)
+
+
+def test_validate_template(generate_workchain, generate_inputs):
+    """Test that the template is validated with the `cutoff` of a step."""
+    parameters = {**PARAMETERS, "checkpoint_sweeps": 2}
+    inputs = generate_inputs(cutoffs=List([1e-5, 1e-6]))
+    inputs["base"]["dmrg"]["parameters"] = Dict(parameters)
+    generate_workchain("dmrg.cutoff_convergence", inputs)
+
+    del parameters["Sz"]
+    inputs["base"]["dmrg"]["parameters"] = Dict(parameters)
+    with pytest.raises(ValueError, match="missing: Sz"):
+        generate_workchain("dmrg.cutoff_convergence", inputs)
+
+
+def test_default_cutoff(generate_workchain, generate_inputs):
+    """Test that the sequence starts from the default cutoff of the code."""
+    inputs = generate_inputs(max_iterations=Int(2))
+    parameters = {**PARAMETERS, "checkpoint_sweeps": 2}
+    inputs["base"]["dmrg"]["parameters"] = Dict(parameters)
+    process = generate_workchain("dmrg.cutoff_convergence", inputs)
+    process.setup()
+    assert process.ctx.cutoffs == pytest.approx([DEFAULT_CUTOFF, 1e-11])
+
+
+def test_validate_checkpoint_sweeps(generate_workchain, generate_inputs):
+    """Test that the warm starts need `checkpoint_sweeps`."""
+    inputs = generate_inputs()
+    inputs["base"]["dmrg"]["parameters"] = Dict(PARAMETERS)
+    with pytest.raises(ValueError, match="need `checkpoint_sweeps`"):
+        generate_workchain("dmrg.cutoff_convergence", inputs)
@@ -0,0 +1,186 @@
+"""Tests for the dynamical correlator workchain."""
+
+import numpy as np
+import pytest
+from aiida.orm import ArrayData, Dict, Int
+
+from aiida_dmrg.workchains import dyncorr_workchain
+
+
+def test_get_omega_chunks():
+    """Test that the windows cover the points of the full grid."""
+    parameters = {"E_range": 2, "num_points": 11, "N": 100}
+    chunks = dyncorr_workchain.get_omega_chunks(parameters, 3)
+
+    assert [chunk["num_points"] for chunk in chunks] == [4, 4, 3]
+    assert all(chunk["N"] == 100 for chunk in chunks)
+    grids = [
+        np.linspace(chunk["omega_min"], chunk["E_range"], chunk["num_points"])
+        for chunk in chunks
+    ]
+    omega = np.concatenate(grids)
+    np.testing.assert_allclose(omega, np.linspace(0, 2, 11))
+
+
+def test_merge_omega_chunks(aiida_profile):
+    """Test that the windows are concatenated along the omega axis."""
+    chunks = {}
+    for index, omega in enumerate(([0.0, 0.5], [1.0])):
+        output = ArrayData()
+        output.set_array("matrix", np.full((3, len(omega)), index))
+        output.set_array("omega", np.array(omega))
+        output.base.attributes.set("omega_axis", 1)
+        chunks[f"chunk_{index:04d}"] = output
+
+    merged = dyncorr_workchain.merge_omega_chunks(**chunks)
+
+    np.testing.assert_array_equal(merged.get_array("omega"), [0, 0.5, 1])
+    assert merged.get_array("matrix").tolist() == [[0, 0, 1]] * 3
+    assert merged.base.attributes.get("omega_axis") == 1
+
+
+def test_merge_square_chunks(aiida_profile):
+    """Test the merge of windows with as many points as sites."""
+    n_sites = 3
+    grid = np.linspace(0, 2, 2 * n_sites)
+    chunks = {}
+    for index, omega in enumerate(np.split(grid, 2)):
+        output = ArrayData()
+        output.set_array("matrix", np.tile(omega, (n_sites, 1)))
+        output.set_array("omega", omega)
+        output.base.attributes.set("omega_axis", 1)
+        chunks[f"chunk_{index:04d}"] = output
+
+    merged = dyncorr_workchain.merge_omega_chunks(**chunks)
+
+    matrix = merged.get_array("matrix")
+    assert matrix.shape == (n_sites, grid.size)
+    np.testing.assert_array_equal(matrix, np.tile(grid, (n_sites, 1)))
+
+
+@pytest.mark.parametrize(
+    "inputs, message",
+    [
+        (
+            {"dyncorr_params": {"E_range": 2, "num_points": 10}},
+            "`N` is required",
+        ),
+        (
+            {"dyncorr_params": {"E_range": 2, "num_points": 2, "N": 10}},
+            "cannot exceed",
+        ),
+        ({"dmrg_params": None}, "dmrg_params required"),
+        ({"dyncorr_params": None}, "either `dyncorr_params` or"),
+        ({"dyncorr_scan": {"a": {"E_range": 2}}}, "either `dyncorr_params`"),
+    ],
+)
+def test_validate_inputs(fixture_code, generate_workchain, inputs, message):
+    """Test the validation of the ground state and of the chunks."""
+    defaults = {
+        "dmrg_code": fixture_code("dmrg"),
+        "dyncorr_code": fixture_code("dyncorr"),
+        "dmrg_params": {"S": 0.5, "N_sites": 4, "J": 1},
+        "dyncorr_params": {"E_range": 2, "num_points": 10, "N": 10},
+        "n_chunks": Int(3),
+    }
+    inputs = {**defaults, **inputs}
+    for key in ("dmrg_params", "dyncorr_params"):
+        if inputs[key] is None:
+            del inputs[key]
+        else:
+            inputs[key] = Dict(inputs[key])
+    if "dyncorr_scan" in inputs:
+        scan = inputs["dyncorr_scan"]
+        inputs["dyncorr_scan"] = {k: Dict(v) for k, v in scan.items()}
+
+    with pytest.raises(ValueError, match=message):
+        generate_workchain("dyncorr", inputs)
+
+
+@pytest.fixture
+def generate_dyncorr_workchain(
+    fixture_code,
+    generate_workchain,
+    generate_remote_data,
+):
+    """Return a factory for a `DynCorrWorkChain` reusing a ground state."""
+
+    def factory(**inputs):
+        inputs = {
+            "dyncorr_code": fixture_code("dyncorr"),
+            "parent_calc_folder": generate_remote_data,
+            **inputs,
+        }
+        process = generate_workchain("dyncorr", inputs)
+        process.setup()
+        return process
+
+    return factory
+
+
+@pytest.fixture
+def generate_dyncorr_calc(generate_finished_node):
+    """Return a factory for a finished `DynCorrCalculation` node."""
+
+    def factory(omega, exit_status=0):
+        output = ArrayData()
+        output.set_array("matrix", np.ones((2, len(omega))))
+        output.set_array("omega", np.array(omega))
+        output.base.attributes.set("omega_axis", 1)
+        return generate_finished_node(
+            "aiida.calculations:dyncorr",
+            {"output_matrix": output},
+            exit_status=exit_status,
+        )
+
+    return factory
+
+
+def test_dyncorr_scan(
+    monkeypatch,
+    generate_dyncorr_workchain,
+    generate_dyncorr_calc,
+):
+    """Test the fan-out over the scan from the given ground state."""
+    scan = {
+        "coarse": Dict({"E_range": 2, "num_points": 10, "N": 100}),
+        "fine": Dict({"E_range": 2, "num_points": 1000, "N": 400}),
+    }
+    process = generate_dyncorr_workchain(
+        dyncorr_scan=scan,
+        n_chunks=Int(2),
+        options={"dyncorr": {"resources": {"num_machines": 1}}},
+    )
+    assert not process.should_run_dmrg()
+
+    submitted = []
+    keys = []
+    node = generate_dyncorr_calc([0.0])
+
+    def submit(builder):
+        parent_calc_folder = builder.parent_calc_folder.uuid
+        submitted.append((parent_calc_folder, builder.parameters.get_dict()))
+        return node
+
+    monkeypatch.setattr(process, "submit", submit)
+    monkeypatch.setattr(process, "to_context", lambda **kw: keys.extend(kw))
+    process.run_dyncorr()
+
+    assert keys == ["dyncorr_coarse"] * 2 + ["dyncorr_fine"] * 2
+    parent_calc_folder = process.inputs.parent_calc_folder.uuid
+    assert all(uuid == parent_calc_folder for uuid, _ in submitted)
+    num_points = [parameters["num_points"] for _, parameters in submitted]
+    assert num_points == [5, 5, 500, 500]
+
+    process.ctx.dyncorr_coarse = [
+        generate_dyncorr_calc([0.0, 0.5]),
+        generate_dyncorr_calc([1.0]),
+    ]
+    process.ctx.dyncorr_fine = [generate_dyncorr_calc([0.0], exit_status=1)]
+    exit_code = process.finalize()
+
+    assert exit_code == process.exit_codes.ERROR_DYNCCORR_FAILED
+    outputs = process.outputs["output_matrices"]
+    assert list(outputs) == ["coarse"]
+    omega = outputs["coarse"].get_array("omega")
+    np.testing.assert_array_equal(omega, [0, 0.5, 1])
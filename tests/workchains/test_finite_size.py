@@ -0,0 +1,184 @@
+"""Tests for the finite-size scaling workchain."""
+
+import numpy as np
+import pytest
+from aiida.orm import ArrayData, Bool, Dict, Int, List, RemoteData
+
+from aiida_dmrg.workchains.finite_size import (
+    extrapolate_finite_size,
+    fit_inverse_size,
+    get_chains,
+)
+
+
+def test_get_chains():
+    """Test that warm starts chain the sizes of the same parity."""
+    assert get_chains([8, 4, 6], False) == [[4], [6], [8]]
+    assert get_chains([8, 4, 5, 6, 7], True) == [[4, 6, 8], [5, 7]]
+
+
+def test_fit_inverse_size():
+    """Test the fit of several observables, with one missing."""
+    sizes = np.array([8, 16, 32, 64])
+    values = np.stack(
+        [-0.4 + 0.1 / sizes + 0.5 / sizes**2, np.full(4, np.nan)], axis=1
+    )
+    coefficients = fit_inverse_size(sizes, values, order=2)
+    assert coefficients[:, 0] == pytest.approx([-0.4, 0.1, 0.5])
+    assert np.isnan(coefficients[:, 1]).all()
+
+    # The order is reduced to fit two sizes only
+    assert fit_inverse_size(sizes[:2], values[:2], order=2).shape == (2, 2)
+
+
+def make_arrays(energies):
+    """Return the `output_arrays` with the given energies."""
+    arrays = ArrayData()
+    arrays.set_array("energies", np.array(energies))
+    return arrays
+
+
+def test_extrapolate_finite_size(aiida_profile):
+    """Test the extrapolation of the energy per site and the gap."""
+    arrays = {
+        f"n_{n}": make_arrays([-0.5 * n + 1, -0.5 * n + 1 + 2 / n])
+        for n in (10, 20, 40)
+    }
+    results = extrapolate_finite_size(Int(1), **arrays)
+    extrapolation = results["extrapolation"].get_dict()
+    assert extrapolation["n_sites"] == [10, 20, 40]
+    assert extrapolation["energy_per_site"] == pytest.approx(-0.5)
+    assert extrapolation["gap"] == pytest.approx(0, abs=1e-12)
+    gap = results["scaling"].get_array("gap")
+    assert gap == pytest.approx([0.2, 0.1, 0.05])
+
+
+@pytest.fixture
+def generate_size(fixture_localhost, generate_finished_node):
+    """Return a factory for a finished `DMRGBaseWorkChain` of a size."""
+
+    def factory(energies, exit_status=0):
+        remote_folder = RemoteData(computer=fixture_localhost)
+        remote_folder.set_remote_path("/tmp")
+        outputs = {
+            "output_arrays": make_arrays(energies),
+            "remote_folder": remote_folder,
+        }
+        return generate_finished_node(
+            "aiida.workflows:dmrg.base", outputs, exit_status=exit_status
+        )
+
+    return factory
+
+
+# Complete parameters but `N_sites`, which is set for every size
+WARM_START_PARAMETERS = {
+    "S": 1,
+    "cutoff": 1e-8,
+    "J": 2,
+    "Sz": 0,
+    "n_excitations": 1,
+    "conserve_symmetry": "false",
+    "print_HDF5": "false",
+    "maximal_energy": "false",
+    "checkpoint_sweeps": 2,
+}
+
+
+@pytest.fixture
+def generate_inputs(fixture_code):
+    """Return the inputs of the workchain."""
+
+    def factory(parameters=None, **kwargs):
+        resources = {"num_machines": 1}
+        inputs = {
+            "base": {
+                "dmrg": {
+                    "code": fixture_code("dmrg"),
+                    "parameters": Dict(parameters or {"S": 0.5, "J": 1}),
+                    "metadata": {"options": {"resources": resources}},
+                },
+            },
+        }
+        inputs.update(kwargs)
+        return inputs
+
+    return factory
+
+
+def test_warm_start(
+    generate_workchain,
+    generate_inputs,
+    generate_size,
+    monkeypatch,
+):
+    """Test that the sequences of both parities run side by side."""
+    inputs = generate_inputs(
+        parameters=WARM_START_PARAMETERS,
+        sizes=List([4, 5, 6, 7]),
+        warm_start=Bool(True),
+    )
+    process = generate_workchain("dmrg.finite_size", inputs)
+    process.setup()
+
+    submitted = []
+
+    def submit(_, **kwargs):
+        dmrg = kwargs["dmrg"]
+        n_sites = dmrg["parameters"]["N_sites"]
+        submitted.append((n_sites, "parent_calc_folder" in dmrg))
+        return generate_size([0.0])
+
+    monkeypatch.setattr(process, "submit", submit)
+    monkeypatch.setattr(process, "to_context", lambda **kwargs: None)
+
+    process.run_sizes()
+    assert submitted == [(4, False), (5, False)]
+    process.ctx.n_4 = generate_size([-1.6, -1.0])
+    process.ctx.n_5 = generate_size([-1.9], exit_status=300)
+    process.inspect_sizes()
+
+    # The odd sequence starts over after its first size failed
+    process.run_sizes()
+    assert submitted[2:] == [(6, True), (7, False)]
+    process.ctx.n_6 = generate_size([-2.5, -2.1])
+    process.ctx.n_7 = generate_size([-2.9, -2.7])
+    process.inspect_sizes()
+    assert not process.should_run_sizes()
+
+    exit_code = process.results()
+    assert exit_code == process.exit_codes.ERROR_SIZES_FAILED
+    scaling = process.outputs["scaling"]
+    assert scaling.get_array("n_sites").tolist() == [4, 6, 7]
+    assert "energy_per_site" in process.outputs["extrapolation"].get_dict()
+
+
+def test_validate_uniform_coupling(generate_workchain, generate_inputs):
+    """Test that a coupling matrix of a fixed size is rejected."""
+    inputs = generate_inputs(
+        parameters={"S": 0.5, "J": "[[0,1],[1,0]]"}, sizes=List([4, 6])
+    )
+    with pytest.raises(ValueError, match="uniform coupling"):
+        generate_workchain("dmrg.finite_size", inputs)
+
+
+def test_validate_template(generate_workchain, generate_inputs):
+    """Test that the template is validated with the `N_sites` of a size."""
+    parameters = dict(WARM_START_PARAMETERS)
+    inputs = generate_inputs(parameters=parameters, sizes=List([4, 6]))
+    generate_workchain("dmrg.finite_size", inputs)
+
+    del parameters["Sz"]
+    inputs = generate_inputs(parameters=parameters, sizes=List([4, 6]))
+    with pytest.raises(ValueError, match="missing: Sz"):
+        generate_workchain("dmrg.finite_size", inputs)
+
+
+def test_validate_warm_start(generate_workchain, generate_inputs):
+    """Test that `warm_start` needs `checkpoint_sweeps`."""
+    inputs = generate_inputs(sizes=List([4, 6]))
+    generate_workchain("dmrg.finite_size", inputs)
+
+    inputs = generate_inputs(sizes=List([4, 6]), warm_start=Bool(True))
+    with pytest.raises(ValueError, match="needs `checkpoint_sweeps`"):
+        generate_workchain("dmrg.finite_size", inputs)
@@ -0,0 +1,155 @@
+"""Tests for the Sz sector workchain."""
+
+import numpy as np
+import pytest
+from aiida.orm import ArrayData, Dict, Float, Int, List
+
+from aiida_dmrg.workchains.sz_sectors import (
+    get_sz_sectors,
+    merge_sz_sectors,
+    sector_label,
+)
+
+
+@pytest.mark.parametrize(
+    "spin, n_sites, expected",
+    [(0.5, 4, [0, 1, 2]), (0.5, 3, [0.5, 1.5]), (1, 2, [0, 1, 2])],
+)
+def test_get_sz_sectors(spin, n_sites, expected):
+    """Test the non-negative sectors of integer and half-integer chains."""
+    assert get_sz_sectors(spin, n_sites) == expected
+
+
+def test_sector_label():
+    """Test that the labels are valid link labels."""
+    assert [sector_label(sz) for sz in (0, 1.5, -1)] == [
+        "sz_0",
+        "sz_1_5",
+        "sz_m1",
+    ]
+
+
+def make_arrays(energies, n_sites=2):
+    """Return the `output_arrays` of a sector with the given energies."""
+    arrays = ArrayData()
+    arrays.set_array("energies", np.array(energies))
+    arrays.set_array("spin_squared", np.array(energies) * 0)
+    arrays.set_array("spin_z", np.ones((len(energies), n_sites)))
+    return arrays
+
+
+def test_merge_sz_sectors(aiida_profile):
+    """Test that the states of all sectors are sorted by energy."""
+    results = merge_sz_sectors(
+        Dict({"sz_0": 0, "sz_1": 1}),
+        List([2]),
+        List([]),
+        sz_0=make_arrays([-3.0, -1.0]),
+        sz_1=make_arrays([-2.0]),
+    )
+    spectrum = results["spectrum"]
+    assert spectrum.get_array("energies").tolist() == [-3, -2, -1]
+    assert spectrum.get_array("sz").tolist() == [0, 1, 0]
+    assert spectrum.get_array("spin_z").shape == (3, 2)
+    parameters = results["output_parameters"].get_dict()
+    assert parameters["energy_min"] == -3.0
+    assert parameters["ground_state_sz"] == 0
+    assert parameters["failed_sectors"] == [2]
+
+
+@pytest.fixture
+def generate_sector_calc(generate_finished_node):
+    """Return a factory for a finished calculation of a sector."""
+
+    def factory(energies):
+        outputs = {
+            "output_parameters": {"energy_min": min(energies)},
+            "output_arrays": make_arrays(energies),
+        }
+        return generate_finished_node("aiida.calculations:dmrg", outputs)
+
+    return factory
+
+
+def test_sz_sectors(fixture_code, generate_workchain, generate_sector_calc):
+    """Test the batches of sectors and the pruning above the window."""
+    inputs = {
+        "base": {
+            "dmrg": {
+                "code": fixture_code("dmrg"),
+                "parameters": Dict({"S": 0.5, "N_sites": 8, "J": 1}),
+                "metadata": {"options": {"resources": {"num_machines": 1}}},
+            },
+        },
+        "max_concurrent": Int(2),
+        "energy_window": Float(1.5),
+    }
+    process = generate_workchain("dmrg.sz_sectors", inputs)
+    process.setup()
+    assert process.ctx.pending == [0, 1, 2, 3, 4]
+
+    # The first batch: Sz = 1 lies entirely above the window
+    process.ctx.pending = process.ctx.pending[2:]
+    process.ctx.running = [0, 1]
+    process.ctx.sz_0 = generate_sector_calc([-3.5, -3.0])
+    process.ctx.sz_1 = generate_sector_calc([-1.5])
+    process.inspect_sectors()
+
+    assert not process.should_run_sectors()
+    assert process.ctx.skipped == [2, 3, 4]
+
+    process.results()
+    parameters = process.outputs["output_parameters"]
+    assert parameters.creator.process_label == "merge_sz_sectors"
+    parameters = parameters.get_dict()
+    assert parameters["energy_min"] == -3.5
+    assert parameters["ground_state_sz"] == 0
+    assert parameters["skipped_sectors"] == [2, 3, 4]
+    spectrum = process.outputs["spectrum"]
+    assert spectrum.get_array("energies").tolist() == [-3.5, -3.0, -1.5]
+
+
+def test_validate_sz_sectors(fixture_code, generate_workchain):
+    """Test that sectors beyond the maximal Sz are rejected."""
+    inputs = {
+        "base": {
+            "dmrg": {
+                "code": fixture_code("dmrg"),
+                "parameters": Dict({"S": 0.5, "N_sites": 2, "J": 1}),
+                "metadata": {"options": {"resources": {"num_machines": 1}}},
+            },
+        },
+        "sz_sectors": List([0, 2]),
+    }
+    with pytest.raises(ValueError, match="Invalid `sz_sectors`"):
+        generate_workchain("dmrg.sz_sectors", inputs)
+
+
+def test_validate_template(fixture_code, generate_workchain):
+    """Test that the template is validated with the `Sz` of a sector."""
+    parameters = {
+        "S": 0.5,
+        "N_sites": 2,
+        "cutoff": 1e-8,
+        "J": 1,
+        "n_excitations": 0,
+        "conserve_symmetry": "false",
+        "print_HDF5": "false",
+        "maximal_energy": "true",
+        "checkpoint_sweeps": 2,
+    }
+    inputs = {
+        "base": {
+            "dmrg": {
+                "code": fixture_code("dmrg"),
+                "parameters": Dict(parameters),
+                "metadata": {"options": {"resources": {"num_machines": 1}}},
+            },
+        },
+    }
+    generate_workchain("dmrg.sz_sectors", inputs)
+
+    del parameters["cutoff"]
+    inputs["base"]["dmrg"]["parameters"] = Dict(parameters)
+    with pytest.raises(ValueError, match="missing: cutoff"):
+        generate_workchain("dmrg.sz_sectors", inputs)